@@ -2,14 +2,11 @@
 Jupyter Extension
 """
 from notebook.utils import url_path_join
+from tornado.ioloop import IOLoop
 
-from .handlers import (
-    CommitHandler,
-    PullHandler,
-    InfoHandler,
-    OriginInfoHandler,
-    PushHandler,
-)
+from .config import GitExtensionConfig
+from .routes import ROUTES, HandlerLoader
+from .status import watch_contents_manager
 
 log = None
 
@@ -36,9 +33,71 @@ def _jupyter_server_extension_paths():
 
 
 def load_jupyter_server_extension(nb_server_app):
+    """
+    Registers the git routes. The handlers, GitPython, and the services behind them
+    are only loaded when a git route is first requested, or in the background after
+    startup with GitExtensionConfig.preload.
+    """
     global log
     log = nb_server_app.log
     log.info("Git Extension Enabled.")
+    config = GitExtensionConfig(parent=nb_server_app)
+    root_dir = getattr(
+        nb_server_app.contents_manager, "root_dir", nb_server_app.notebook_dir
+    )
+
+    def setup(handlers):
+        from .discovery import configure_repo_resolver
+        from .executor import configure_executor
+        from .history import configure_log_cache
+        from .jobs import configure_job_queue
+        from .notebook_diff import configure_diff_cache
+        from .outputs import configure_output_stripper
+        from .refs import configure_ref_cache
+        from .remote import configure_fetch_scheduler, configure_fetch_strategy
+        from .repo_pool import configure_repo_pool
+        from .single_flight import configure_single_flight
+        from .status import configure_status_cache, configure_untracked_scanner
+        from .status_stream import configure_status_broadcaster
+        from .submodules import configure_submodule_scanner
+        from .watcher import configure_status_tracker
+
+        configure_executor(config)
+        configure_job_queue(config)
+        configure_single_flight(config)
+        configure_repo_pool(config)
+        configure_repo_resolver(root_dir)
+        status_cache = configure_status_cache(config)
+        untracked_scanner = configure_untracked_scanner(config)
+        configure_submodule_scanner(config)
+        configure_diff_cache(config)
+        configure_log_cache(config)
+        configure_ref_cache(config)
+        configure_output_stripper(config)
+        broadcaster = configure_status_broadcaster(
+            config, handlers.load_repo_status, log=log
+        )
+        status_cache.add_listener(broadcaster.notify)
+        configure_status_tracker(
+            config,
+            on_change=status_cache.invalidate,
+            log=log,
+            untracked_scanner=untracked_scanner,
+        )
+        configure_fetch_scheduler(config, log=log)
+        configure_fetch_strategy(config)
+        log.info("Git Extension handlers loaded.")
+
+    async def warm_up(handlers):
+        # Open the notebook directory's repo and cache its status, if it is in one
+        try:
+            repo_path, _ = handlers.get_repo_resolver().resolve("")
+            await handlers.load_repo_status(repo_path)
+        except Exception as e:
+            log.debug(f"Git Extension skipped warming up {root_dir}: {e}")
+
+    loader = HandlerLoader(setup)
+    watch_contents_manager(nb_server_app.contents_manager)
     web_app = nb_server_app.web_app
     host_pattern = ".*$"
     base_route_pattern = url_path_join(web_app.settings["base_url"], "/git")
@@ -47,10 +106,9 @@ def load_jupyter_server_extension(nb_server_app):
     web_app.add_handlers(
         host_pattern,
         [
-            (url_path_join(base_route_pattern, "/commit"), CommitHandler),
-            (url_path_join(base_route_pattern, "/pull"), PullHandler),
-            (url_path_join(base_route_pattern, "/info"), InfoHandler),
-            (url_path_join(base_route_pattern, "/origin-info"), OriginInfoHandler),
-            (url_path_join(base_route_pattern, "/push"), PushHandler),
+            (url_path_join(base_route_pattern, path), loader.handler(name))
+            for path, name in ROUTES
         ],
     )
+    if config.preload:
+        IOLoop.current().add_callback(loader.preload, warm_up)
@@ -0,0 +1,439 @@
+"""
+Benchmarks the git handlers end to end against generated repos
+
+Run with: python -m jupyter_git_extension.benchmark --files 10000 --output report.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from tornado import httpclient, httpserver, netutil, web
+
+from . import handlers
+from .config import GitExtensionConfig
+from .discovery import configure_repo_resolver
+from .executor import configure_executor
+from .jobs import configure_job_queue
+from .remote import configure_fetch_scheduler, get_ahead_behind_counter
+from .repo_pool import configure_repo_pool
+from .single_flight import configure_single_flight
+from .status import configure_status_cache, get_status_cache
+from .version import __version__
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+IDENTITY = "Benchmark <benchmark@example.com>"
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "Benchmark",
+    "GIT_AUTHOR_EMAIL": "benchmark@example.com",
+    "GIT_COMMITTER_NAME": "Benchmark",
+    "GIT_COMMITTER_EMAIL": "benchmark@example.com",
+}
+
+
+def run_git(*args, cwd=None, input=None):
+    """
+    Runs a git command for repo setup, outside of the code being benchmarked
+
+    :param args: are the git arguments
+    :param cwd: is the directory to run git in
+    :param input: is optional bytes to send on stdin
+    :return: stdout of the command
+    """
+    return subprocess.run(
+        ["git", *args],
+        cwd=cwd,
+        input=input,
+        stdout=subprocess.PIPE,
+        check=True,
+        env=dict(os.environ, **GIT_ENV),
+    ).stdout
+
+
+def tracked_path(i, depth):
+    """
+    :param i: is the number of the file
+    :param depth: is the number of directories above the file
+    :return: repo relative path of a generated file, spread over 4 directories per level
+    """
+    directories = [f"dir{(i >> (2 * level)) % 4}" for level in range(depth)]
+    return "/".join(directories + [f"file{i}.py"])
+
+
+def generate_repo(
+    workspace, files=1000, untracked=100, modified=10, depth=3, commits=100
+):
+    """
+    Generates a bare origin with history and a clone of it with worktree changes.
+    History is written with git fast-import so long histories take seconds.
+
+    :param workspace: is the directory to create the repos in
+    :param files: is the number of tracked files
+    :param untracked: is the number of untracked files, put under outputs/
+    :param modified: is the number of tracked files modified in the worktree
+    :param depth: is the number of directory levels files are nested in
+    :param commits: is the number of commits in the history
+    :return: Dict with the paths of the origin, the clone, and a second clone used to
+        push upstream changes
+    """
+    origin = os.path.join(workspace, "origin.git")
+    run_git("init", "--quiet", "--bare", origin)
+
+    stream = []
+    timestamp = 1500000000
+    contents = b"print('generated')\n"
+    stream.append(b"blob\nmark :1\ndata %d\n%s\n" % (len(contents), contents))
+    for commit in range(max(commits, 1)):
+        message = b"Commit %d" % commit
+        stream.append(
+            b"commit refs/heads/master\ncommitter %s %d +0000\ndata %d\n%s\n"
+            % (IDENTITY.encode(), timestamp + commit, len(message), message)
+        )
+        if commit == 0:
+            for i in range(files):
+                stream.append(b"M 100644 :1 %s\n" % tracked_path(i, depth).encode())
+        history = b"%d\n" % commit
+        stream.append(
+            b"M 100644 inline history.txt\ndata %d\n%s\n" % (len(history), history)
+        )
+    run_git("fast-import", "--quiet", cwd=origin, input=b"".join(stream))
+
+    clone = os.path.join(workspace, "repo")
+    upstream = os.path.join(workspace, "upstream")
+    for path in (clone, upstream):
+        run_git("clone", "--quiet", origin, path)
+        run_git("config", "pull.rebase", "false", cwd=path)
+        run_git("config", "user.name", "Benchmark", cwd=path)
+        run_git("config", "user.email", "benchmark@example.com", cwd=path)
+
+    for i in range(min(modified, files)):
+        with open(os.path.join(clone, tracked_path(i, depth)), "a") as f:
+            f.write("# modified\n")
+    for i in range(untracked):
+        path = os.path.join(clone, "outputs", tracked_path(i, depth))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write("untracked\n")
+
+    return {"origin": origin, "clone": clone, "upstream": upstream}
+
+
+def percentile(values, fraction):
+    """
+    :param values: is a list of numbers
+    :param fraction: is the percentile as a fraction, ex. 0.95
+    :return: the linearly interpolated percentile
+    """
+    values = sorted(values)
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def summarize(durations):
+    """
+    :param durations: is a list of seconds
+    :return: Dict of latency statistics in seconds
+    """
+    return {
+        "iterations": len(durations),
+        "p50": percentile(durations, 0.5),
+        "p95": percentile(durations, 0.95),
+        "mean": sum(durations) / len(durations),
+        "min": min(durations),
+        "max": max(durations),
+    }
+
+
+def peak_rss():
+    """
+    :return: Dict with the peak resident memory in bytes of this process (the server)
+        and of the largest git process it ran, or None where unavailable
+    """
+    if resource is None:
+        return {"server": None, "gitChildren": None}
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {
+        "server": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        "gitChildren": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    }
+
+
+def make_app():
+    """
+    :return: Tornado application serving the benchmarked handlers under /git
+    """
+    return web.Application(
+        [
+            (r"/git/commit", handlers.CommitHandler),
+            (r"/git/pull", handlers.PullHandler),
+            (r"/git/info", handlers.InfoHandler),
+            (r"/git/origin-info", handlers.OriginInfoHandler),
+            (r"/git/push", handlers.PushHandler),
+        ],
+        base_url="/",
+    )
+
+
+async def run_benchmarks(options):
+    """
+    Generates a repo and times each handler through a local Tornado server
+
+    :param options: is the parsed command line arguments
+    :return: the report dict
+    """
+    config = GitExtensionConfig(
+        executor_kind=options.executor, executor_max_workers=options.workers
+    )
+    configure_executor(config)
+    configure_job_queue(config)
+    single_flight = configure_single_flight(config)
+    configure_repo_pool(config)
+    configure_status_cache(config)
+    configure_fetch_scheduler(config)
+    get_ahead_behind_counter().clear()
+
+    with tempfile.TemporaryDirectory() as workspace:
+        start = time.monotonic()
+        repos = generate_repo(
+            workspace,
+            files=options.files,
+            untracked=options.untracked,
+            modified=options.modified,
+            depth=options.depth,
+            commits=options.commits,
+        )
+        setup_seconds = time.monotonic() - start
+        configure_repo_resolver(workspace)
+
+        sockets = netutil.bind_sockets(0, "127.0.0.1")
+        server = httpserver.HTTPServer(make_app())
+        server.add_sockets(sockets)
+        base_url = f"http://127.0.0.1:{sockets[0].getsockname()[1]}/git/"
+        client = httpclient.AsyncHTTPClient()
+        durations = {}
+
+        async def request(name, endpoint, body):
+            response = await client.fetch(
+                base_url + endpoint,
+                method="PUT",
+                body=json.dumps(body),
+                request_timeout=600,
+                raise_error=False,
+            )
+            if response.code != 200:
+                raise RuntimeError(
+                    f"{name} failed with {response.code}: {response.body[:500]}"
+                )
+
+        async def timed(name, endpoint, body, concurrency=1):
+            start = time.monotonic()
+            await asyncio.gather(
+                *(request(name, endpoint, body) for _ in range(concurrency))
+            )
+            durations.setdefault(name, []).append(time.monotonic() - start)
+
+        deep_directory = os.path.dirname(
+            os.path.join("repo", tracked_path(0, options.depth))
+        )
+        commit_file = tracked_path(options.files - 1, options.depth)
+        try:
+            for iteration in range(options.iterations):
+                get_status_cache().invalidate()
+                await timed("InfoHandler (cold)", "info", {"notebook_path": "repo"})
+                await timed("InfoHandler (warm)", "info", {"notebook_path": "repo"})
+                # Every tab of a user asking at once, ex. after a server restart
+                get_status_cache().invalidate()
+                await timed(
+                    f"InfoHandler (cold, {options.concurrency} concurrent)",
+                    "info",
+                    {"notebook_path": "repo"},
+                    concurrency=options.concurrency,
+                )
+                await timed(
+                    "InfoHandler (deep directory)",
+                    "info",
+                    {"notebook_path": deep_directory},
+                )
+                await timed(
+                    "OriginInfoHandler (fetch)",
+                    "origin-info",
+                    {"path": "repo", "force": True},
+                )
+                await timed(
+                    "OriginInfoHandler (cached)", "origin-info", {"path": "repo"}
+                )
+
+                with open(os.path.join(repos["clone"], commit_file), "a") as f:
+                    f.write(f"# iteration {iteration}\n")
+                await timed(
+                    "CommitHandler",
+                    "commit",
+                    {
+                        "path": "repo",
+                        "files": [os.path.join("repo", commit_file)],
+                        "message": f"Benchmark iteration {iteration}",
+                    },
+                )
+                await timed("PushHandler", "push", {"path": "repo"})
+
+                # Give pull something to bring in
+                run_git("pull", "--quiet", cwd=repos["upstream"])
+                with open(os.path.join(repos["upstream"], "upstream.txt"), "a") as f:
+                    f.write(f"{iteration}\n")
+                run_git("add", "upstream.txt", cwd=repos["upstream"])
+                run_git("commit", "--quiet", "-m", "Upstream", cwd=repos["upstream"])
+                run_git("push", "--quiet", "origin", "master", cwd=repos["upstream"])
+                await timed("PullHandler", "pull", {"path": "repo"})
+        finally:
+            server.stop()
+            client.close()
+            handlers.get_repo_pool().clear()
+
+    return {
+        "version": __version__,
+        "python": platform.python_version(),
+        "git": run_git("--version").decode().strip(),
+        "platform": platform.platform(),
+        "options": vars(options),
+        "setupSeconds": setup_seconds,
+        "results": {name: summarize(values) for name, values in durations.items()},
+        "peakRssBytes": peak_rss(),
+        "singleFlight": single_flight.stats(),
+        "startup": measure_startup(options.iterations),
+    }
+
+
+# Run in a fresh interpreter per sample. The notebook server's own modules are
+# imported first since every server has loaded them before loading the extension
+STARTUP_SCRIPT = """
+import json, sys, time
+import notebook.notebookapp
+start = time.perf_counter()
+import jupyter_git_extension
+imported = time.perf_counter()
+git_imported = "git" in sys.modules
+from jupyter_git_extension import handlers
+loaded = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "firstUse": loaded - imported,
+    "gitImportedAtStartup": git_imported,
+}))
+"""
+
+
+def measure_startup(iterations):
+    """
+    Times importing the extension into a notebook server process, and loading the
+    handlers and GitPython when git is first used
+
+    :param iterations: is the number of fresh interpreters to time
+    :return: Dict with summaries of the import and first use times and whether
+        GitPython was imported at startup
+    """
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    samples = [
+        json.loads(
+            subprocess.run(
+                [sys.executable, "-c", STARTUP_SCRIPT],
+                cwd=package_dir,
+                stdout=subprocess.PIPE,
+                check=True,
+            ).stdout
+        )
+        for _ in range(iterations)
+    ]
+    return {
+        "import": summarize([sample["import"] for sample in samples]),
+        "firstUse": summarize([sample["firstUse"] for sample in samples]),
+        "gitImportedAtStartup": any(s["gitImportedAtStartup"] for s in samples),
+    }
+
+
+def compare(report, baseline):
+    """
+    :param report: is a benchmark report
+    :param baseline: is an earlier report to compare against
+    :return: lines describing the change in p50/p95 for each benchmark
+    """
+    lines = []
+    for name, result in report["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        changes = []
+        for statistic in ("p50", "p95"):
+            change = (result[statistic] - previous[statistic]) / previous[statistic]
+            changes.append(
+                f"{statistic} {previous[statistic] * 1000:.1f}ms -> "
+                f"{result[statistic] * 1000:.1f}ms ({change:+.0%})"
+            )
+        lines.append(f"{name}: {', '.join(changes)}")
+    return lines
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=1000, help="tracked files")
+    parser.add_argument("--untracked", type=int, default=100, help="untracked files")
+    parser.add_argument(
+        "--modified",
+        type=int,
+        default=10,
+        help="tracked files modified in the worktree",
+    )
+    parser.add_argument("--depth", type=int, default=3, help="directory levels")
+    parser.add_argument("--commits", type=int, default=100, help="commits of history")
+    parser.add_argument(
+        "--iterations", type=int, default=10, help="times each handler is timed"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=10,
+        help="identical requests sent at once for the concurrent benchmark",
+    )
+    parser.add_argument("--executor", choices=("thread", "process"), default="thread")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--output", default="benchmark.json", help="file to write the JSON report to"
+    )
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    options = parse_args(args)
+    report = asyncio.run(run_benchmarks(options))
+    with open(options.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, result in report["results"].items():
+        print(
+            f"{name}: p50 {result['p50'] * 1000:.1f}ms, p95 {result['p95'] * 1000:.1f}ms"
+        )
+    startup = report["startup"]
+    print(
+        f"Extension import: p50 {startup['import']['p50'] * 1000:.1f}ms, "
+        f"first git request loads handlers: p50 {startup['firstUse']['p50'] * 1000:.1f}ms"
+    )
+    if options.baseline:
+        with open(options.baseline) as f:
+            print("\n".join(compare(report, json.load(f))))
+    print(f"Report written to {options.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Configuration for the git server extension
+"""
+from traitlets import Bool, Enum, Float, Int, List, Unicode
+from traitlets.config import Configurable
+
+
+class GitExtensionConfig(Configurable):
+    """
+    Server side settings for the git extension. Values can be set from any jupyter
+    config file, ex: c.GitExtensionConfig.executor_max_workers = 8
+    """
+
+    executor_kind = Enum(
+        ["thread", "process"],
+        default_value="thread",
+        config=True,
+        help="Type of worker pool git operations are run in",
+    )
+
+    executor_max_workers = Int(
+        4, config=True, help="Maximum number of git operations running at once"
+    )
+
+    executor_max_queue_depth = Int(
+        8,
+        config=True,
+        help="Maximum number of git operations queued or running per repo before "
+        "new requests for that repo are rejected",
+    )
+
+    status_cache_max_age = Float(
+        60.0,
+        config=True,
+        help="Seconds a cached repo status can be reused when nothing in the repo's "
+        "git directory changed. Catches edits made outside of jupyter. 0 disables expiry",
+    )
+
+    status_tracking = Enum(
+        ["scan", "watch"],
+        default_value="scan",
+        config=True,
+        help="How worktree status is computed. 'scan' checks the whole repo on each "
+        "request. 'watch' keeps status up to date from filesystem events and only "
+        "rechecks changed paths (requires watchdog and the thread executor)",
+    )
+
+    status_watch_max_pending = Int(
+        1000,
+        config=True,
+        help="Number of changed paths after which 'watch' status tracking falls back "
+        "to a full rescan",
+    )
+
+    fetch_interval = Float(
+        300.0,
+        config=True,
+        help="Minimum seconds between fetches from origin for a repo. Origin status "
+        "is answered from the last fetch in between",
+    )
+
+    fetch_jitter = Float(
+        0.1,
+        config=True,
+        help="Fraction the fetch interval is randomly varied by so repos don't fetch "
+        "in lockstep",
+    )
+
+    fetch_strategy = Enum(
+        ["full", "narrow"],
+        default_value="full",
+        config=True,
+        help="How much of origin fetches and pulls transfer. 'full' fetches every "
+        "branch and tag. 'narrow' only fetches the checked out branch's upstream, "
+        "without tags",
+    )
+
+    fetch_filter = Unicode(
+        "",
+        config=True,
+        help="Partial clone filter for narrow fetches, ex. 'blob:none' to fetch file "
+        "contents on demand. Makes the repo a partial clone of origin",
+    )
+
+    fetch_depth = Int(
+        0,
+        config=True,
+        help="Commits of history narrow fetches and pulls get in shallow clones. "
+        "Complete clones are never made shallow. 0 for no limit",
+    )
+
+    repo_pool_max_repos = Int(
+        16,
+        config=True,
+        help="Number of git repo objects kept open between requests. Idle repos past "
+        "this are closed along with their git helper processes",
+    )
+
+    untracked_files = Enum(
+        ["all", "normal"],
+        default_value="all",
+        config=True,
+        help="How untracked files are listed. 'all' lists every untracked file. "
+        "'normal' lists a directory holding only untracked files as a single entry "
+        "so git doesn't walk its contents",
+    )
+
+    untracked_max_entries = Int(
+        0,
+        config=True,
+        help="Number of untracked entries after which the scan stops and the status "
+        "is reported as truncated. 0 lists everything",
+    )
+
+    untracked_skip_dirs = List(
+        Unicode(),
+        default_value=[],
+        config=True,
+        help="gitignore style patterns of paths left out of the untracked scan, "
+        "ex. ['data/', '.ipynb_checkpoints/']. Matching directories aren't walked",
+    )
+
+    submodule_status = Bool(
+        True,
+        config=True,
+        help="Whether to report files changed inside checked out submodules, and "
+        "submodules nested in them, along with the superproject's",
+    )
+
+    submodule_status_timeout = Float(
+        5.0,
+        config=True,
+        help="Seconds each submodule's status can take before it is left out of the "
+        "response and reported as timed out. Submodules are checked in parallel. "
+        "0 waits for every submodule",
+    )
+
+    job_history_size = Int(
+        100,
+        config=True,
+        help="Number of finished commit, pull, and push jobs whose status is kept for "
+        "the /git/jobs endpoint",
+    )
+
+    status_push_interval = Float(
+        10.0,
+        config=True,
+        help="Seconds between status checks of repos open in a tree view over the "
+        "/git/status-stream WebSocket. Saves and commits push changes straight away",
+    )
+
+    single_flight_max_waiters = Int(
+        64,
+        config=True,
+        help="Number of concurrent identical status or origin requests for a repo that "
+        "can share one git computation. Requests past this get a 503. 0 for no limit",
+    )
+
+    diff_cache_max_entries = Int(
+        256,
+        config=True,
+        help="Number of file diffs kept for /git/diff. A file is diffed again once it "
+        "is saved or committed",
+    )
+
+    commit_strip_outputs = Enum(
+        ["none", "strip", "cap"],
+        default_value="none",
+        config=True,
+        help="How notebook outputs are committed. 'none' commits notebooks as saved. "
+        "'strip' removes outputs and execution counts from committed notebooks, "
+        "'cap' only removes outputs larger than commit_output_max_size. Notebooks in "
+        "the worktree keep their outputs. Commit requests can override this",
+    )
+
+    commit_output_max_size = Int(
+        100000,
+        config=True,
+        help="Bytes an output can take before 'cap' output stripping removes it",
+    )
+
+    log_cache_max_pages = Int(
+        128,
+        config=True,
+        help="Number of pages of commit history kept for /git/log",
+    )
+
+    ref_cache_max_repos = Int(
+        64,
+        config=True,
+        help="Number of repos whose branch listing is kept for /git/branches",
+    )
+
+    preload = Bool(
+        False,
+        config=True,
+        help="Load git and the status of the notebook directory's repo in the "
+        "background after startup. Otherwise they are loaded by the first git request",
+    )
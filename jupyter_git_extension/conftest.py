@@ -0,0 +1,69 @@
+"""
+Repos and files shared by the testers. Left out of the installed package by setup.py
+"""
+
+import os
+import tempfile
+import unittest
+
+import git
+
+
+def set_identity(repo):
+    """
+    Sets the committer identity so commits work without any global git config
+
+    :param repo: is the git.Repo to configure
+    :return: the repo
+    """
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "Tester")
+        config.set_value("user", "email", "tester@example.com")
+    return repo
+
+
+def init_repo(path):
+    """
+    :param path: is the path to create the repo at
+    :return: a new git.Repo with a committer identity
+    """
+    return set_identity(git.Repo.init(path))
+
+
+def clone_repo(url, path, **kwargs):
+    """
+    :param url: is the repo to clone
+    :param path: is the path to clone to
+    :param kwargs: are passed to git clone, ex. depth=1
+    :return: the cloned git.Repo with a committer identity
+    """
+    return set_identity(git.Repo.clone_from(url, path, **kwargs))
+
+
+def write_file(root, name, content):
+    """
+    :param root: is the directory name is relative to
+    :param name: is the relative path of the file
+    :param content: is the text to write
+    :return: None
+    """
+    with open(os.path.join(root, name), "w") as f:
+        f.write(content)
+
+
+class RepoTestCase(unittest.TestCase):
+    """
+    Test case with a new repo in a temporary directory, self.repo at self.path
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.realpath(self.tmp_dir.name)
+        self.repo = init_repo(self.path)
+
+    def tearDown(self):
+        self.repo.close()
+        self.tmp_dir.cleanup()
+
+    def write_file(self, name, content):
+        write_file(self.path, name, content)
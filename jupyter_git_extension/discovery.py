@@ -0,0 +1,128 @@
+"""
+Resolves the git repo enclosing a path from the jupyter file browser
+"""
+import os
+import threading
+
+import git
+
+_repo_resolver = None
+
+
+class RepoResolver:
+    """
+    Maps contents paths (relative to the notebook server's root directory) to the
+    root of the repo enclosing them. The nearest directory with a .git entry wins,
+    so paths inside submodules and linked worktrees resolve to those. Repo roots
+    found are remembered so searches stop there instead of walking up to the
+    filesystem root. Directories below a root are checked again on every lookup,
+    and failed lookups aren't remembered, so repos created later (ex. by git init,
+    a clone, or nested in another repo) are found straight away.
+    """
+
+    def __init__(self, root_dir="."):
+        """
+        :param root_dir: is the notebook server's contents root directory
+        """
+        self.root_dir = os.path.realpath(root_dir)
+        self._lock = threading.Lock()
+        # Repo roots found by earlier searches
+        self._roots = set()
+
+    def os_path(self, path):
+        """
+        Converts a contents path to an absolute filesystem path
+
+        :param path: is the path relative to the contents root directory
+        :return: absolute path
+        """
+        os_path = os.path.normpath(os.path.join(self.root_dir, path.strip("/")))
+        if os_path != self.root_dir and not os_path.startswith(self.root_dir + os.sep):
+            raise ValueError(f"Path is outside of the notebook directory: {path}")
+        return os_path
+
+    def find_root(self, directory):
+        """
+        :param directory: is an absolute path to a directory
+        :return: the root of the repo enclosing directory, or None
+        """
+        root = None
+        current = directory
+        while True:
+            with self._lock:
+                if current in self._roots:
+                    # resolve() checks the repo still exists
+                    root = current
+                    break
+            if os.path.exists(os.path.join(current, ".git")):
+                root = current
+                with self._lock:
+                    self._roots.add(root)
+                break
+            parent = os.path.dirname(current)
+            if parent == current:
+                break
+            current = parent
+        return root
+
+    def resolve(self, path):
+        """
+        Finds the repo enclosing a contents path
+
+        :param path: is a file or directory path relative to the contents root
+        :return: tuple of the absolute repo root and the path relative to that root
+            ("" for the root itself)
+        """
+        os_path = self.os_path(path)
+        directory = os_path if os.path.isdir(os_path) else os.path.dirname(os_path)
+        root = self.find_root(directory)
+        if root is None or not os.path.exists(os.path.join(root, ".git")):
+            if root is not None:
+                # The repo was removed since it was found
+                self.invalidate(root)
+                return self.resolve(path)
+            raise git.exc.InvalidGitRepositoryError(f"Not in a git repository: {path}")
+
+        relative_path = os.path.relpath(os_path, root)
+        if relative_path == ".":
+            relative_path = ""
+        return root, relative_path.replace(os.sep, "/")
+
+    def invalidate(self, path=None):
+        """
+        Forgets repo roots at or below a directory
+
+        :param path: is an absolute path. Forgets everything if None
+        :return: None
+        """
+        with self._lock:
+            if path is None:
+                self._roots.clear()
+                return
+            path = os.path.realpath(path)
+            for root in list(self._roots):
+                if root == path or root.startswith(path + os.sep):
+                    self._roots.discard(root)
+
+
+def get_repo_resolver():
+    """
+    Returns the process wide repo resolver. Defaults to the current directory as
+    the contents root.
+    """
+    global _repo_resolver
+    if _repo_resolver is None:
+        _repo_resolver = RepoResolver()
+    return _repo_resolver
+
+
+def configure_repo_resolver(root_dir):
+    """
+    Replaces the process wide repo resolver
+
+    :param root_dir: is the notebook server's contents root directory
+    :return: the new RepoResolver
+    """
+    global _repo_resolver
+    _repo_resolver = RepoResolver(root_dir)
+    return _repo_resolver
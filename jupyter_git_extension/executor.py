@@ -0,0 +1,179 @@
+"""
+Worker pool used to run git operations off of the Tornado IOLoop
+"""
+import asyncio
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from .metrics import get_metrics
+
+_executor = None
+
+
+class ExecutorSaturatedError(Exception):
+    """
+    Raised when a repo already has the maximum number of git operations in flight
+    """
+
+
+def _run_recording_metrics(function, *args, **kwargs):
+    """
+    Runs a function in a worker process, returning the metrics it recorded with its
+    outcome since the worker's registry is never rendered
+
+    :param function: is the callable to run
+    :return: tuple of whether the function returned, its return value or exception,
+        and a snapshot of the metrics it recorded
+    """
+    metrics = get_metrics()
+    # Process pool workers run one function at a time
+    metrics.clear()
+    try:
+        result = True, function(*args, **kwargs)
+    except Exception as e:
+        result = False, e
+    return (*result, metrics.snapshot())
+
+
+def _merge_metrics(future):
+    """
+    :param future: is the Future of a _run_recording_metrics call
+    :return: Future of the function's own outcome, resolved once its metrics are
+        merged into this process's registry
+    """
+    outcome = Future()
+
+    def done(future):
+        try:
+            returned, value, snapshot = future.result()
+        except BaseException as e:
+            # Ex. a broken pool or unpicklable arguments
+            outcome.set_exception(e)
+            return
+        get_metrics().merge(snapshot)
+        if returned:
+            outcome.set_result(value)
+        else:
+            outcome.set_exception(value)
+
+    future.add_done_callback(done)
+    return outcome
+
+
+class GitExecutor:
+    """
+    Bounded pool for git operations. Work is queued per repo so one busy repo can't
+    take every slot in the pool.
+    """
+
+    def __init__(self, kind="thread", max_workers=4, max_queue_depth=8):
+        """
+        :param kind: is "thread" or "process". Functions submitted to a process pool
+            must be picklable (module level functions with plain arguments). Metrics
+            they record are sent back to this process's registry
+        :param max_workers: is the number of git operations that can run at once
+        :param max_queue_depth: is the number of operations allowed in flight per repo
+        """
+        if kind == "process":
+            self._pool = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self._pool = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="jupyter-git"
+            )
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self._lock = threading.Lock()
+        self._in_flight = defaultdict(int)
+        self._rejected = 0
+
+    def submit(self, key, function, *args, **kwargs):
+        """
+        Schedules a git operation on the pool
+
+        :param key: is the repo the operation runs against, used for the queue limit
+        :param function: is the callable to run in the pool
+        :return: awaitable resolving to the return value of function
+        """
+        key = os.path.abspath(key)
+        with self._lock:
+            if self._in_flight[key] >= self.max_queue_depth:
+                self._rejected += 1
+                raise ExecutorSaturatedError(
+                    f"Too many git operations queued for {key}. Try again shortly."
+                )
+            self._in_flight[key] += 1
+
+        try:
+            if self.kind == "process":
+                future = _merge_metrics(
+                    self._pool.submit(_run_recording_metrics, function, *args, **kwargs)
+                )
+            else:
+                future = self._pool.submit(function, *args, **kwargs)
+        except Exception:
+            self._release(key)
+            raise
+        future.add_done_callback(lambda _: self._release(key))
+        return asyncio.wrap_future(future)
+
+    def _release(self, key):
+        with self._lock:
+            self._in_flight[key] -= 1
+            if self._in_flight[key] <= 0:
+                del self._in_flight[key]
+
+    def stats(self):
+        """
+        Current load on the pool
+
+        :return: Dict with in flight counts and saturation. A saturation over 1.0
+            means operations are waiting on a free worker.
+        """
+        with self._lock:
+            per_repo = dict(self._in_flight)
+            rejected = self._rejected
+        in_flight = sum(per_repo.values())
+        return {
+            "kind": self.kind,
+            "maxWorkers": self.max_workers,
+            "maxQueueDepth": self.max_queue_depth,
+            "inFlight": in_flight,
+            "saturation": in_flight / self.max_workers,
+            "rejected": rejected,
+            "repos": per_repo,
+        }
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait)
+
+
+def get_executor():
+    """
+    Returns the process wide executor, creating one with default settings if the
+    server extension hasn't configured it
+    """
+    global _executor
+    if _executor is None:
+        _executor = GitExecutor()
+    return _executor
+
+
+def configure_executor(config):
+    """
+    Replaces the process wide executor with one built from the extension config
+
+    :param config: is a GitExtensionConfig
+    :return: the new GitExecutor
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+    _executor = GitExecutor(
+        kind=config.executor_kind,
+        max_workers=config.executor_max_workers,
+        max_queue_depth=config.executor_max_queue_depth,
+    )
+    return _executor
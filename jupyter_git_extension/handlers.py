@@ -1,22 +1,77 @@
+import asyncio
 import functools
+import hashlib
 import json
+import os
+import posixpath
 import re
 import sys
+import tempfile
+import threading
+import time
 from datetime import datetime
 
 import git
 from notebook.base.handlers import IPythonHandler
-from tornado import web
+from notebook.base.zmqhandlers import WebSocketMixin
+from tornado import web, websocket
 
+from .discovery import get_repo_resolver
+from .executor import ExecutorSaturatedError, get_executor
+from .history import decode_cursor, encode_cursor, get_log_cache, read_log
+from .jobs import get_job_queue
+from .metrics import OPERATION_DURATION, REQUEST_DURATION, get_metrics
+from .notebook_diff import diff_contents, get_diff_cache
+from .outputs import OUTPUT_STRIP_MODES, get_output_stripper
+from .progress import (
+    REMOTE_OPERATIONS,
+    OperationCancelled,
+    StreamingProgress,
+    run_with_progress,
+)
+from .refs import get_ref_cache
+from .remote import (
+    get_ahead_behind_counter,
+    get_fetch_scheduler,
+    get_fetch_strategy,
+)
+from .repo_pool import get_repo_pool
+from .single_flight import get_single_flight
+from .status import (
+    StatusIndex,
+    UntrackedScanner,
+    get_status_cache,
+    get_untracked_scanner,
+)
+from .status_stream import FILE_LIST_KEYS, StatusSubscriber, get_status_broadcaster
+from .submodules import SubmoduleScanner, get_submodule_scanner
+from .watcher import get_status_tracker
 
-def get_repo(path="."):
+
+# Files past this many bytes aren't diffed
+DIFF_MAX_FILE_SIZE = 20 * 1024 * 1024
+
+# Commits per page of history by default and at most
+LOG_DEFAULT_LIMIT = 50
+LOG_MAX_LIMIT = 500
+
+# Bytes of encoded JSON written before flushing a streamed response
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Paths sent to each git call when staging. Paths go over stdin, so this only keeps
+# each call's memory and index lock time bounded
+STAGE_CHUNK_SIZE = 10000
+
+
+def open_repo(path="."):
     """
-    Returns a git repo from the specified path
+    Leases a git repo from the process wide pool. The repo must only be used
+    inside the with block.
 
     :param path: is the optional path to the git repo
-    :return: git.Repo representing the input path
+    :return: context manager yielding a git.Repo representing the input path
     """
-    return git.Repo(path)
+    return get_repo_pool().lease(path)
 
 
 def get_browser_repo_url_from_git_url(git_url):
@@ -71,6 +126,441 @@ def get_org_name_from_git_url(git_url):
     return re.sub(r"^.*[/:]([^/:]*)/[^/]*$", r"\1", git_url)
 
 
+def stage_pathspecs(command, paths, *args):
+    """
+    Runs a git command over a list of paths sent on stdin, so any number of files
+    can be staged without exceeding the command line length limit
+
+    :param command: is the git command to run, ex. repo.git.add
+    :param paths: is a list of repo relative paths
+    :param args: are extra arguments for the command
+    :return: None
+    """
+    for i in range(0, len(paths), STAGE_CHUNK_SIZE):
+        with tempfile.TemporaryFile() as pathspecs:
+            pathspecs.write(
+                b"\0".join(os.fsencode(p) for p in paths[i : i + STAGE_CHUNK_SIZE])
+            )
+            pathspecs.seek(0)
+            command(
+                *args,
+                "--pathspec-from-file=-",
+                "--pathspec-file-nul",
+                istream=pathspecs,
+                env={"GIT_LITERAL_PATHSPECS": "1"},
+            )
+
+
+def commit_files(files, message, output_stripper=None, path="."):
+    """
+    Stages and commits files. Files that no longer exist are staged as deletions.
+
+    :param files: is a list of repo relative files or directories to add to the commit
+    :param message: is the commit message
+    :param output_stripper: is an optional OutputStripper to remove outputs from
+        staged notebooks with
+    :param path: is the optional path to the git repo
+    :return: Dict with seconds spent staging, stripping outputs, committing, and in
+        total, and the output stripping summary (None when outputs are kept)
+    """
+    with open_repo(path) as repo:
+        start = time.monotonic()
+        existing = []
+        deleted = []
+        for file in files:
+            if os.path.lexists(os.path.join(repo.working_tree_dir, file)):
+                existing.append(file)
+            else:
+                deleted.append(file)
+        with get_metrics().time(OPERATION_DURATION, operation="stage"):
+            if existing:
+                stage_pathspecs(repo.git.add, existing, "--all")
+            if deleted:
+                stage_pathspecs(
+                    repo.git.rm,
+                    deleted,
+                    "--cached",
+                    "-r",
+                    "--quiet",
+                    "--ignore-unmatch",
+                )
+        staged = time.monotonic()
+
+        output_stripping = None
+        if output_stripper is not None and output_stripper.mode != "none":
+            with get_metrics().time(OPERATION_DURATION, operation="strip_outputs"):
+                output_stripping = output_stripper.strip_staged(repo)
+        stripped = time.monotonic()
+
+        # git writes the tree and commit natively instead of GitPython rewriting the
+        # whole index in Python. Commit hooks still run
+        with get_metrics().time(OPERATION_DURATION, operation="commit"):
+            repo.git.commit("--quiet", "-m", message)
+        committed = time.monotonic()
+
+    return {
+        "timings": {
+            "stage": staged - start,
+            "stripOutputs": stripped - staged,
+            "commit": committed - stripped,
+            "total": committed - start,
+        },
+        "outputStripping": output_stripping,
+    }
+
+
+def pull(path=".", strategy=None):
+    """
+    Runs a git pull
+
+    :param path: is the optional path to the git repo
+    :param strategy: is the FetchStrategy deciding what is fetched. Defaults to
+        the process wide one
+    :return: Dict with what the pull transferred and how long it took
+    """
+    strategy = strategy or get_fetch_strategy()
+    with open_repo(path) as repo, get_metrics().time(
+        OPERATION_DURATION, operation="pull"
+    ):
+        return strategy.pull(repo)
+
+
+def get_changed_files(repo, untracked_scanner):
+    """
+    :param repo: is the git.Repo to check
+    :param untracked_scanner: is the UntrackedScanner listing untracked files
+    :return: tuple of lists of modified, deleted, and untracked repo relative paths,
+        and whether the untracked listing stopped early
+    """
+    metrics = get_metrics()
+    with metrics.time(OPERATION_DURATION, operation="diff"):
+        diff = repo.index.diff(None)
+    modified_files = [item.a_path for item in diff if not item.deleted_file]
+    deleted_files = [item.a_path for item in diff if item.deleted_file]
+    with metrics.time(OPERATION_DURATION, operation="untracked_scan"):
+        untracked_files, untracked_truncated = untracked_scanner.scan(repo)
+    return modified_files, deleted_files, untracked_files, untracked_truncated
+
+
+def get_repo_info(path=".", untracked_scanner=None, submodule_scanner=None):
+    """
+    Collects file status and origin information for a repo
+
+    :param path: is the optional path to the git repo
+    :param untracked_scanner: is the UntrackedScanner listing untracked files.
+        Defaults to listing every untracked file
+    :param submodule_scanner: is the SubmoduleScanner adding the files changed in
+        submodules. Defaults to checking every submodule with the default timeout
+    :return: Dict with lots of repo information
+    """
+    untracked_scanner = untracked_scanner or UntrackedScanner()
+    submodule_scanner = submodule_scanner or SubmoduleScanner()
+    untracked_truncated = False
+    with open_repo(path) as repo:
+        status_tracker = get_status_tracker()
+        metrics = get_metrics()
+        if status_tracker is not None:
+            model = status_tracker.model(repo.working_tree_dir)
+            with metrics.time(OPERATION_DURATION, operation="watched_status"):
+                modified_files, deleted_files, untracked_files = model.status()
+            untracked_truncated = model.untracked_truncated
+        else:
+            (
+                modified_files,
+                deleted_files,
+                untracked_files,
+                untracked_truncated,
+            ) = get_changed_files(repo, untracked_scanner)
+
+        with metrics.time(OPERATION_DURATION, operation="submodule_status"):
+            (
+                submodule_modified,
+                submodule_deleted,
+                submodule_untracked,
+                submodule_truncated,
+                submodules,
+            ) = submodule_scanner.scan(
+                repo.working_tree_dir,
+                functools.partial(
+                    get_changed_files, untracked_scanner=untracked_scanner
+                ),
+            )
+        modified_files = modified_files + submodule_modified
+        deleted_files = deleted_files + submodule_deleted
+        untracked_files = untracked_files + submodule_untracked
+        untracked_truncated = untracked_truncated or submodule_truncated
+
+        last_commit_timestamp = datetime.utcfromtimestamp(
+            repo.head.commit.committed_date
+        ).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+        repo_url = get_browser_repo_url_from_git_url(repo.remotes.origin.url)
+        repo_name = get_repo_name_from_git_url(repo.remotes.origin.url)
+        org_url = get_browser_org_url_from_git_url(repo.remotes.origin.url)
+        org_name = get_org_name_from_git_url(repo.remotes.origin.url)
+        branch_name = repo.active_branch.name
+        head_commit = repo.head.commit.hexsha
+
+        return {
+            "deletedFiles": deleted_files,
+            "modifiedFiles": modified_files,
+            "untrackedFiles": untracked_files,
+            "untrackedTruncated": untracked_truncated,
+            "submodules": submodules,
+            "lastCommitTimestamp": last_commit_timestamp,
+            "repoUrl": repo_url,
+            "repoName": repo_name,
+            "orgUrl": org_url,
+            "orgName": org_name,
+            "branchName": branch_name,
+            "headCommit": head_commit,
+        }
+
+
+def get_repo_status(path=".", untracked_scanner=None, submodule_scanner=None):
+    """
+    Collects repo information along with an index to serve per directory status
+
+    :param path: is the optional path to the git repo
+    :param untracked_scanner: is the UntrackedScanner listing untracked files
+    :param submodule_scanner: is the SubmoduleScanner adding the files changed in submodules
+    :return: tuple of repo information dict and StatusIndex
+    """
+    repo_info = get_repo_info(
+        path, untracked_scanner=untracked_scanner, submodule_scanner=submodule_scanner
+    )
+    status_index = StatusIndex(
+        modified=repo_info["modifiedFiles"],
+        deleted=repo_info["deletedFiles"],
+        untracked=repo_info["untrackedFiles"],
+    )
+    return repo_info, status_index
+
+
+def fetch_origin(path=".", strategy=None):
+    """
+    Runs a git fetch from origin
+
+    :param path: is the optional path to the git repo
+    :param strategy: is the FetchStrategy deciding what is fetched. Defaults to
+        the process wide one
+    :return: Dict with what the fetch transferred and how long it took
+    """
+    strategy = strategy or get_fetch_strategy()
+    with open_repo(path) as repo, get_metrics().time(
+        OPERATION_DURATION, operation="fetch"
+    ):
+        return strategy.fetch(repo)
+
+
+def get_origin_info(path="."):
+    """
+    Counts commits ahead/behind origin as of the last fetch
+
+    :param path: is the optional path to the git repo
+    :return: Dict with commits behind and ahead
+    """
+    with open_repo(path) as repo:
+        branch_name = repo.active_branch.name
+
+        local_sha, upstream_sha = repo.git.rev_parse(
+            branch_name, f"{branch_name}@{{u}}"
+        ).split()
+        commits_ahead, commits_behind = get_ahead_behind_counter().count(
+            repo, local_sha, upstream_sha
+        )
+
+        return {"commitsBehind": commits_behind, "commitsAhead": commits_ahead}
+
+
+def push(path="."):
+    """
+    Runs a git push to origin
+
+    :param path: is the optional path to the git repo
+    :return: None
+    """
+    with open_repo(path) as repo:
+        with get_metrics().time(OPERATION_DURATION, operation="push"):
+            push_output = repo.remotes.origin.push()
+        push_output = push_output[0]
+
+        # Manually check if push had an error. The method doesn't raise an error on a failed push
+        if (push_output.flags & push_output.REJECTED) > 0:
+            raise git.exc.GitError(
+                f"Push rejected. You should pull remote changes and re-push after merging. Message: {push_output.summary}"
+            )
+        elif (push_output.flags & push_output.ERROR) > 0:
+            raise git.exc.GitError(f"Push failed. Message: {push_output.summary}")
+
+
+def run_remote_operation(operation, report, cancel, path=".", strategy=None):
+    """
+    Runs a push, pull, or fetch while reporting its progress. Pulls and fetches go
+    through the FetchStrategy like pull() and fetch_origin() do.
+
+    :param operation: is "push", "pull", or "fetch"
+    :param report: is called from the worker thread with a dict for each progress update
+    :param cancel: is a threading.Event that stops the operation once set
+    :param path: is the optional path to the git repo
+    :param strategy: is the FetchStrategy deciding what is fetched. Defaults to
+        the process wide one
+    :return: Dict with what a pull or fetch transferred and how long it took, or the
+        output of a push
+    """
+    with open_repo(path) as repo, get_metrics().time(
+        OPERATION_DURATION, operation=operation
+    ):
+        if operation == "push":
+            return run_with_progress(
+                repo, REMOTE_OPERATIONS[operation], StreamingProgress(report), cancel
+            )
+
+        def run_git(repo, arguments):
+            output = []
+            run_with_progress(
+                repo, arguments, StreamingProgress(report), cancel, output=output
+            )
+            return "\n".join(output)
+
+        strategy = strategy or get_fetch_strategy()
+        if operation == "pull":
+            return strategy.pull(repo, run_git=run_git)
+        return strategy.fetch(repo, run_git=run_git)
+
+
+def get_file_diff(file_path, outputs=False, path="."):
+    """
+    Diffs a worktree file against HEAD, answering from the diff cache when neither
+    the committed blob nor the worktree file changed since it was last diffed
+
+    :param file_path: is the repo relative path of the file
+    :param outputs: is whether notebook outputs are compared
+    :param path: is the optional path to the git repo
+    :return: Dict with the file's change ("added", "deleted", "modified" or
+        "unchanged") and its diff, or None if the file is in neither HEAD nor the worktree
+    """
+    with open_repo(path) as repo:
+        try:
+            blob = repo.head.commit.tree / file_path
+        except (KeyError, ValueError):
+            # Added since HEAD, or the repo has no commits yet
+            blob = None
+        if blob is not None and blob.type != "blob":
+            # A directory or submodule in HEAD
+            return None
+        os_path = os.path.join(repo.working_tree_dir, file_path)
+        try:
+            stat = os.stat(os_path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+        if blob is None and signature is None:
+            return None
+
+        sha = blob.hexsha if blob is not None else None
+        key = (repo.working_tree_dir, file_path, sha, signature, outputs)
+        diff_cache = get_diff_cache()
+        diff = diff_cache.get(key)
+        if diff is not None:
+            return diff
+
+        size = max(blob.size if blob is not None else 0, (signature or (0, 0))[1])
+        if size > DIFF_MAX_FILE_SIZE:
+            diff = {"kind": "tooLarge"}
+            old = new = None
+        else:
+            with get_metrics().time(OPERATION_DURATION, operation="diff_file"):
+                old = blob.data_stream.read() if blob is not None else None
+                new = None
+                if signature is not None:
+                    with open(os_path, "rb") as f:
+                        new = f.read()
+                diff = diff_contents(
+                    old, new, notebook=file_path.endswith(".ipynb"), outputs=outputs
+                )
+
+        if blob is None:
+            change = "added"
+        elif signature is None:
+            change = "deleted"
+        elif old is not None and old == new:
+            change = "unchanged"
+        else:
+            change = "modified"
+        diff = dict(diff, path=file_path, change=change)
+        diff_cache.put(key, diff)
+        return diff
+
+
+def get_log(cursor=None, limit=LOG_DEFAULT_LIMIT, path_filter=None, path="."):
+    """
+    Reads a page of commit history, newest first
+
+    :param cursor: is the cursor returned with the previous page, None for the first
+    :param limit: is the number of commits in the page
+    :param path_filter: is an optional repo relative path to show the history of
+    :param path: is the optional path to the git repo
+    :return: Dict with the tip SHA, the page's commits, and the cursor of the next
+        page (None on the last page)
+    """
+    with open_repo(path) as repo:
+        if cursor is None:
+            try:
+                tip, offset = repo.git.rev_parse("--verify", "HEAD"), 0
+            except git.exc.GitCommandError:
+                # No commits yet
+                return {"tip": None, "commits": [], "nextCursor": None}
+        else:
+            tip, offset = decode_cursor(cursor)
+
+        log_cache = get_log_cache()
+        key = (repo.working_tree_dir, tip, path_filter, offset, limit)
+        page = log_cache.get(key)
+        if page is None:
+            follow = bool(path_filter) and os.path.isfile(
+                os.path.join(repo.working_tree_dir, path_filter)
+            )
+            with get_metrics().time(OPERATION_DURATION, operation="log"):
+                commits = read_log(repo, tip, offset, limit, path_filter, follow)
+            next_cursor = None
+            if len(commits) > limit:
+                commits = commits[:limit]
+                next_cursor = encode_cursor(tip, offset + limit)
+            page = {"tip": tip, "commits": commits, "nextCursor": next_cursor}
+            log_cache.put(key, page)
+        return page
+
+
+def list_branches(path="."):
+    """
+    Lists local and remote-tracking branches from the ref cache
+
+    :param path: is the optional path to the git repo
+    :return: Dict with the current branch and lists of local and remote branches
+    """
+    with get_metrics().time(OPERATION_DURATION, operation="list_branches"):
+        return get_ref_cache().branches(path)
+
+
+def checkout_branch(branch, remote=False, path="."):
+    """
+    Switches the worktree to a branch. Checking out a remote-tracking branch creates
+    a local branch of the same name that tracks it.
+
+    :param branch: is the branch name, ex. "main" or "origin/main" for a remote branch
+    :param remote: is whether branch is a remote-tracking branch
+    :param path: is the optional path to the git repo
+    :return: None
+    """
+    with open_repo(path) as repo, get_metrics().time(
+        OPERATION_DURATION, operation="checkout"
+    ):
+        if remote:
+            repo.git.checkout("--track", branch, "--")
+        else:
+            repo.git.checkout(branch, "--")
+
+
 class BaseHandler(IPythonHandler):
     """
     Base class with helper functions for all other handlers
@@ -78,25 +568,44 @@ class BaseHandler(IPythonHandler):
 
     def handle_exceptions(function):
         """
-        A decorator that wraps the passed in function and logs 
-        exceptions should one occur
+        A decorator that wraps the passed in coroutine, logs
+        exceptions should one occur, and records how long it took
         """
 
         @functools.wraps(function)
-        def wrapper(*args, **kwargs):
+        async def wrapper(*args, **kwargs):
             # grabs "self" that was passed into function so we can access it
             instance = args[0]
+            start = time.monotonic()
+            status = 200
             try:
                 instance.log.debug(
                     f"{instance.__class__.__name__} is handling: {str(instance.request)}"
                 )
-                return function(*args, **kwargs)
+                return await function(*args, **kwargs)
+            except web.HTTPError as e:
+                status = e.status_code
+                raise
+            except ExecutorSaturatedError as e:
+                status = 503
+                instance.log.warning(e)
+                raise web.HTTPError(503, str(e))
             except git.exc.GitError as e:
+                status = 500
                 instance.log.error(e)
                 raise web.HTTPError(500, f"Git error: {e}")
             except Exception as e:
+                status = 500
                 instance.log.error(e)
                 raise web.HTTPError(500, "An unexpected error occured.")
+            finally:
+                get_metrics().observe(
+                    REQUEST_DURATION,
+                    time.monotonic() - start,
+                    handler=instance.__class__.__name__,
+                    method=function.__name__.upper(),
+                    status=status,
+                )
 
         return wrapper
 
@@ -107,6 +616,51 @@ class BaseHandler(IPythonHandler):
         """
         return super().log.getChild("JupyterGitExtension")
 
+    def resolve_repo(self, path):
+        """
+        Finds the repo enclosing a path from the file browser
+
+        :param path: is a file or directory path relative to the notebook directory
+        :return: tuple of the absolute repo root and the path relative to that root
+        """
+        try:
+            return get_repo_resolver().resolve(path)
+        except ValueError as e:
+            raise web.HTTPError(400, str(e))
+        except git.exc.InvalidGitRepositoryError as e:
+            raise web.HTTPError(404, str(e))
+
+    async def run_git(self, function, *args, path=".", **kwargs):
+        """
+        Runs a git operation in the worker pool so it doesn't block the IOLoop
+
+        :param function: is the git operation to run. Receives path as a keyword argument
+        :param path: is the path to the git repo, used to limit queue depth per repo
+        :return: the return value of function
+        """
+        return await get_executor().submit(path, function, *args, path=path, **kwargs)
+
+    async def run_job(self, request, repo_path, kind, run):
+        """
+        Queues a job behind other jobs for the repo. Waits for it unless the request
+        asked for "async", in which case a 202 with the job is sent straight away.
+
+        :param request: is the JSON body of the request
+        :param repo_path: is the absolute path to the repo the job runs against
+        :param kind: is the operation, ex. "commit"
+        :param run: is a coroutine function returning the job's success message and a
+            dict of results to add to the response
+        :return: None
+        """
+        job = get_job_queue().submit(repo_path, kind, run)
+        if request.get("async"):
+            self.set_status(202)
+            self.write_response(202, job.status_text, job=job.to_dict())
+            return
+
+        status_message = await job.wait()
+        self.write_response(200, status_message, job=job.to_dict(), **job.result)
+
     def write_response(self, status_code, status_message, **kwargs):
         """
         Write to the Jupyter Response for Javascript utilization
@@ -120,6 +674,59 @@ class BaseHandler(IPythonHandler):
         response.update(kwargs)
         self.write(response)
 
+    def write_cacheable_response(self, status_code, status_message, **kwargs):
+        """
+        Writes the same JSON as write_response with an ETag of its contents. Requests
+        sending that ETag in If-None-Match get an empty 304 instead.
+
+        :param status_code: is the Status Code to present to the UI
+        :param status_message: is the message to present to the UI
+        :param **kwargs: are optional arguments to add to the json response
+        :return: None
+        """
+        response = {"status": status_code, "statusText": status_message}
+        response.update(kwargs)
+        body = json.dumps(response, sort_keys=True)
+        self.set_header("Etag", f'"{hashlib.sha1(body.encode("utf-8")).hexdigest()}"')
+        # Browsers may keep the response but must check it is still current before use
+        self.set_header("Cache-Control", "private, no-cache")
+        if self.check_etag_header():
+            self.set_status(304)
+            return
+        self.set_header("Content-Type", "application/json; charset=UTF-8")
+        self.write(body)
+
+    async def write_streamed_response(
+        self, status_code, status_message, items_key, items, **kwargs
+    ):
+        """
+        Writes the same JSON as write_response with a list under items_key, sending
+        the list in chunks as it is encoded so large responses aren't built as one string
+
+        :param status_code: is the Status Code to present to the UI
+        :param status_message: is the message to present to the UI
+        :param items_key: is the response key holding the list
+        :param items: is an iterable of JSON serializable items
+        :param **kwargs: are optional arguments to add to the json response
+        :return: None
+        """
+        response = {"status": status_code, "statusText": status_message}
+        response.update(kwargs)
+        self.set_header("Content-Type", "application/json; charset=UTF-8")
+        chunk = [json.dumps(response)[:-1], f", {json.dumps(items_key)}: ["]
+        size = 0
+        for i, item in enumerate(items):
+            encoded = json.dumps(item)
+            chunk.append("," + encoded if i else encoded)
+            size += len(encoded)
+            if size >= STREAM_CHUNK_SIZE:
+                self.write("".join(chunk))
+                await self.flush()
+                chunk = []
+                size = 0
+        chunk.append("]}")
+        self.write("".join(chunk))
+
 
 class CommitHandler(BaseHandler):
     """
@@ -127,19 +734,62 @@ class CommitHandler(BaseHandler):
     """
 
     @BaseHandler.handle_exceptions
-    def put(self):
+    async def put(self):
         """
         Commit selected files
 
         :param self.request: is the incoming API request. Requires "files" key with a list of selected files
-        :return: status code and message
+            relative to the notebook directory, or ["."] to commit everything. The repo is found from the
+            optional "path" key, or the first file. Set "async" to get the queued job back immediately.
+            Set "stripOutputs" to "strip", "cap", or "none" to override how notebook outputs are committed
+        :return: status code and message, with timings and the output stripping summary
         """
-        repo = get_repo()
         request = self.get_json_body()
-        repo.git.add(request["files"])
-        repo.index.commit(request["message"])
+        files = request["files"]
+        default_path = posixpath.dirname(files[0]) if files and files != ["."] else ""
+        repo_path, _ = self.resolve_repo(request.get("path", default_path))
+
+        if files != ["."]:
+            repo_files = []
+            for file in files:
+                file_repo_path, relative_path = self.resolve_repo(file)
+                if file_repo_path != repo_path:
+                    raise web.HTTPError(
+                        400, "Files from different repos can't be committed together"
+                    )
+                repo_files.append(relative_path)
+            files = repo_files
+
+        output_stripper = get_output_stripper()
+        strip_outputs = request.get("stripOutputs")
+        if strip_outputs is not None:
+            if strip_outputs not in OUTPUT_STRIP_MODES:
+                raise web.HTTPError(
+                    400, f"stripOutputs must be one of {', '.join(OUTPUT_STRIP_MODES)}"
+                )
+            output_stripper = output_stripper.with_mode(strip_outputs)
+
+        async def run():
+            try:
+                result = await self.run_git(
+                    commit_files,
+                    files,
+                    request["message"],
+                    output_stripper=output_stripper,
+                    path=repo_path,
+                )
+            finally:
+                get_status_cache().invalidate(repo_path)
+            message = "Files committed successfully"
+            stripping = result["outputStripping"]
+            if stripping and stripping["stripped"]:
+                message += (
+                    f". Removed outputs from {stripping['stripped']} notebook(s), "
+                    f"saving {stripping['bytesSaved']} bytes"
+                )
+            return message, result
 
-        self.write_response(200, "Files committed successfully")
+        await self.run_job(request, repo_path, "commit", run)
 
 
 class PullHandler(BaseHandler):
@@ -148,15 +798,56 @@ class PullHandler(BaseHandler):
     """
 
     @BaseHandler.handle_exceptions
-    def put(self):
+    async def put(self):
         """
-        Runs a git pull in the current working directory
+        Runs a git pull in the repo enclosing the optional "path" key. Set "async" to
+        get the queued job back immediately
 
         :return: status code and message
         """
-        repo = get_repo()
-        repo.git.pull()
-        self.write_response(200, "Repo pulled successfully")
+        request = self.get_json_body() or {}
+        repo_path, _ = self.resolve_repo(request.get("path", ""))
+
+        async def run():
+            try:
+                result = await self.run_git(
+                    pull, strategy=get_fetch_strategy(), path=repo_path
+                )
+            finally:
+                get_status_cache().invalidate(repo_path)
+            get_fetch_scheduler().mark_fetched(repo_path, result)
+            return "Repo pulled successfully", {"fetch": result}
+
+        await self.run_job(request, repo_path, "pull", run)
+
+
+async def load_repo_status(repo_path):
+    """
+    Returns a repo's status from the status cache, computing it in the worker pool
+    when the repo changed since it was cached. Concurrent misses for the same
+    fingerprint share one computation.
+
+    :param repo_path: is the absolute path to the repo
+    :return: tuple of the repo info dict and a StatusIndex of its changed files
+    """
+    cache = get_status_cache()
+    fingerprint = cache.fingerprint(repo_path)
+    repo_status = cache.get(repo_path, fingerprint)
+    if repo_status is not None:
+        return repo_status
+
+    async def compute():
+        repo_status = await get_executor().submit(
+            repo_path,
+            get_repo_status,
+            untracked_scanner=get_untracked_scanner(),
+            submodule_scanner=get_submodule_scanner(),
+            path=repo_path,
+        )
+        cache.put(repo_path, fingerprint, repo_status)
+        return repo_status
+
+    return await get_single_flight().run((repo_path, "status", fingerprint), compute)
 
 
 class InfoHandler(BaseHandler):
@@ -165,72 +856,131 @@ class InfoHandler(BaseHandler):
     """
 
     @BaseHandler.handle_exceptions
-    def put(self):
+    async def put(self):
         """
-        Checks git status of current directory
+        Checks git status of the repo being browsed
 
+        :param self.request: is the incoming API request. An optional "notebook_path" key
+            selects the repo and limits file status to the entries of that directory
         :return: Dict with lots of repo information
         """
-        repo = get_repo()
-        modified_files = [
-            item.a_path for item in repo.index.diff(None) if not item.deleted_file
-        ]
-        deleted_files = [
-            item.a_path for item in repo.index.diff(None) if item.deleted_file
-        ]
-        last_commit_timestamp = datetime.utcfromtimestamp(
-            repo.head.commit.committed_date
-        ).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-        repo_url = get_browser_repo_url_from_git_url(repo.remotes.origin.url)
-        repo_name = get_repo_name_from_git_url(repo.remotes.origin.url)
-        org_url = get_browser_org_url_from_git_url(repo.remotes.origin.url)
-        org_name = get_org_name_from_git_url(repo.remotes.origin.url)
-        branch_name = repo.active_branch.name
+        request = self.get_json_body() or {}
+        notebook_path = request.get("notebook_path")
+        repo_path, relative_path = self.resolve_repo(notebook_path or "")
+        repo_info, status_index = await load_repo_status(repo_path)
 
-        repo_info = {
-            "deletedFiles": deleted_files,
-            "modifiedFiles": modified_files,
-            "untrackedFiles": repo.untracked_files,
-            "lastCommitTimestamp": last_commit_timestamp,
-            "repoUrl": repo_url,
-            "repoName": repo_name,
-            "orgUrl": org_url,
-            "orgName": org_name,
-            "branchName": branch_name,
-        }
+        if notebook_path is not None:
+            # Only send what the current directory listing needs instead of every change
+            repo_info = {
+                key: value
+                for key, value in repo_info.items()
+                if key not in FILE_LIST_KEYS
+            }
+            repo_info["entries"] = status_index.listing(relative_path)
 
         self.write_response(200, "Status fetched successfully", repoInfo=repo_info)
 
 
+async def load_origin_info(repo_path, force=False):
+    """
+    Returns commits ahead/behind origin as of the last fetch, fetching in the
+    background when one is due. Concurrent identical requests share one computation.
+
+    :param repo_path: is the absolute path to the repo
+    :param force: is whether to fetch from origin before counting
+    :return: Dict with commits behind and ahead and when origin was last fetched
+    """
+    fetch_scheduler = get_fetch_scheduler()
+    # Passed along so process workers fetch with the configured strategy
+    fetch = functools.partial(fetch_origin, strategy=get_fetch_strategy())
+    await fetch_scheduler.refresh(repo_path, fetch, force=force)
+
+    # Share counts with identical requests, unless the branch or origin moved since they started
+    fetch_state = fetch_scheduler.state(repo_path)
+    key = (
+        repo_path,
+        "origin-info",
+        get_status_cache().fingerprint(repo_path),
+        fetch_state["fetchedAt"],
+    )
+    origin_info = await get_single_flight().run(
+        key,
+        get_executor().submit,
+        repo_path,
+        get_origin_info,
+        path=repo_path,
+    )
+    return dict(origin_info, **fetch_state)
+
+
 class OriginInfoHandler(BaseHandler):
     """
     Notebook Server Handler for local -> origin status information
     """
 
     @BaseHandler.handle_exceptions
-    def put(self):
+    async def put(self):
         """
-        Checks how many commits behind origin
+        Checks how many commits behind origin. Answers from the last fetch and
+        fetches in the background when one is due.
 
-        :return: Dict with commits behind
+        :param self.request: is the incoming API request. An optional "path" key
+            selects the repo and an optional "force" key fetches from origin before answering
+        :return: Dict with commits behind and when origin was last fetched
         """
-        repo = get_repo()
-        branch_name = repo.active_branch.name
+        request = self.get_json_body() or {}
+        repo_path, _ = self.resolve_repo(request.get("path", ""))
+        repo_info = await load_origin_info(repo_path, force=bool(request.get("force")))
 
-        repo.remotes.origin.fetch()
-        commits_behind = sum(
-            1 for commit in repo.iter_commits(f"{branch_name}..{branch_name}@{{u}}")
+        self.write_response(
+            200, "Origin status fetched successfully", repoInfo=repo_info
         )
 
-        commits_ahead = sum(
-            1 for commit in repo.iter_commits(f"{branch_name}@{{u}}..{branch_name}")
-        )
 
-        repo_info = {"commitsBehind": commits_behind, "commitsAhead": commits_ahead}
+class StateHandler(BaseHandler):
+    """
+    Notebook Server Handler for the status and origin information of a repo in one request
+    """
+
+    @web.authenticated
+    @BaseHandler.handle_exceptions
+    async def get(self):
+        """
+        Combines /info for a directory with /origin-info. The response carries an
+        ETag so polls send If-None-Match and get an empty 304 while nothing changed.
 
-        self.write_response(
-            200, "Origin status fetched successfully", repoInfo=repo_info
+        :param self.request: is the incoming API request. The optional "path" query
+            argument selects the repo and the directory whose entries are listed
+        :return: Dict with the repo information, the status of the directory's
+            entries, and commits behind and ahead of origin (null without an upstream)
+        """
+        repo_path, relative_path = self.resolve_repo(
+            self.get_query_argument("path", "")
+        )
+        repo_status, origin_info = await asyncio.gather(
+            load_repo_status(repo_path),
+            load_origin_info(repo_path),
+            return_exceptions=True,
         )
+        if isinstance(repo_status, BaseException):
+            raise repo_status
+        repo_info, status_index = repo_status
+        if isinstance(origin_info, git.exc.GitCommandError):
+            # The branch has no upstream to compare against
+            origin_info = dict(
+                get_fetch_scheduler().state(repo_path),
+                commitsBehind=None,
+                commitsAhead=None,
+            )
+        elif isinstance(origin_info, BaseException):
+            raise origin_info
+
+        state = {
+            key: value for key, value in repo_info.items() if key not in FILE_LIST_KEYS
+        }
+        state["entries"] = status_index.listing(relative_path)
+        state.update(origin_info)
+        self.write_cacheable_response(200, "State fetched successfully", repoInfo=state)
 
 
 class PushHandler(BaseHandler):
@@ -239,22 +989,606 @@ class PushHandler(BaseHandler):
     """
 
     @BaseHandler.handle_exceptions
-    def put(self):
+    async def put(self):
         """
-        Runs a git push to origin
+        Runs a git push to origin from the repo enclosing the optional "path" key.
+        Set "async" to get the queued job back immediately
 
         :return: Status message
         """
-        repo = get_repo()
-        push_output = repo.remotes.origin.push()
-        push_output = push_output[0]
+        request = self.get_json_body() or {}
+        repo_path, _ = self.resolve_repo(request.get("path", ""))
 
-        # Manually check if push had an error. The method doesn't raise an error on a failed push
-        if (push_output.flags & push_output.REJECTED) > 0:
-            raise git.exc.GitError(
-                f"Push rejected. You should pull remote changes and re-push after merging. Message: {push_output.summary}"
+        async def run():
+            await self.run_git(push, path=repo_path)
+            return "Repo pushed successfully", {}
+
+        await self.run_job(request, repo_path, "push", run)
+
+
+class BranchesHandler(BaseHandler):
+    """
+    Notebook Server Handler for listing and checking out branches
+    """
+
+    @web.authenticated
+    @BaseHandler.handle_exceptions
+    async def get(self):
+        """
+        Lists branches. Refs are read from disk and cached until a branch changes,
+        so repos with many remote branches list without running git for each.
+
+        :param self.request: is the incoming API request. The repo is found from the
+            optional "path" query argument
+        :return: Dict with the "current" branch, the "head" SHA, and "local" and
+            "remote" lists of branches with their name, tip SHA, and commit timestamp
+        """
+        repo_path, _ = self.resolve_repo(self.get_query_argument("path", ""))
+        branches = await self.run_git(list_branches, path=repo_path)
+        self.write_cacheable_response(200, "Branches fetched successfully", **branches)
+
+    @BaseHandler.handle_exceptions
+    async def put(self):
+        """
+        Checks out a branch in the repo enclosing the optional "path" key. Set
+        "async" to get the queued job back immediately
+
+        :param self.request: is the incoming API request. Requires a "branch" key with
+            a branch name from the listing. Set "remote" to check out a remote-tracking
+            branch as a new local branch of the same name
+        :return: status code and message
+        """
+        request = self.get_json_body() or {}
+        repo_path, _ = self.resolve_repo(request.get("path", ""))
+        branch = request.get("branch")
+        remote = bool(request.get("remote"))
+
+        branches = await self.run_git(list_branches, path=repo_path)
+        names = {item["name"] for item in branches["remote" if remote else "local"]}
+        if branch not in names:
+            raise web.HTTPError(404, f"No such branch: {branch}")
+        if remote:
+            local_name = branch.split("/", 1)[-1]
+            if local_name in {item["name"] for item in branches["local"]}:
+                raise web.HTTPError(
+                    409,
+                    f"A local branch named {local_name} already exists, check it out instead",
+                )
+
+        async def run():
+            try:
+                await self.run_git(
+                    checkout_branch, branch, remote=remote, path=repo_path
+                )
+            finally:
+                get_status_cache().invalidate(repo_path)
+            return f"Checked out {branch}", {}
+
+        await self.run_job(request, repo_path, "checkout", run)
+
+
+class ProgressWebSocketHandler(WebSocketMixin, websocket.WebSocketHandler, BaseHandler):
+    """
+    Notebook Server WebSocket Handler streaming push, pull, and fetch progress.
+    Send {"action": "push"|"pull"|"fetch", "path": ...} to start an operation and
+    {"action": "cancel"} to stop it. Progress messages are sent while it runs,
+    followed by a single done, cancelled, or error message.
+    """
+
+    async def get(self, *args, **kwargs):
+        # WebSockets skip the XSRF check so make sure the user is logged in
+        if self.current_user is None:
+            raise web.HTTPError(403)
+        return await super().get(*args, **kwargs)
+
+    def open(self, *args, **kwargs):
+        self.cancel = threading.Event()
+        self.running = False
+        return super().open(*args, **kwargs)
+
+    def on_message(self, message):
+        try:
+            request = json.loads(message)
+        except ValueError:
+            self.send({"type": "error", "statusText": "Messages must be JSON"})
+            return
+
+        action = request.get("action")
+        if action == "cancel":
+            self.cancel.set()
+        elif action not in REMOTE_OPERATIONS:
+            self.send({"type": "error", "statusText": f"Unknown action: {action}"})
+        elif self.running:
+            self.send(
+                {"type": "error", "statusText": "An operation is already running"}
             )
-        elif (push_output.flags & push_output.ERROR) > 0:
-            raise git.exc.GitError(f"Push failed. Message: {push_output.summary}")
+        else:
+            # Run separately so cancel messages are received while the operation runs
+            self.running = True
+            asyncio.ensure_future(self.run_operation(action, request.get("path", "")))
+
+    def on_close(self):
+        self.cancel.set()
+
+    def send(self, message):
+        """
+        Sends a message if the socket is still open
+        """
+        if self.ws_connection is not None:
+            self.write_message(json.dumps(message))
+
+    async def run_operation(self, operation, path):
+        """
+        Runs a remote operation, forwarding its progress to the client
+
+        :param operation: is "push", "pull", or "fetch"
+        :param path: is a path from the file browser used to find the repo
+        :return: None
+        """
+        loop = asyncio.get_running_loop()
+
+        def report(update):
+            loop.call_soon_threadsafe(self.send, dict(update, type="progress"))
+
+        cancel = self.cancel
+
+        async def run():
+            if cancel.is_set():
+                raise OperationCancelled(f"git {operation} was cancelled")
+            executor = get_executor()
+            strategy = get_fetch_strategy()
+            try:
+                if executor.kind == "process":
+                    # Callbacks and events can't be sent to another process
+                    result = await loop.run_in_executor(
+                        None,
+                        functools.partial(
+                            run_remote_operation,
+                            operation,
+                            report,
+                            cancel,
+                            path=repo_path,
+                            strategy=strategy,
+                        ),
+                    )
+                else:
+                    result = await executor.submit(
+                        repo_path,
+                        run_remote_operation,
+                        operation,
+                        report,
+                        cancel,
+                        path=repo_path,
+                        strategy=strategy,
+                    )
+            finally:
+                if operation == "pull":
+                    get_status_cache().invalidate(repo_path)
+            if operation == "push":
+                return f"Repo {operation} completed successfully", {}
+            get_fetch_scheduler().mark_fetched(repo_path, result)
+            return f"Repo {operation} completed successfully", {"fetch": result}
+
+        try:
+            repo_path, _ = self.resolve_repo(path)
+            # Queued with commits and plain pulls/pushes so they don't race on the index
+            job = get_job_queue().submit(repo_path, operation, run)
+            self.send({"type": "queued", "job": job.to_dict()})
+            status_message = await job.wait()
+            self.send(
+                {
+                    "type": "done",
+                    "status": 200,
+                    "statusText": status_message,
+                    "job": job.to_dict(),
+                }
+            )
+        except OperationCancelled as e:
+            self.send({"type": "cancelled", "statusText": str(e)})
+        except web.HTTPError as e:
+            self.send(
+                {"type": "error", "status": e.status_code, "statusText": e.log_message}
+            )
+        except ExecutorSaturatedError as e:
+            self.send({"type": "error", "status": 503, "statusText": str(e)})
+        except git.exc.GitError as e:
+            self.log.error(e)
+            self.send({"type": "error", "status": 500, "statusText": f"Git error: {e}"})
+        except Exception as e:
+            self.log.error(e)
+            self.send(
+                {
+                    "type": "error",
+                    "status": 500,
+                    "statusText": "An unexpected error occured.",
+                }
+            )
+        finally:
+            self.running = False
+            self.cancel = threading.Event()
+
 
-        self.write_response(200, "Repo pushed successfully")
+class StatusWebSocketHandler(WebSocketMixin, websocket.WebSocketHandler, BaseHandler):
+    """
+    Notebook Server WebSocket Handler pushing status changes of the directory being
+    browsed. Send {"action": "subscribe", "path": ..., "epoch": ..., "version": ...}
+    whenever the tree view changes directory. A full listing is sent first, then
+    only the entries that changed. Epoch and version are those of the last status
+    message received, if any, and skip the full listing when nothing changed.
+    """
+
+    async def get(self, *args, **kwargs):
+        # WebSockets skip the XSRF check so make sure the user is logged in
+        if self.current_user is None:
+            raise web.HTTPError(403)
+        return await super().get(*args, **kwargs)
+
+    def open(self, *args, **kwargs):
+        self.subscriber = StatusSubscriber(self.send)
+        return super().open(*args, **kwargs)
+
+    def on_message(self, message):
+        try:
+            request = json.loads(message)
+        except ValueError:
+            self.send({"type": "error", "statusText": "Messages must be JSON"})
+            return
+
+        action = request.get("action")
+        if action != "subscribe":
+            self.send({"type": "error", "statusText": f"Unknown action: {action}"})
+            return
+        asyncio.ensure_future(self.subscribe(request))
+
+    def on_close(self):
+        get_status_broadcaster().unsubscribe(self.subscriber)
+
+    def send(self, message):
+        """
+        Sends a message if the socket is still open
+        """
+        if self.ws_connection is not None:
+            self.write_message(json.dumps(message))
+
+    async def subscribe(self, request):
+        """
+        Follows the status of the directory being browsed
+
+        :param request: is the subscribe message
+        :return: None
+        """
+        broadcaster = get_status_broadcaster()
+        try:
+            repo_path, relative_path = self.resolve_repo(request.get("path", ""))
+        except web.HTTPError as e:
+            broadcaster.unsubscribe(self.subscriber)
+            self.send(
+                {"type": "error", "status": e.status_code, "statusText": e.log_message}
+            )
+            return
+        await broadcaster.subscribe(
+            self.subscriber,
+            repo_path,
+            relative_path,
+            epoch=request.get("epoch"),
+            version=request.get("version"),
+        )
+
+
+class DiffHandler(BaseHandler):
+    """
+    Notebook Server Handler for diffs of a file against HEAD
+    """
+
+    @web.authenticated
+    @BaseHandler.handle_exceptions
+    async def get(self):
+        """
+        Diffs a file against its last commit. Notebooks are diffed cell by cell.
+
+        :param self.request: is the incoming API request. Requires a "path" query
+            argument with the file path relative to the notebook directory. Set
+            "outputs" to 1 to compare notebook outputs and execution counts too
+        :return: Dict with the change, the kind of diff, and changed "cells" for
+            notebooks or unified diff "lines" for text files
+        """
+        file_path = self.get_query_argument("path")
+        outputs = self.get_query_argument("outputs", "0") in ("1", "true")
+        repo_path, relative_path = self.resolve_repo(file_path)
+        if not relative_path or os.path.isdir(os.path.join(repo_path, relative_path)):
+            raise web.HTTPError(400, f"Not a file: {file_path}")
+
+        diff = await self.run_git(
+            get_file_diff, relative_path, outputs=outputs, path=repo_path
+        )
+        if diff is None:
+            raise web.HTTPError(404, f"No such file in the repo: {file_path}")
+
+        items_key = "cells" if diff["kind"] == "notebook" else "lines"
+        if items_key not in diff:
+            self.write_response(200, "Diff fetched successfully", **diff)
+            return
+        await self.write_streamed_response(
+            200,
+            "Diff fetched successfully",
+            items_key,
+            diff[items_key],
+            **{key: value for key, value in diff.items() if key != items_key},
+        )
+
+
+class LogHandler(BaseHandler):
+    """
+    Notebook Server Handler for paged commit history
+    """
+
+    @web.authenticated
+    @BaseHandler.handle_exceptions
+    async def get(self):
+        """
+        Lists commits newest first, a page at a time
+
+        :param self.request: is the incoming API request. The repo is found from the
+            optional "path" query argument. Optional "file" limits history to a file or
+            directory, "limit" sets the page size, and "cursor" is the nextCursor of
+            the previous page. Pages continue from the same tip if new commits are made
+        :return: Dict with commits and the cursor of the next page
+        """
+        repo_path, _ = self.resolve_repo(self.get_query_argument("path", ""))
+        path_filter = None
+        file_path = self.get_query_argument("file", None)
+        if file_path:
+            file_repo_path, path_filter = self.resolve_repo(file_path)
+            if file_repo_path != repo_path:
+                raise web.HTTPError(400, f"{file_path} is in a different repo")
+        try:
+            limit = int(self.get_query_argument("limit", LOG_DEFAULT_LIMIT))
+        except ValueError:
+            raise web.HTTPError(400, "limit must be a number")
+        if not 0 < limit <= LOG_MAX_LIMIT:
+            raise web.HTTPError(400, f"limit must be between 1 and {LOG_MAX_LIMIT}")
+        cursor = self.get_query_argument("cursor", None)
+        if cursor is not None:
+            try:
+                decode_cursor(cursor)
+            except ValueError as e:
+                raise web.HTTPError(400, str(e))
+
+        page = await self.run_git(
+            get_log,
+            cursor=cursor,
+            limit=limit,
+            path_filter=path_filter or None,
+            path=repo_path,
+        )
+        await self.write_streamed_response(
+            200,
+            "History fetched successfully",
+            "commits",
+            page["commits"],
+            tip=page["tip"],
+            nextCursor=page["nextCursor"],
+        )
+
+
+class JobHandler(BaseHandler):
+    """
+    Notebook Server Handler for the status of queued commit, pull, and push jobs
+    """
+
+    @web.authenticated
+    @BaseHandler.handle_exceptions
+    async def get(self, job_id):
+        """
+        Reports the state of a job
+
+        :param job_id: is the id returned when the job was submitted
+        :return: Dict with the job's state and status message
+        """
+        job = get_job_queue().get(job_id)
+        if job is None:
+            raise web.HTTPError(404, f"Unknown job: {job_id}")
+        self.write_response(200, "Job status fetched successfully", job=job.to_dict())
+
+
+class ExecutorHandler(BaseHandler):
+    """
+    Notebook Server Handler for git worker pool load
+    """
+
+    @web.authenticated
+    @BaseHandler.handle_exceptions
+    async def get(self):
+        """
+        Reports how busy the git worker pool is
+
+        :return: Dict with in flight operations and saturation
+        """
+        self.write_response(
+            200, "Executor status fetched successfully", executor=get_executor().stats()
+        )
+
+
+class StatusCacheHandler(BaseHandler):
+    """
+    Notebook Server Handler for repo status cache counters
+    """
+
+    @web.authenticated
+    @BaseHandler.handle_exceptions
+    async def get(self):
+        """
+        Reports status cache size and hit/miss counts
+
+        :return: Dict with cache counters
+        """
+        self.write_response(
+            200, "Cache status fetched successfully", cache=get_status_cache().stats()
+        )
+
+
+class RepoPoolHandler(BaseHandler):
+    """
+    Notebook Server Handler for open repo counts
+    """
+
+    @web.authenticated
+    @BaseHandler.handle_exceptions
+    async def get(self):
+        """
+        Reports how many repos are open and how many git helper processes they hold
+
+        :return: Dict with repo pool counters
+        """
+        self.write_response(
+            200,
+            "Repo pool status fetched successfully",
+            repoPool=get_repo_pool().stats(),
+        )
+
+
+class MetricsHandler(BaseHandler):
+    """
+    Notebook Server Handler for Prometheus style metrics
+    """
+
+    @web.authenticated
+    @BaseHandler.handle_exceptions
+    async def get(self):
+        """
+        Reports request and git operation latency histograms, git process counts,
+        and cache, pool, and executor counters in the Prometheus text format
+
+        :return: Prometheus text exposition
+        """
+        cache = get_status_cache().stats()
+        executor = get_executor().stats()
+        pool = get_repo_pool().stats()
+        diff_cache = get_diff_cache().stats()
+        log_cache = get_log_cache().stats()
+        ref_cache = get_ref_cache().stats()
+        samples = [
+            (
+                "jupyter_git_status_cache_hits_total",
+                "counter",
+                "Repo status lookups answered from the cache",
+                {},
+                cache["hits"],
+            ),
+            (
+                "jupyter_git_status_cache_misses_total",
+                "counter",
+                "Repo status lookups that ran git",
+                {},
+                cache["misses"],
+            ),
+            (
+                "jupyter_git_status_cache_hit_ratio",
+                "gauge",
+                "Fraction of repo status lookups answered from the cache",
+                {},
+                cache["hitRate"],
+            ),
+            (
+                "jupyter_git_status_cache_entries",
+                "gauge",
+                "Repos with a cached status",
+                {},
+                cache["entries"],
+            ),
+            (
+                "jupyter_git_executor_in_flight",
+                "gauge",
+                "git operations queued or running in the worker pool",
+                {},
+                executor["inFlight"],
+            ),
+            (
+                "jupyter_git_executor_rejected_total",
+                "counter",
+                "git operations rejected because their repo's queue was full",
+                {},
+                executor["rejected"],
+            ),
+            (
+                "jupyter_git_repo_pool_open_repos",
+                "gauge",
+                "Open git repo objects",
+                {},
+                pool["openRepos"],
+            ),
+            (
+                "jupyter_git_repo_pool_helper_processes",
+                "gauge",
+                "Long running git cat-file helper processes",
+                {},
+                pool["helperProcesses"],
+            ),
+            (
+                "jupyter_git_diff_cache_hits_total",
+                "counter",
+                "File diffs answered from the diff cache",
+                {},
+                diff_cache["hits"],
+            ),
+            (
+                "jupyter_git_diff_cache_misses_total",
+                "counter",
+                "File diffs computed",
+                {},
+                diff_cache["misses"],
+            ),
+            (
+                "jupyter_git_log_cache_hits_total",
+                "counter",
+                "History pages answered from the log cache",
+                {},
+                log_cache["hits"],
+            ),
+            (
+                "jupyter_git_log_cache_misses_total",
+                "counter",
+                "History pages read with git log",
+                {},
+                log_cache["misses"],
+            ),
+            (
+                "jupyter_git_ref_cache_hits_total",
+                "counter",
+                "Branch listings answered from the ref cache",
+                {},
+                ref_cache["hits"],
+            ),
+            (
+                "jupyter_git_ref_cache_misses_total",
+                "counter",
+                "Branch listings read from ref files",
+                {},
+                ref_cache["misses"],
+            ),
+            (
+                "jupyter_git_fetches_total",
+                "counter",
+                "Scheduled fetches from origin",
+                {},
+                get_fetch_scheduler().fetches,
+            ),
+        ]
+        operations = sorted(get_single_flight().stats()["operations"].items())
+        for name, help_text in (
+            ("started", "Identical git queries computed"),
+            ("coalesced", "Requests answered by an identical query already in flight"),
+            ("rejected", "Requests rejected because too many were waiting on a query"),
+        ):
+            for operation, counts in operations:
+                samples.append(
+                    (
+                        f"jupyter_git_single_flight_{name}_total",
+                        "counter",
+                        help_text,
+                        {"operation": operation},
+                        counts[name],
+                    )
+                )
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.write(get_metrics().render(samples))
@@ -0,0 +1,165 @@
+"""
+Paged commit history read straight from git log
+"""
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+_log_cache = None
+
+# Commits are separated by record separators and fields by unit separators so
+# subjects and names can't be confused with the layout
+LOG_FORMAT = "%H%x1f%P%x1f%an%x1f%ae%x1f%at%x1f%s%x1e"
+
+# Ex. "<tip sha>:<number of commits already returned>"
+CURSOR_PATTERN = re.compile(r"^([0-9a-f]{40}|[0-9a-f]{64}):(\d+)$")
+
+
+def encode_cursor(tip, offset):
+    """
+    :param tip: is the SHA the history is walked from
+    :param offset: is the number of commits already returned
+    :return: opaque cursor for the next page
+    """
+    return f"{tip}:{offset}"
+
+
+def decode_cursor(cursor):
+    """
+    :param cursor: is a cursor returned with an earlier page
+    :return: tuple of the tip SHA and offset
+    """
+    match = CURSOR_PATTERN.match(cursor or "")
+    if match is None:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return match.group(1), int(match.group(2))
+
+
+def _parse_commit(record):
+    sha, parents, author_name, author_email, timestamp, summary = record.split("\x1f")
+    return {
+        "sha": sha,
+        "parents": parents.split(),
+        "authorName": author_name,
+        "authorEmail": author_email,
+        "timestamp": datetime.utcfromtimestamp(int(timestamp)).strftime(
+            "%Y-%m-%dT%H:%M:%S.%fZ"
+        ),
+        "summary": summary,
+    }
+
+
+def read_log(repo, tip, offset, limit, path_filter=None, follow=False):
+    """
+    Reads a page of history. git stops walking once the page is read, so pages
+    near the tip are cheap regardless of how long the history is.
+
+    :param repo: is the git.Repo to read history from
+    :param tip: is the SHA to walk history from
+    :param offset: is the number of commits to skip
+    :param limit: is the number of commits to read
+    :param path_filter: is an optional repo relative path to limit history to
+    :param follow: is whether to follow path_filter across renames
+    :return: list of commit dicts, with one more than limit if there are more
+    """
+    args = [f"--format={LOG_FORMAT}", f"--skip={offset}", f"--max-count={limit + 1}"]
+    if follow:
+        args.append("--follow")
+    args += [tip, "--"]
+    if path_filter:
+        args.append(path_filter)
+
+    handle = repo.git.log(*args, as_process=True, env={"GIT_LITERAL_PATHSPECS": "1"})
+    commits = []
+    buffer = b""
+    for chunk in iter(lambda: handle.proc.stdout.read(65536), b""):
+        *records, buffer = (buffer + chunk).split(b"\x1e")
+        for record in records:
+            record = record.strip(b"\n").decode("utf-8", "replace")
+            if record:
+                commits.append(_parse_commit(record))
+    handle.wait()
+    return commits
+
+
+class LogCache:
+    """
+    Pages of history keyed by the tip SHA they were walked from, which fixes their
+    contents, so paging back and forth doesn't walk history again
+    """
+
+    def __init__(self, max_pages=128):
+        """
+        :param max_pages: is the number of pages to keep
+        """
+        self.max_pages = max_pages
+        self._lock = threading.Lock()
+        self._pages = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        :param key: is a tuple of the repo, tip SHA, path filter, offset, and limit
+        :return: the cached page or None on a miss
+        """
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None:
+                self.misses += 1
+                return None
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return page
+
+    def put(self, key, page):
+        """
+        :param key: is the key passed to get()
+        :param page: is the page to store
+        :return: None
+        """
+        if not self.max_pages:
+            return
+        with self._lock:
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+
+    def stats(self):
+        """
+        :return: Dict with the number of cached pages and hit/miss counts
+        """
+        with self._lock:
+            return {"pages": len(self._pages), "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        """
+        Drops all pages and resets counters
+        """
+        with self._lock:
+            self._pages.clear()
+            self.hits = self.misses = 0
+
+
+def get_log_cache():
+    """
+    Returns the process wide log cache
+    """
+    global _log_cache
+    if _log_cache is None:
+        _log_cache = LogCache()
+    return _log_cache
+
+
+def configure_log_cache(config):
+    """
+    Replaces the process wide log cache with one built from the extension config
+
+    :param config: is a GitExtensionConfig
+    :return: the new LogCache
+    """
+    global _log_cache
+    _log_cache = LogCache(max_pages=config.log_cache_max_pages)
+    return _log_cache
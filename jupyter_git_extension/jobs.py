@@ -0,0 +1,195 @@
+"""
+Queue of commit, pull, and push jobs so requests return before git finishes
+"""
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+import git
+
+from .executor import ExecutorSaturatedError
+from .progress import OperationCancelled
+
+_job_queue = None
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+def _timestamp(seconds):
+    if seconds is None:
+        return None
+    return datetime.utcfromtimestamp(seconds).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def describe_error(error):
+    """
+    :param error: is an exception raised by a job
+    :return: message for the UI, matching what the handlers report for the same error
+    """
+    if isinstance(error, git.exc.GitError):
+        return f"Git error: {error}"
+    if isinstance(error, (ExecutorSaturatedError, OperationCancelled)):
+        return str(error)
+    return "An unexpected error occured."
+
+
+class Job:
+    """
+    A single git operation submitted to the queue
+    """
+
+    def __init__(self, kind, repo):
+        """
+        :param kind: is the operation, ex. "commit"
+        :param repo: is the absolute path to the repo the job runs against
+        """
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.repo = repo
+        self.state = QUEUED
+        self.status_text = f"Waiting to {kind}"
+        self.error = None
+        self.result = {}
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.task = None
+
+    @property
+    def finished(self):
+        return self.state in (SUCCEEDED, FAILED)
+
+    async def wait(self):
+        """
+        Waits for the job to finish
+
+        :return: the job's status message. Raises the job's exception if it failed
+        """
+        await asyncio.shield(self.task)
+        if self.error is not None:
+            raise self.error
+        return self.status_text
+
+    def to_dict(self):
+        """
+        :return: JSON serializable job status
+        """
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "repo": self.repo,
+            "state": self.state,
+            "statusText": self.status_text,
+            "result": self.result,
+            "createdAt": _timestamp(self.created_at),
+            "startedAt": _timestamp(self.started_at),
+            "finishedAt": _timestamp(self.finished_at),
+        }
+
+
+class JobQueue:
+    """
+    Runs jobs one at a time per repo, so concurrent commits from several tabs don't
+    race on the index lock, while jobs for different repos run in parallel. Status
+    of the last max_history finished jobs is kept for clients to poll.
+    """
+
+    def __init__(self, max_history=100):
+        """
+        :param max_history: is the number of finished jobs to remember
+        """
+        self.max_history = max_history
+        # job id -> Job, oldest first
+        self._jobs = OrderedDict()
+        # repo -> task of the last job submitted for it
+        self._tails = {}
+
+    def submit(self, repo, kind, run):
+        """
+        Queues a job behind any other jobs for the same repo
+
+        :param repo: is the path to the repo the job runs against
+        :param kind: is the operation, ex. "commit"
+        :param run: is a coroutine function returning the job's success message and
+            a dict of results to report, ex. timings
+        :return: the queued Job
+        """
+        repo = os.path.abspath(repo)
+        job = Job(kind, repo)
+        previous = self._tails.get(repo)
+        job.task = asyncio.ensure_future(self._run(job, previous, run))
+        self._tails[repo] = job.task
+        job.task.add_done_callback(lambda task: self._finished(job))
+        self._jobs[job.id] = job
+        return job
+
+    async def _run(self, job, previous, run):
+        if previous is not None and not previous.done():
+            # Jobs never raise, so this only waits for the previous job to finish
+            await asyncio.wait([previous])
+        job.state = RUNNING
+        job.status_text = f"Running {job.kind}"
+        job.started_at = time.time()
+        try:
+            job.status_text, job.result = await run()
+            job.state = SUCCEEDED
+        except Exception as e:
+            job.error = e
+            job.status_text = describe_error(e)
+            job.state = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def _finished(self, job):
+        if self._tails.get(job.repo) is job.task:
+            del self._tails[job.repo]
+        if not job.finished:
+            # Cancelled before it ran, ex. the event loop shut down
+            job.state = FAILED
+            job.status_text = f"{job.kind} was cancelled"
+            job.finished_at = time.time()
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[: max(len(finished) - self.max_history, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        """
+        :param job_id: is the id of a submitted job
+        :return: the Job or None if it is unknown or was dropped from history
+        """
+        return self._jobs.get(job_id)
+
+    def clear(self):
+        """
+        Forgets all jobs. Running jobs finish but are no longer reported.
+        """
+        self._jobs.clear()
+        self._tails.clear()
+
+
+def get_job_queue():
+    """
+    Returns the process wide job queue
+    """
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue()
+    return _job_queue
+
+
+def configure_job_queue(config):
+    """
+    Replaces the process wide job queue with one built from the extension config
+
+    :param config: is a GitExtensionConfig
+    :return: the new JobQueue
+    """
+    global _job_queue
+    _job_queue = JobQueue(max_history=config.job_history_size)
+    return _job_queue
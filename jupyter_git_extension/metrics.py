@@ -0,0 +1,271 @@
+"""
+Prometheus style metrics for the git handlers and the git commands they run
+"""
+import contextlib
+import shlex
+import threading
+import time
+
+import git
+
+_metrics = None
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUEST_DURATION = "jupyter_git_request_duration_seconds"
+OPERATION_DURATION = "jupyter_git_operation_duration_seconds"
+SUBPROCESSES = "jupyter_git_subprocesses_total"
+FETCH_RECEIVED_BYTES = "jupyter_git_fetch_received_bytes_total"
+
+# name -> (type, help) of the metrics recorded through the registry
+METRICS = {
+    REQUEST_DURATION: ("histogram", "Time spent handling git extension requests"),
+    OPERATION_DURATION: (
+        "histogram",
+        "Time spent in git operations run by the handlers, ex. diff or fetch",
+    ),
+    SUBPROCESSES: ("counter", "git processes started, by git subcommand"),
+    FETCH_RECEIVED_BYTES: (
+        "counter",
+        "Bytes of objects received from origin, by operation and fetch strategy",
+    ),
+}
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Cumulative bucket counts of observed values
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        :param buckets: is a sorted tuple of bucket upper bounds
+        """
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """
+        :param value: is the value to record
+        :return: None
+        """
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Latency histograms and counters keyed by metric name and labels, rendered in
+    the Prometheus text exposition format
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        :param buckets: is a sorted tuple of histogram bucket upper bounds in seconds
+        """
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # (name, sorted label items) -> Histogram
+        self._histograms = {}
+        # (name, sorted label items) -> count
+        self._counters = {}
+
+    def observe(self, name, value, **labels):
+        """
+        Records a value in a histogram
+
+        :param name: is the metric name
+        :param value: is the value to record, ex. seconds
+        :param labels: are the labels identifying the series
+        :return: None
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def increment(self, name, amount=1, **labels):
+        """
+        Adds to a counter
+
+        :param name: is the metric name
+        :param amount: is the amount to add
+        :param labels: are the labels identifying the series
+        :return: None
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextlib.contextmanager
+    def time(self, name, **labels):
+        """
+        Records how long a with block takes in a histogram
+
+        :param name: is the metric name
+        :param labels: are the labels identifying the series
+        :return: context manager
+        """
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - start, **labels)
+
+    def render(self, samples=()):
+        """
+        :param samples: is a list of (name, type, help, labels dict, value) for values
+            read from elsewhere at render time, ex. cache sizes
+        :return: all metrics in the Prometheus text exposition format
+        """
+        lines = []
+        with self._lock:
+            histograms = sorted(
+                (key, list(h.counts), h.sum, h.count)
+                for key, h in self._histograms.items()
+            )
+            counters = sorted(self._counters.items())
+
+        described = set()
+
+        def describe(name, kind, help_text):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), counts, total, count in histograms:
+            describe(name, *METRICS.get(name, ("histogram", name)))
+            for bound, bucket_count in zip(self.buckets, counts):
+                bucket_labels = labels + (("le", _format_value(float(bound))),)
+                lines.append(
+                    f"{name}_bucket{_format_labels(bucket_labels)} {bucket_count}"
+                )
+            lines.append(
+                f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}"
+            )
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        for (name, labels), value in counters:
+            describe(name, *METRICS.get(name, ("counter", name)))
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for name, kind, help_text, labels, value in samples:
+            describe(name, kind, help_text)
+            lines.append(
+                f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}"
+            )
+
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """
+        :return: picklable copy of all recorded values, ex. to send them from a worker
+            process to the server's registry with merge()
+        """
+        with self._lock:
+            return {
+                "histograms": [
+                    (key, list(h.counts), h.sum, h.count)
+                    for key, h in self._histograms.items()
+                ],
+                "counters": list(self._counters.items()),
+            }
+
+    def merge(self, snapshot):
+        """
+        Adds values recorded in another registry with the same buckets
+
+        :param snapshot: is a Dict returned by snapshot()
+        :return: None
+        """
+        with self._lock:
+            for key, counts, total, count in snapshot["histograms"]:
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(self.buckets)
+                histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+                histogram.sum += total
+                histogram.count += count
+            for key, value in snapshot["counters"]:
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    def clear(self):
+        """
+        Drops all recorded values
+        """
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def get_metrics():
+    """
+    Returns the process wide metrics registry
+    """
+    global _metrics
+    if _metrics is None:
+        _metrics = MetricsRegistry()
+    return _metrics
+
+
+def git_subcommand(command):
+    """
+    :param command: is a git command line as a list or string
+    :return: the git subcommand being run, ex. "status"
+    """
+    if isinstance(command, str):
+        command = shlex.split(command)
+    arguments = iter(command[1:])
+    for argument in arguments:
+        if argument in ("-c", "-C"):
+            # Options taking a value
+            next(arguments, None)
+        elif not argument.startswith("-"):
+            return argument
+    return "unknown"
+
+
+class InstrumentedGit(git.Git):
+    """
+    git.Git that counts the git processes it starts
+    """
+
+    __slots__ = ()
+
+    def execute(self, command, *args, **kwargs):
+        get_metrics().increment(SUBPROCESSES, command=git_subcommand(command))
+        return super().execute(command, *args, **kwargs)
+
+
+class InstrumentedRepo(git.Repo):
+    """
+    git.Repo whose git commands are counted
+    """
+
+    GitCommandWrapperType = InstrumentedGit
@@ -0,0 +1,230 @@
+"""
+Diffs of worktree files against HEAD, cell by cell for notebooks
+"""
+import difflib
+import json
+import threading
+from collections import OrderedDict
+
+_diff_cache = None
+
+# Lines of context around changed lines, like git diff
+CONTEXT_LINES = 3
+
+
+def _text(value):
+    # Notebook text fields are either a string or a list of lines
+    return "".join(value) if isinstance(value, list) else value or ""
+
+
+def _output_text(output):
+    """
+    :param output: is a notebook cell output
+    :return: readable text of the output. Rich outputs are summarized by mime type
+    """
+    output_type = output.get("output_type")
+    if output_type == "stream":
+        return _text(output.get("text"))
+    if output_type == "error":
+        return f"{output.get('ename')}: {output.get('evalue')}\n"
+    data = output.get("data", {})
+    if "text/plain" in data:
+        return _text(data["text/plain"])
+    return "".join(f"<{mime_type}>\n" for mime_type in sorted(data))
+
+
+def cell_text(cell, outputs=False):
+    """
+    :param cell: is a notebook cell
+    :param outputs: is whether to include the cell's outputs
+    :return: the text the cell is compared by
+    """
+    text = _text(cell.get("source"))
+    if outputs and cell.get("outputs"):
+        if not text.endswith("\n"):
+            text += "\n"
+        text += "--- outputs ---\n"
+        text += "".join(_output_text(output) for output in cell["outputs"])
+    return text
+
+
+def unified_lines(old_text, new_text):
+    """
+    :param old_text: is the text before the change
+    :param new_text: is the text after the change
+    :return: list of unified diff lines without the file headers
+    """
+    lines = difflib.unified_diff(
+        old_text.splitlines(),
+        new_text.splitlines(),
+        lineterm="",
+        n=CONTEXT_LINES,
+    )
+    return list(lines)[2:]
+
+
+def diff_notebooks(old, new, outputs=False):
+    """
+    Matches cells between two versions of a notebook and diffs the changed ones
+
+    :param old: is the notebook dict before the change, None if it was added
+    :param new: is the notebook dict after the change, None if it was deleted
+    :param outputs: is whether outputs are compared. Otherwise outputs and
+        execution counts are ignored so re-running a notebook isn't a change
+    :return: Dict with a list of changed cells and the number of unchanged cells
+    """
+    old_cells = (old or {}).get("cells", [])
+    new_cells = (new or {}).get("cells", [])
+    old_keys = [(c.get("cell_type"), cell_text(c, outputs)) for c in old_cells]
+    new_keys = [(c.get("cell_type"), cell_text(c, outputs)) for c in new_cells]
+
+    cells = []
+    unchanged = 0
+
+    def add(change, old_index, new_index):
+        old_text = old_keys[old_index][1] if old_index is not None else ""
+        new_text = new_keys[new_index][1] if new_index is not None else ""
+        cell = new_cells[new_index] if new_index is not None else old_cells[old_index]
+        cells.append(
+            {
+                "change": change,
+                "cellType": cell.get("cell_type"),
+                "oldIndex": old_index,
+                "newIndex": new_index,
+                "diff": unified_lines(old_text, new_text),
+            }
+        )
+
+    matcher = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == "equal":
+            unchanged += old_end - old_start
+            continue
+        # Cells replaced in place are edits, any left over were added or deleted
+        paired = min(old_end - old_start, new_end - new_start)
+        for offset in range(paired):
+            add("modified", old_start + offset, new_start + offset)
+        for old_index in range(old_start + paired, old_end):
+            add("deleted", old_index, None)
+        for new_index in range(new_start + paired, new_end):
+            add("added", None, new_index)
+
+    return {
+        "cells": cells,
+        "unchangedCells": unchanged,
+        "metadataChanged": (old or {}).get("metadata") != (new or {}).get("metadata"),
+    }
+
+
+def diff_contents(old, new, notebook=False, outputs=False):
+    """
+    :param old: is the bytes before the change, None if the file was added
+    :param new: is the bytes after the change, None if the file was deleted
+    :param notebook: is whether the file is a notebook to diff cell by cell
+    :param outputs: is whether notebook outputs are compared
+    :return: Dict with the kind of diff ("notebook", "text" or "binary") and the diff
+    """
+    if b"\0" in (old or b"")[:8000] or b"\0" in (new or b"")[:8000]:
+        return {"kind": "binary"}
+    old_text = (old or b"").decode("utf-8", "replace")
+    new_text = (new or b"").decode("utf-8", "replace")
+    if notebook:
+        try:
+            return dict(
+                diff_notebooks(
+                    json.loads(old_text) if old is not None else None,
+                    json.loads(new_text) if new is not None else None,
+                    outputs=outputs,
+                ),
+                kind="notebook",
+            )
+        except ValueError:
+            # Not valid notebook JSON, ex. a conflicted merge. Show it as text
+            pass
+    return {"kind": "text", "lines": unified_lines(old_text, new_text)}
+
+
+class DiffCache:
+    """
+    Computed diffs keyed by the HEAD blob SHA and the worktree file's mtime and size,
+    so a file is only diffed again after it is saved or committed
+    """
+
+    def __init__(self, max_entries=256):
+        """
+        :param max_entries: is the number of diffs to keep
+        """
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._diffs = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        :param key: is a tuple of the file, HEAD blob SHA, worktree stat, and options
+        :return: the cached diff or None on a miss
+        """
+        with self._lock:
+            diff = self._diffs.get(key)
+            if diff is None:
+                self.misses += 1
+                return None
+            self._diffs.move_to_end(key)
+            self.hits += 1
+            return diff
+
+    def put(self, key, diff):
+        """
+        :param key: is the key passed to get()
+        :param diff: is the diff to store
+        :return: None
+        """
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._diffs[key] = diff
+            self._diffs.move_to_end(key)
+            while len(self._diffs) > self.max_entries:
+                self._diffs.popitem(last=False)
+
+    def stats(self):
+        """
+        :return: Dict with the number of cached diffs and hit/miss counts
+        """
+        with self._lock:
+            return {
+                "entries": len(self._diffs),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def clear(self):
+        """
+        Drops all diffs and resets counters
+        """
+        with self._lock:
+            self._diffs.clear()
+            self.hits = self.misses = 0
+
+
+def get_diff_cache():
+    """
+    Returns the process wide diff cache
+    """
+    global _diff_cache
+    if _diff_cache is None:
+        _diff_cache = DiffCache()
+    return _diff_cache
+
+
+def configure_diff_cache(config):
+    """
+    Replaces the process wide diff cache with one built from the extension config
+
+    :param config: is a GitExtensionConfig
+    :return: the new DiffCache
+    """
+    global _diff_cache
+    _diff_cache = DiffCache(max_entries=config.diff_cache_max_entries)
+    return _diff_cache
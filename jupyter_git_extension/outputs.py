@@ -0,0 +1,183 @@
+"""
+Stripping of notebook outputs from commits so images and logs don't bloat history
+"""
+import json
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import InstrumentedGit
+
+_output_stripper = None
+
+OUTPUT_STRIP_MODES = ("none", "strip", "cap")
+
+
+def strip_notebook(notebook, mode="strip", max_output_size=100000):
+    """
+    Clears execution counts and removes outputs of code cells
+
+    :param notebook: is the notebook dict, changed in place
+    :param mode: is "strip" to remove every output or "cap" to only replace outputs
+        larger than max_output_size with a note of their size
+    :param max_output_size: is the number of bytes of JSON an output can take in "cap" mode
+    :return: the notebook
+    """
+    for cell in notebook.get("cells", []):
+        if cell.get("cell_type") != "code":
+            continue
+        cell["execution_count"] = None
+        if mode == "strip":
+            cell["outputs"] = []
+            continue
+        outputs = []
+        for output in cell.get("outputs", []):
+            size = len(json.dumps(output))
+            if size > max_output_size:
+                output = {
+                    "output_type": "stream",
+                    "name": "stdout",
+                    "text": [f"[{size} byte output removed on commit]\n"],
+                }
+            elif "execution_count" in output:
+                output["execution_count"] = None
+            outputs.append(output)
+        cell["outputs"] = outputs
+    return notebook
+
+
+def serialize_notebook(notebook):
+    """
+    :param notebook: is the notebook dict
+    :return: bytes of the notebook formatted like Jupyter saves it
+    """
+    text = json.dumps(notebook, sort_keys=True, indent=1, ensure_ascii=False)
+    return (text + "\n").encode("utf-8")
+
+
+class OutputStripper:
+    """
+    Rewrites staged notebooks without their outputs before a commit. Only the index
+    is changed, notebooks in the worktree keep their outputs.
+    """
+
+    def __init__(self, mode="none", max_output_size=100000, max_workers=4):
+        """
+        :param mode: is "none" to commit notebooks as they are, "strip" to remove all
+            outputs, or "cap" to remove outputs larger than max_output_size
+        :param max_output_size: is the number of bytes of JSON an output can take in "cap" mode
+        :param max_workers: is the number of notebooks processed at once
+        """
+        self.mode = mode
+        self.max_output_size = max_output_size
+        self.max_workers = max_workers
+
+    def with_mode(self, mode):
+        """
+        :param mode: is the mode to use instead of the configured one
+        :return: an OutputStripper with the same limits
+        """
+        return OutputStripper(mode, self.max_output_size, self.max_workers)
+
+    def _strip_blob(self, git_cmd, file_mode, sha, path):
+        content = git_cmd.execute(
+            ["git", "cat-file", "blob", sha], stdout_as_string=False
+        )
+        try:
+            notebook = json.loads(content)
+        except ValueError:
+            # Not a valid notebook, ex. a conflicted merge. Commit it as it is
+            return None
+        stripped = serialize_notebook(
+            strip_notebook(notebook, self.mode, self.max_output_size)
+        )
+        if stripped == content:
+            return None
+        with tempfile.TemporaryFile() as blob:
+            blob.write(stripped)
+            blob.seek(0)
+            # Filters would see a path-less blob, the contents are already clean
+            stripped_sha = git_cmd.hash_object(
+                "-w", "--no-filters", "--stdin", istream=blob
+            )
+        return file_mode, stripped_sha, path, len(content), len(stripped)
+
+    def strip_staged(self, repo):
+        """
+        Strips outputs from every notebook added or modified in the index
+
+        :param repo: is the git.Repo about to be committed
+        :return: Dict with the number of notebooks checked and stripped, and their
+            bytes before and after stripping
+        """
+        output = repo.git.diff(
+            "--cached",
+            "--raw",
+            "-z",
+            "--no-renames",
+            "--no-abbrev",
+            "--diff-filter=AM",
+            "--",
+            "*.ipynb",
+        )
+        fields = output.split("\0")
+        staged = []
+        for status, path in zip(fields[0::2], fields[1::2]):
+            _, file_mode, _, sha, _ = status.lstrip(":").split(" ")
+            staged.append((file_mode, sha, path))
+
+        # git.Repo isn't thread safe, so each worker runs git through its own wrapper
+        workers = threading.local()
+
+        def strip_blob(entry):
+            if not hasattr(workers, "git"):
+                workers.git = InstrumentedGit(repo.working_tree_dir)
+            return self._strip_blob(workers.git, *entry)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(strip_blob, staged))
+        stripped = [result for result in results if result is not None]
+
+        if stripped:
+            with tempfile.TemporaryFile() as index_info:
+                for file_mode, sha, path, _, _ in stripped:
+                    index_info.write(f"{file_mode} {sha}\t{path}\0".encode("utf-8"))
+                index_info.seek(0)
+                repo.git.update_index("-z", "--index-info", istream=index_info)
+
+        before = sum(result[3] for result in stripped)
+        after = sum(result[4] for result in stripped)
+        return {
+            "mode": self.mode,
+            "notebooks": len(staged),
+            "stripped": len(stripped),
+            "bytesBefore": before,
+            "bytesAfter": after,
+            "bytesSaved": before - after,
+        }
+
+
+def get_output_stripper():
+    """
+    Returns the process wide output stripper
+    """
+    global _output_stripper
+    if _output_stripper is None:
+        _output_stripper = OutputStripper()
+    return _output_stripper
+
+
+def configure_output_stripper(config):
+    """
+    Replaces the process wide output stripper with one built from the extension config
+
+    :param config: is a GitExtensionConfig
+    :return: the new OutputStripper
+    """
+    global _output_stripper
+    _output_stripper = OutputStripper(
+        mode=config.commit_strip_outputs,
+        max_output_size=config.commit_output_max_size,
+        max_workers=config.executor_max_workers,
+    )
+    return _output_stripper
@@ -0,0 +1,151 @@
+"""
+Progress reporting and cancellation for long running remote git commands
+"""
+import re
+import threading
+import time
+
+import git
+from git.util import RemoteProgress
+
+# git arguments for each remote operation that can be streamed
+REMOTE_OPERATIONS = {
+    "push": ("push", "--progress", "origin"),
+    "pull": ("pull", "--progress"),
+    "fetch": ("fetch", "--progress", "origin"),
+}
+
+OPERATION_NAMES = {
+    RemoteProgress.COUNTING: "Counting objects",
+    RemoteProgress.COMPRESSING: "Compressing objects",
+    RemoteProgress.WRITING: "Writing objects",
+    RemoteProgress.RECEIVING: "Receiving objects",
+    RemoteProgress.RESOLVING: "Resolving deltas",
+    RemoteProgress.FINDING_SOURCES: "Finding sources",
+    RemoteProgress.CHECKING_OUT: "Checking out files",
+}
+
+# Ex. "1.20 MiB | 2.00 MiB/s"
+TRANSFER_PATTERN = re.compile(r"([\d.]+ \w+)\s*\|\s*([\d.]+ \w+/s)")
+
+
+class OperationCancelled(Exception):
+    """
+    Raised when a running git command was cancelled
+    """
+
+
+class StreamingProgress(RemoteProgress):
+    """
+    Passes parsed git progress to a callback as plain dicts. Updates within an
+    operation are throttled so slow clients aren't flooded.
+    """
+
+    def __init__(self, report, min_interval=0.1):
+        """
+        :param report: is called with a dict for each progress update
+        :param min_interval: is the minimum seconds between updates within an operation
+        """
+        super().__init__()
+        self.report = report
+        self.min_interval = min_interval
+        self._last_report = 0.0
+
+    def update(self, op_code, cur_count, max_count=None, message=""):
+        if op_code & self.BEGIN:
+            stage = "begin"
+        elif op_code & self.END:
+            stage = "end"
+        else:
+            stage = "running"
+            now = time.monotonic()
+            if now - self._last_report < self.min_interval:
+                return
+            self._last_report = now
+
+        update = {
+            "operation": OPERATION_NAMES.get(op_code & self.OP_MASK, "Working"),
+            "stage": stage,
+            "current": cur_count,
+            "total": max_count,
+            "percent": round(100 * cur_count / max_count) if max_count else None,
+            "transferred": None,
+            "rate": None,
+        }
+        transfer = TRANSFER_PATTERN.search(message or "")
+        if transfer:
+            update["transferred"], update["rate"] = transfer.groups()
+        self.report(update)
+
+
+def run_with_progress(repo, args, progress, cancel, output=None):
+    """
+    Runs a git command, feeding its progress output to a RemoteProgress
+
+    :param repo: is the git.Repo to run the command in
+    :param args: is the git command and its arguments, ex. ("push", "--progress", "origin")
+    :param progress: is a RemoteProgress to parse progress lines with
+    :param cancel: is a threading.Event. The command is terminated once it is set
+    :param output: is an optional list every line of progress output is appended to
+    :return: stdout of the command
+    """
+    command, *arguments = args
+    handle = getattr(repo.git, command)(*arguments, as_process=True)
+    process = handle.proc
+    finished = threading.Event()
+
+    def watch_for_cancel():
+        while not finished.wait(0.1):
+            if cancel.is_set():
+                process.terminate()
+                return
+
+    stdout = []
+
+    def drain_stdout():
+        # Keep stdout from filling its pipe and stalling git while stderr is read
+        stdout.append(process.stdout.read())
+
+    watchers = [
+        threading.Thread(target=watch_for_cancel, daemon=True),
+        threading.Thread(target=drain_stdout, daemon=True),
+    ]
+    for watcher in watchers:
+        watcher.start()
+
+    handle_message = progress.new_message_handler()
+
+    def handle_line(line):
+        if output is not None:
+            output.append(line)
+        handle_message(line)
+
+    buffer = b""
+    try:
+        while True:
+            chunk = process.stderr.read1(4096)
+            if not chunk:
+                break
+            # Progress lines are redrawn with carriage returns
+            lines = re.split(rb"[\r\n]", buffer + chunk)
+            buffer = lines.pop()
+            for line in lines:
+                if line:
+                    handle_line(line.decode("utf-8", "replace"))
+        if buffer:
+            handle_line(buffer.decode("utf-8", "replace"))
+        status = process.wait()
+    finally:
+        finished.set()
+        for watcher in watchers:
+            watcher.join()
+
+    if cancel.is_set():
+        raise OperationCancelled(f"git {command} was cancelled")
+    if status != 0:
+        raise git.exc.GitCommandError(
+            ["git", *args],
+            status,
+            stderr="\n".join(progress.error_lines + progress.other_lines),
+        )
+    return b"".join(stdout).decode("utf-8", "replace")
@@ -0,0 +1,250 @@
+"""
+Branch listing read straight from ref files so large numbers of branches list quickly
+"""
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from .repo_pool import get_repo_pool
+from .status import find_common_dir, find_git_dir
+
+_ref_cache = None
+
+# Ref namespaces listed as local and remote-tracking branches
+BRANCH_NAMESPACES = ("refs/heads/", "refs/remotes/")
+
+
+def ref_fingerprint(common_dir):
+    """
+    Stats packed-refs and every directory of loose branch refs. git writes loose refs
+    to a lock file renamed over the ref, which changes the directory's mtime, so this
+    changes whenever a branch is created, deleted, or moved.
+
+    :param common_dir: is the path to the common git directory
+    :return: tuple that changes whenever any branch changes
+    """
+    signature = []
+    try:
+        stat = os.stat(os.path.join(common_dir, "packed-refs"))
+        signature.append((stat.st_mtime_ns, stat.st_size))
+    except OSError:
+        signature.append(None)
+    for namespace in BRANCH_NAMESPACES:
+        for directory, _, _ in os.walk(os.path.join(common_dir, namespace)):
+            try:
+                signature.append((directory, os.stat(directory).st_mtime_ns))
+            except OSError:
+                pass
+    return tuple(signature)
+
+
+def read_refs(common_dir):
+    """
+    Reads branch refs without starting any git processes. Loose refs take precedence
+    over packed ones, like git resolves them. Symbolic refs, ex. origin/HEAD, are skipped.
+
+    :param common_dir: is the path to the common git directory
+    :return: Dict of full ref name -> SHA
+    """
+    refs = {}
+    try:
+        with open(os.path.join(common_dir, "packed-refs")) as f:
+            for line in f:
+                # Header lines start with "#" and peeled tags with "^"
+                if line.startswith(("#", "^")):
+                    continue
+                sha, _, refname = line.rstrip("\n").partition(" ")
+                if refname.startswith(BRANCH_NAMESPACES):
+                    refs[refname] = sha
+    except OSError:
+        pass
+
+    for namespace in BRANCH_NAMESPACES:
+        root = os.path.join(common_dir, namespace)
+        for directory, _, files in os.walk(root):
+            for file in files:
+                if file.endswith(".lock"):
+                    continue
+                path = os.path.join(directory, file)
+                try:
+                    with open(path) as f:
+                        sha = f.read().strip()
+                except OSError:
+                    continue
+                if sha.startswith("ref:"):
+                    continue
+                refname = namespace + os.path.relpath(path, root).replace(os.sep, "/")
+                refs[refname] = sha
+    return refs
+
+
+def read_head(git_dir):
+    """
+    :param git_dir: is the path to the git directory of a worktree
+    :return: tuple of the checked out branch name, None when detached, and the
+        detached SHA, None when a branch is checked out
+    """
+    with open(os.path.join(git_dir, "HEAD")) as f:
+        head = f.read().strip()
+    if head.startswith("ref:"):
+        return head[len("ref:") :].strip()[len("refs/heads/") :], None
+    return None, head
+
+
+class RefCache:
+    """
+    Branch listings keyed by ref_fingerprint(), so listing an unchanged repo only
+    stats a few directories. Commit times only depend on the SHA, so they are kept
+    across listings and only looked up for new branch tips, all in one git call.
+    """
+
+    def __init__(self, max_repos=64, max_commit_times=65536):
+        """
+        :param max_repos: is the number of repos to keep listings for
+        :param max_commit_times: is the number of commit times to remember
+        """
+        self.max_repos = max_repos
+        self.max_commit_times = max_commit_times
+        self._lock = threading.Lock()
+        self._listings = OrderedDict()
+        self._commit_times = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _read_commit_times(self, path, shas):
+        """
+        :param path: is the path to the working tree
+        :param shas: is a list of commit SHAs
+        :return: Dict of SHA -> committer timestamp in seconds
+        """
+        with self._lock:
+            times = {
+                sha: self._commit_times[sha]
+                for sha in shas
+                if sha in self._commit_times
+            }
+        missing = [sha for sha in shas if sha not in times]
+        if missing:
+            with tempfile.TemporaryFile() as revisions, get_repo_pool().lease(
+                path
+            ) as repo:
+                revisions.write("\n".join(missing).encode("ascii"))
+                revisions.seek(0)
+                output = repo.git.log(
+                    "--no-walk=unsorted",
+                    "--format=%H %ct",
+                    "--stdin",
+                    istream=revisions,
+                )
+            read = dict(line.split(" ") for line in output.splitlines())
+            with self._lock:
+                for sha, timestamp in read.items():
+                    times[sha] = self._commit_times[sha] = int(timestamp)
+                while len(self._commit_times) > self.max_commit_times:
+                    self._commit_times.popitem(last=False)
+        return times
+
+    def branches(self, path):
+        """
+        Lists local and remote-tracking branches
+
+        :param path: is the path to the working tree
+        :return: Dict with the current branch, and lists of "local" and "remote"
+            branches sorted by name, each with its name, tip SHA, and commit time.
+            "head" is the SHA checked out, None on a branch without commits
+        """
+        path = os.path.abspath(path)
+        git_dir = find_git_dir(path)
+        common_dir = find_common_dir(git_dir)
+        fingerprint = ref_fingerprint(common_dir)
+        with self._lock:
+            entry = self._listings.get(common_dir)
+            if entry is not None and entry[0] == fingerprint:
+                self._listings.move_to_end(common_dir)
+                self.hits += 1
+                listing = entry[1]
+            else:
+                self.misses += 1
+                listing = None
+
+        if listing is None:
+            refs = read_refs(common_dir)
+            times = self._read_commit_times(path, sorted(set(refs.values())))
+            listing = {"local": [], "remote": []}
+            for refname in sorted(refs):
+                kind = "local" if refname.startswith("refs/heads/") else "remote"
+                timestamp = times.get(refs[refname])
+                if timestamp is not None:
+                    timestamp = datetime.utcfromtimestamp(timestamp).strftime(
+                        "%Y-%m-%dT%H:%M:%S.%fZ"
+                    )
+                listing[kind].append(
+                    {
+                        "name": refname.split("/", 2)[2],
+                        "sha": refs[refname],
+                        "timestamp": timestamp,
+                    }
+                )
+            if self.max_repos:
+                with self._lock:
+                    self._listings[common_dir] = (fingerprint, listing)
+                    self._listings.move_to_end(common_dir)
+                    while len(self._listings) > self.max_repos:
+                        self._listings.popitem(last=False)
+
+        # HEAD is per worktree and changes without touching any branch, read it every time
+        current, head = read_head(git_dir)
+        if current is not None:
+            head = next(
+                (
+                    branch["sha"]
+                    for branch in listing["local"]
+                    if branch["name"] == current
+                ),
+                None,
+            )
+        return dict(listing, current=current, head=head)
+
+    def stats(self):
+        """
+        :return: Dict with the number of cached listings and hit/miss counts
+        """
+        with self._lock:
+            return {
+                "repos": len(self._listings),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def clear(self):
+        """
+        Drops all listings and commit times and resets counters
+        """
+        with self._lock:
+            self._listings.clear()
+            self._commit_times.clear()
+            self.hits = self.misses = 0
+
+
+def get_ref_cache():
+    """
+    Returns the process wide ref cache
+    """
+    global _ref_cache
+    if _ref_cache is None:
+        _ref_cache = RefCache()
+    return _ref_cache
+
+
+def configure_ref_cache(config):
+    """
+    Replaces the process wide ref cache with one built from the extension config
+
+    :param config: is a GitExtensionConfig
+    :return: the new RefCache
+    """
+    global _ref_cache
+    _ref_cache = RefCache(max_repos=config.ref_cache_max_repos)
+    return _ref_cache
@@ -0,0 +1,482 @@
+"""
+Tracking of origin: scheduled fetches so page loads don't each hit the git host,
+how much of origin is fetched, and ahead/behind counts against upstream branches
+"""
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import git
+
+from .executor import get_executor
+from .metrics import FETCH_RECEIVED_BYTES, OPERATION_DURATION, get_metrics
+
+_fetch_scheduler = None
+_fetch_strategy = None
+_ahead_behind_counter = None
+
+FETCH_STRATEGIES = ("full", "narrow")
+
+# Ex. "Receiving objects: 100% (3/3), 195.65 KiB | 48.91 MiB/s, done." Small fetches
+# are unpacked into loose objects and report "Unpacking objects" instead
+RECEIVED_PATTERN = re.compile(
+    r"(?:Receiving|Unpacking) objects:[^,\r\n]*, ([\d.]+) (bytes|KiB|MiB|GiB)"
+)
+BYTE_UNITS = {"bytes": 1, "KiB": 1024, "MiB": 1024**2, "GiB": 1024**3}
+
+
+class _FetchState:
+    """
+    Fetch bookkeeping for a single repo
+    """
+
+    def __init__(self):
+        self.fetched_at = None
+        self.error = None
+        self.next_due = 0.0
+        self.task = None
+        self.last_fetch = None
+
+
+class FetchScheduler:
+    """
+    Fetches each repo at most once per interval. Concurrent requests for a repo
+    share a single in flight fetch and callers are answered from the last fetched
+    state while a due fetch runs in the background.
+    """
+
+    def __init__(self, interval=300.0, jitter=0.1, log=None):
+        """
+        :param interval: is the minimum number of seconds between fetches of a repo
+        :param jitter: is the fraction the interval is randomly varied by so repos
+            opened at the same time don't fetch in lockstep
+        :param log: is an optional logger to report background fetch failures to
+        """
+        self.interval = interval
+        self.jitter = jitter
+        self.log = log
+        self.fetches = 0
+        self._states = {}
+
+    def _state(self, path):
+        return self._states.setdefault(os.path.abspath(path), _FetchState())
+
+    async def _fetch(self, state, path, fetch):
+        try:
+            result = await get_executor().submit(path, fetch, path=path)
+            state.fetched_at = time.time()
+            state.error = None
+            state.last_fetch = result if isinstance(result, dict) else None
+        except Exception as e:
+            state.error = str(e)
+            raise
+        finally:
+            self.fetches += 1
+            state.next_due = time.monotonic() + self.interval * (
+                1 + random.uniform(-self.jitter, self.jitter)
+            )
+            state.task = None
+
+    def _log_failure(self, task):
+        if task.cancelled() or task.exception() is None:
+            return
+        if self.log:
+            self.log.warning(f"Background fetch failed: {task.exception()}")
+
+    async def refresh(self, path, fetch, force=False):
+        """
+        Starts a fetch if the repo is due for one
+
+        :param path: is the path to the git repo
+        :param fetch: is the function running the fetch. Receives path as a keyword argument
+        :param force: is whether to fetch regardless of the interval and wait for it
+        :return: None
+        """
+        state = self._state(path)
+        if state.task is None and (force or time.monotonic() >= state.next_due):
+            state.task = asyncio.ensure_future(self._fetch(state, path, fetch))
+            state.task.add_done_callback(self._log_failure)
+        if force:
+            # Shield so a client disconnecting doesn't cancel a fetch others are waiting on
+            await asyncio.shield(state.task)
+
+    def mark_fetched(self, path, result=None):
+        """
+        Records a fetch that happened outside of the scheduler, ex. as part of a pull
+
+        :param path: is the path to the git repo
+        :param result: is the optional Dict FetchStrategy reported for the fetch
+        :return: None
+        """
+        state = self._state(path)
+        state.fetched_at = time.time()
+        state.error = None
+        if result is not None:
+            state.last_fetch = result
+        state.next_due = time.monotonic() + self.interval
+
+    def state(self, path):
+        """
+        :param path: is the path to the git repo
+        :return: Dict with when the repo was last fetched and if a fetch is running,
+            and what the last fetch transferred when the fetch reported it
+        """
+        state = self._state(path)
+        fetched_at = None
+        if state.fetched_at is not None:
+            fetched_at = datetime.utcfromtimestamp(state.fetched_at).strftime(
+                "%Y-%m-%dT%H:%M:%S.%fZ"
+            )
+        return {
+            "fetchedAt": fetched_at,
+            "fetchInProgress": state.task is not None,
+            "fetchError": state.error,
+            "lastFetch": state.last_fetch,
+        }
+
+    def clear(self):
+        """
+        Forgets all fetch history
+        """
+        self._states.clear()
+        self.fetches = 0
+
+
+def get_fetch_scheduler():
+    """
+    Returns the process wide fetch scheduler
+    """
+    global _fetch_scheduler
+    if _fetch_scheduler is None:
+        _fetch_scheduler = FetchScheduler()
+    return _fetch_scheduler
+
+
+def configure_fetch_scheduler(config, log=None):
+    """
+    Replaces the process wide fetch scheduler with one built from the extension config
+
+    :param config: is a GitExtensionConfig
+    :param log: is an optional logger to report background fetch failures to
+    :return: the new FetchScheduler
+    """
+    global _fetch_scheduler
+    _fetch_scheduler = FetchScheduler(
+        interval=config.fetch_interval, jitter=config.fetch_jitter, log=log
+    )
+    return _fetch_scheduler
+
+
+def received_bytes(progress):
+    """
+    Fetches of fewer than fetch.unpackLimit objects are unpacked into loose objects
+    and git only reports their size when unpacking takes long enough to show progress.
+
+    :param progress: is git's progress output from a fetch or pull
+    :return: bytes of objects git reported receiving, 0 when nothing was received
+    """
+    received = 0
+    for size, unit in RECEIVED_PATTERN.findall(progress):
+        # Each fetch git runs reports its own total, ex. for submodules
+        received += int(float(size) * BYTE_UNITS[unit])
+    return received
+
+
+def _run_git_quietly(repo, arguments):
+    """
+    :param repo: is the git.Repo to run git in
+    :param arguments: is the git command and its arguments
+    :return: progress output git wrote to stderr
+    """
+    command, *arguments = arguments
+    _, _, progress = getattr(repo.git, command)(*arguments, with_extended_output=True)
+    return progress
+
+
+class FetchStrategy:
+    """
+    How much of origin is fetched. "full" fetches every branch and tag like a plain
+    git fetch. "narrow" only fetches the upstream of the checked out branch without
+    tags, optionally without blobs (a partial clone filter, ex. "blob:none") and,
+    in clones that are already shallow, only depth commits deep. Repos without an
+    upstream are fetched in full.
+    """
+
+    def __init__(self, strategy="full", filter="", depth=0, max_deepen=5):
+        """
+        :param strategy: is "full" or "narrow"
+        :param filter: is an optional partial clone filter for narrow fetches
+        :param depth: is the number of commits narrow fetches of shallow clones get
+        :param max_deepen: is how many times a shallow fetch is deepened by depth
+            commits looking for the merge base, so ahead/behind can be counted
+        """
+        self.strategy = strategy
+        self.filter = filter
+        self.depth = depth
+        self.max_deepen = max_deepen
+
+    def upstream(self, repo):
+        """
+        :param repo: is the git.Repo to fetch into
+        :return: tuple of the remote name, a refspec fetching only the checked out
+            branch's upstream, and the remote-tracking ref it updates. None on a
+            detached HEAD or a branch without an upstream
+        """
+        try:
+            tracking = repo.active_branch.tracking_branch()
+        except TypeError:
+            # Detached HEAD
+            return None
+        if tracking is None:
+            return None
+        refspec = f"+refs/heads/{tracking.remote_head}:{tracking.path}"
+        return tracking.remote_name, refspec, tracking.path
+
+    def arguments(self, repo, operation):
+        """
+        :param repo: is the git.Repo to fetch into
+        :param operation: is "fetch" or "pull"
+        :return: git command and arguments running the operation with this strategy
+        """
+        upstream = self.upstream(repo) if self.strategy == "narrow" else None
+        if upstream is None:
+            return ("fetch", "origin") if operation == "fetch" else ("pull",)
+        remote, refspec, _ = upstream
+        arguments = ["--no-tags"]
+        # A depth limit would make a complete clone shallow, only keep shallow ones shallow
+        if self.depth and os.path.exists(os.path.join(repo.git_dir, "shallow")):
+            arguments.append(f"--depth={self.depth}")
+        if self.filter and operation == "fetch":
+            arguments.append(f"--filter={self.filter}")
+        return (operation, *arguments, remote, refspec)
+
+    def _run(self, repo, arguments, run_git):
+        command, *arguments = arguments
+        return received_bytes(run_git(repo, (command, "--progress", *arguments)))
+
+    def _deepen(self, repo, run_git):
+        """
+        Deepens a shallow clone until HEAD and its upstream share a merge base
+
+        :param repo: is the git.Repo fetched into
+        :param run_git: runs each fetch, see fetch()
+        :return: bytes received while deepening
+        """
+        upstream = self.upstream(repo)
+        if upstream is None or not os.path.exists(
+            os.path.join(repo.git_dir, "shallow")
+        ):
+            return 0
+        remote, refspec, tracking_ref = upstream
+        received = 0
+        for _ in range(self.max_deepen):
+            try:
+                repo.git.merge_base("HEAD", tracking_ref)
+                break
+            except git.exc.GitCommandError:
+                received += self._run(
+                    repo,
+                    ("fetch", "--no-tags", f"--deepen={self.depth}", remote, refspec),
+                    run_git,
+                )
+        return received
+
+    def _report(self, repo, operation, run_git):
+        run_git = run_git or _run_git_quietly
+        arguments = self.arguments(repo, operation)
+        start = time.monotonic()
+        received = self._run(repo, arguments, run_git)
+        if self.strategy == "narrow" and self.depth and operation == "fetch":
+            received += self._deepen(repo, run_git)
+        get_metrics().increment(
+            FETCH_RECEIVED_BYTES, received, operation=operation, strategy=self.strategy
+        )
+        return {
+            "strategy": self.strategy,
+            "arguments": list(arguments),
+            "bytesReceived": received,
+            "seconds": time.monotonic() - start,
+        }
+
+    def fetch(self, repo, run_git=None):
+        """
+        Fetches from origin
+
+        :param repo: is the git.Repo to fetch into
+        :param run_git: is called with the repo and the git command and arguments of
+            each fetch and returns its progress output, ex. to stream the progress.
+            Defaults to running git without reporting progress
+        :return: Dict with the strategy, the git arguments, the bytes of objects
+            received, and the seconds taken
+        """
+        return self._report(repo, "fetch", run_git)
+
+    def pull(self, repo, run_git=None):
+        """
+        Pulls from origin. Narrow pulls fetch like narrow fetches, without a filter,
+        then merge or rebase as configured for the branch.
+
+        :param repo: is the git.Repo to pull into
+        :param run_git: is like fetch()'s
+        :return: Dict like fetch() returns
+        """
+        return self._report(repo, "pull", run_git)
+
+
+def get_fetch_strategy():
+    """
+    Returns the process wide fetch strategy
+    """
+    global _fetch_strategy
+    if _fetch_strategy is None:
+        _fetch_strategy = FetchStrategy()
+    return _fetch_strategy
+
+
+def configure_fetch_strategy(config):
+    """
+    Replaces the process wide fetch strategy with one built from the extension config
+
+    :param config: is a GitExtensionConfig
+    :return: the new FetchStrategy
+    """
+    global _fetch_strategy
+    _fetch_strategy = FetchStrategy(
+        strategy=config.fetch_strategy,
+        filter=config.fetch_filter,
+        depth=config.fetch_depth,
+    )
+    return _fetch_strategy
+
+
+class AheadBehindCounter:
+    """
+    Counts commits ahead/behind with git's own graph walk instead of building a
+    Commit object per commit. Counts only depend on the two commits compared so
+    they are memoized on the pair of SHAs.
+    """
+
+    def __init__(self, max_entries=4096):
+        """
+        :param max_entries: is the number of SHA pairs to remember
+        """
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._counts = OrderedDict()
+
+    def _get(self, key):
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is not None:
+                self._counts.move_to_end(key)
+            return counts
+
+    def _put(self, key, counts):
+        with self._lock:
+            self._counts[key] = counts
+            self._counts.move_to_end(key)
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+
+    def count(self, repo, local_sha, upstream_sha):
+        """
+        :param repo: is the git.Repo both commits are in
+        :param local_sha: is the SHA of the local commit
+        :param upstream_sha: is the SHA of the commit to compare against
+        :return: tuple of commits ahead and behind upstream
+        """
+        key = (local_sha, upstream_sha)
+        counts = self._get(key)
+        if counts is None:
+            with get_metrics().time(OPERATION_DURATION, operation="rev_list"):
+                output = repo.git.rev_list(
+                    "--left-right", "--count", f"{local_sha}...{upstream_sha}"
+                )
+            ahead, behind = output.split()
+            counts = (int(ahead), int(behind))
+            self._put(key, counts)
+        return counts
+
+    def count_branches(self, repo):
+        """
+        Counts commits ahead/behind upstream for every local branch. Branches
+        without a cached count are all counted by a single git call.
+
+        :param repo: is the git.Repo to count branches in
+        :return: Dict of branch name -> dict with upstream, ahead, and behind.
+            Branches without an upstream have None for all three.
+        """
+        output = repo.git.for_each_ref(
+            "--format=%(refname)%00%(objectname)%00%(upstream)%00%(upstream:short)",
+            "refs/heads",
+            "refs/remotes",
+        )
+        shas = {}
+        heads = []
+        for line in output.splitlines():
+            refname, sha, upstream, upstream_name = line.split("\0")
+            shas[refname] = sha
+            if refname.startswith("refs/heads/"):
+                heads.append((refname, sha, upstream, upstream_name))
+
+        branches = {}
+        missing = {}
+        for refname, sha, upstream, upstream_name in heads:
+            name = refname[len("refs/heads/") :]
+            upstream_sha = shas.get(upstream)
+            if upstream_sha is None:
+                branches[name] = {"upstream": None, "ahead": None, "behind": None}
+                continue
+            key = (sha, upstream_sha)
+            counts = self._get(key)
+            if counts is None:
+                missing[refname] = key
+                counts = (None, None)
+            branches[name] = {
+                "upstream": upstream_name,
+                "ahead": counts[0],
+                "behind": counts[1],
+            }
+
+        if missing:
+            with get_metrics().time(OPERATION_DURATION, operation="for_each_ref"):
+                output = repo.git.for_each_ref(
+                    "--format=%(refname)%00%(upstream:track,nobracket)", *missing
+                )
+            for line in output.splitlines():
+                refname, track = line.split("\0")
+                if refname not in missing:
+                    continue
+                ahead = re.search(r"ahead (\d+)", track)
+                behind = re.search(r"behind (\d+)", track)
+                counts = (
+                    int(ahead.group(1)) if ahead else 0,
+                    int(behind.group(1)) if behind else 0,
+                )
+                self._put(missing[refname], counts)
+                name = refname[len("refs/heads/") :]
+                branches[name]["ahead"], branches[name]["behind"] = counts
+
+        return branches
+
+    def clear(self):
+        """
+        Forgets all memoized counts
+        """
+        with self._lock:
+            self._counts.clear()
+
+
+def get_ahead_behind_counter():
+    """
+    Returns the process wide ahead/behind counter
+    """
+    global _ahead_behind_counter
+    if _ahead_behind_counter is None:
+        _ahead_behind_counter = AheadBehindCounter()
+    return _ahead_behind_counter
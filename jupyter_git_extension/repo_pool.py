@@ -0,0 +1,141 @@
+"""
+Pool of open git.Repo objects reused across requests
+"""
+import contextlib
+import os
+import threading
+from collections import OrderedDict
+
+from .metrics import InstrumentedRepo
+
+_repo_pool = None
+
+
+class RepoPool:
+    """
+    Keeps git.Repo objects open between requests so repo discovery, config parsing,
+    and GitPython's persistent `git cat-file --batch` processes are reused.
+
+    git.Repo isn't thread safe, so each instance is leased to one thread at a time.
+    Concurrent operations on the same repo get separate instances. Idle instances
+    beyond max_repos are closed least recently used first.
+    """
+
+    def __init__(self, max_repos=16):
+        """
+        :param max_repos: is the number of open repos to keep before closing idle ones
+        """
+        self.max_repos = max_repos
+        self._lock = threading.Lock()
+        # (worktree path, id(repo)) -> repo, ordered least recently released first
+        self._idle = OrderedDict()
+        self._leased = {}
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+
+    def _take_idle(self, key):
+        for idle_key in reversed(self._idle):
+            if idle_key[0] == key:
+                return self._idle.pop(idle_key)
+        return None
+
+    @contextlib.contextmanager
+    def lease(self, path="."):
+        """
+        Borrows a repo for the duration of a with block
+
+        :param path: is the path to the git repo
+        :return: context manager yielding a git.Repo
+        """
+        key = os.path.realpath(path)
+        with self._lock:
+            repo = self._take_idle(key)
+            if repo is not None:
+                self.reused += 1
+                self._leased[id(repo)] = repo
+
+        if repo is None:
+            repo = InstrumentedRepo(key)
+            with self._lock:
+                self.created += 1
+                self._leased[id(repo)] = repo
+
+        try:
+            yield repo
+        finally:
+            with self._lock:
+                del self._leased[id(repo)]
+                self._idle[(key, id(repo))] = repo
+                evicted = self._evict()
+            for evicted_repo in evicted:
+                evicted_repo.close()
+
+    def _evict(self):
+        evicted = []
+        while self._idle and len(self._idle) + len(self._leased) > self.max_repos:
+            _, repo = self._idle.popitem(last=False)
+            evicted.append(repo)
+            self.evicted += 1
+        return evicted
+
+    def clear(self):
+        """
+        Closes all idle repos. Leased repos are closed as they are released.
+        """
+        with self._lock:
+            idle = list(self._idle.values())
+            self._idle.clear()
+            self.created = self.reused = self.evicted = 0
+        for repo in idle:
+            repo.close()
+
+    def stats(self):
+        """
+        :return: Dict with open repo counts and live `git cat-file` helper processes
+        """
+        with self._lock:
+            repos = list(self._idle.values()) + list(self._leased.values())
+            leased = len(self._leased)
+            stats = {
+                "openRepos": len(repos),
+                "leasedRepos": leased,
+                "maxRepos": self.max_repos,
+                "created": self.created,
+                "reused": self.reused,
+                "evicted": self.evicted,
+            }
+        stats["helperProcesses"] = sum(
+            1
+            for repo in repos
+            for helper in (
+                getattr(repo.git, "cat_file_header", None),
+                getattr(repo.git, "cat_file_all", None),
+            )
+            if helper is not None
+        )
+        return stats
+
+
+def get_repo_pool():
+    """
+    Returns the process wide repo pool
+    """
+    global _repo_pool
+    if _repo_pool is None:
+        _repo_pool = RepoPool()
+    return _repo_pool
+
+
+def configure_repo_pool(config):
+    """
+    Replaces the process wide repo pool with one built from the extension config
+
+    :param config: is a GitExtensionConfig
+    :return: the new RepoPool
+    """
+    global _repo_pool
+    if _repo_pool is not None:
+        _repo_pool.clear()
+    _repo_pool = RepoPool(max_repos=config.repo_pool_max_repos)
+    return _repo_pool
@@ -0,0 +1,98 @@
+"""
+Routes registered at server startup that only import the handlers, and GitPython
+with them, once a git route is first requested
+"""
+import asyncio
+import importlib
+import threading
+
+from tornado import web
+
+# Path under <base_url>/git -> name of the handler class in the handlers module
+ROUTES = [
+    ("/commit", "CommitHandler"),
+    ("/pull", "PullHandler"),
+    ("/info", "InfoHandler"),
+    ("/origin-info", "OriginInfoHandler"),
+    ("/state", "StateHandler"),
+    ("/push", "PushHandler"),
+    ("/branches", "BranchesHandler"),
+    ("/diff", "DiffHandler"),
+    ("/log", "LogHandler"),
+    ("/progress", "ProgressWebSocketHandler"),
+    ("/status-stream", "StatusWebSocketHandler"),
+    (r"/jobs/(?P<job_id>\w+)", "JobHandler"),
+    ("/executor", "ExecutorHandler"),
+    ("/status-cache", "StatusCacheHandler"),
+    ("/repo-pool", "RepoPoolHandler"),
+    ("/metrics", "MetricsHandler"),
+]
+
+
+class HandlerLoader:
+    """
+    Imports the handlers module and sets up the services it uses the first time any
+    of its routes is requested, so servers that never use git don't pay for it
+    """
+
+    def __init__(self, setup):
+        """
+        :param setup: is called with the handlers module once it is imported, to
+            configure the process wide services from the extension config
+        """
+        self._setup = setup
+        self._lock = threading.Lock()
+        self._handlers = None
+
+    @property
+    def loaded(self):
+        """
+        :return: whether the handlers have been imported and set up
+        """
+        return self._handlers is not None
+
+    def load(self):
+        """
+        Imports and sets up the handlers module unless that was already done
+
+        :return: the handlers module
+        """
+        if self._handlers is None:
+            with self._lock:
+                if self._handlers is None:
+                    handlers = importlib.import_module(".handlers", __package__)
+                    self._setup(handlers)
+                    self._handlers = handlers
+        return self._handlers
+
+    async def preload(self, warm_up=None):
+        """
+        Imports the handlers in a thread so the IOLoop keeps serving, then sets them up
+
+        :param warm_up: is an optional coroutine function called with the handlers
+            module afterwards, ex. to fill caches before the first request
+        :return: None
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None, importlib.import_module, ".handlers", __package__
+        )
+        handlers = self.load()
+        if warm_up is not None:
+            await warm_up(handlers)
+
+    def handler(self, name):
+        """
+        :param name: is the name of a handler class in the handlers module
+        :return: a RequestHandler class to route to. Instantiating it returns an
+            instance of the real handler, loading the handlers first if needed.
+        """
+        loader = self
+
+        class LazyHandler(web.RequestHandler):
+            def __new__(cls, application, request, **kwargs):
+                # Not an instance of cls, so Python doesn't call __init__ again
+                return getattr(loader.load(), name)(application, request, **kwargs)
+
+        LazyHandler.__name__ = LazyHandler.__qualname__ = f"Lazy{name}"
+        return LazyHandler
@@ -0,0 +1,127 @@
+"""
+Coalescing of identical git queries so concurrent requests share one computation
+"""
+import asyncio
+from collections import defaultdict
+
+from .executor import ExecutorSaturatedError
+
+_single_flight = None
+
+
+class FanInExceededError(ExecutorSaturatedError):
+    """
+    Raised when too many callers are already waiting on an identical operation
+    """
+
+
+class _Flight:
+    """
+    An in flight operation and the number of callers waiting on it
+    """
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time. Callers arriving while one is
+    in flight wait for it and share its result (or error) instead of starting their
+    own, ex. every tab asking for a repo's status after a server restart. Keys
+    start with the repo and operation, followed by whatever the result depends on
+    so callers never share a computation started before a change they must see.
+    """
+
+    def __init__(self, max_waiters=64):
+        """
+        :param max_waiters: is the number of callers that can share one computation.
+            Callers past this are rejected. 0 for no limit
+        """
+        self.max_waiters = max_waiters
+        self._flights = {}
+        # operation -> counts of computations started, callers coalesced, and rejected
+        self._counts = defaultdict(
+            lambda: {"started": 0, "coalesced": 0, "rejected": 0}
+        )
+
+    async def run(self, key, function, *args, **kwargs):
+        """
+        Runs function unless an identical call is in flight, then waits for its result
+
+        :param key: is a hashable tuple of the repo path, the operation name, and
+            anything else the result depends on
+        :param function: is a callable returning an awaitable, ex. a coroutine function
+        :return: the result of the shared computation. Treat it as read only since
+            other callers receive the same object.
+        """
+        operation = key[1]
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(function(*args, **kwargs)))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._land(key, flight))
+            self._counts[operation]["started"] += 1
+        elif self.max_waiters and flight.waiters >= self.max_waiters:
+            self._counts[operation]["rejected"] += 1
+            raise FanInExceededError(
+                f"Too many requests waiting on git {operation} for {key[0]}. "
+                "Try again shortly."
+            )
+        else:
+            self._counts[operation]["coalesced"] += 1
+
+        flight.waiters += 1
+        try:
+            # Shield so a caller disconnecting doesn't cancel the computation for the others
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+
+    def _land(self, key, flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            # Mark the error as retrieved in case every caller went away
+            flight.task.exception()
+
+    def stats(self):
+        """
+        :return: Dict with operations in flight and counts per operation
+        """
+        return {
+            "maxWaiters": self.max_waiters,
+            "inFlight": len(self._flights),
+            "operations": {
+                operation: dict(counts) for operation, counts in self._counts.items()
+            },
+        }
+
+    def clear(self):
+        """
+        Resets counters. In flight computations are left to finish
+        """
+        self._counts.clear()
+
+
+def get_single_flight():
+    """
+    Returns the process wide single flight group
+    """
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
+
+
+def configure_single_flight(config):
+    """
+    Replaces the process wide single flight group with one built from the extension config
+
+    :param config: is a GitExtensionConfig
+    :return: the new SingleFlight
+    """
+    global _single_flight
+    _single_flight = SingleFlight(max_waiters=config.single_flight_max_waiters)
+    return _single_flight
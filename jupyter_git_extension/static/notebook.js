@@ -39,13 +39,23 @@ define([
         Push repo
         */
         var push = function() {
+            // Push from the repo the notebook is in
             let settings = Object.assign({
                 url : Jupyter.notebook.base_url + 'git/push',
-                type : 'PUT'
+                type : 'PUT',
+                data: JSON.stringify({path: Jupyter.notebook.notebook_path})
             }, settings_template);
 
-            // Send request to API
-            $.ajax(settings);
+            // Stream progress when possible, otherwise send a plain request to the API
+            gitUtils.runWithProgress(Jupyter.notebook.base_url, 'push', Jupyter.notebook.notebook_path, '#notebook-container', {
+                success: settings.success,
+                error: function(message) {
+                    gitUtils.createNotification(message, true, '#notebook-container');
+                },
+                fallback: function() {
+                    gitUtils.submitJob(Jupyter.notebook.base_url, settings);
+                }
+            });
         }
 
         /*
@@ -65,6 +75,10 @@ define([
                             .append($('<input type="checkbox" name="push-changes" id="push-changes" checked/>'))
                             .append($('<label for="push-changes"/>').html('&nbsp;Push changes'))
                         )
+                        .append($('<div/>')
+                            .append($('<input type="checkbox" name="strip-outputs" id="strip-outputs"/>'))
+                            .append($('<label for="strip-outputs"/>').html('&nbsp;Remove notebook outputs from the commit'))
+                        )
                         .append($('<div/>')
                             .append($('<p/>').text('Commit Message:')
                                 .append($('<span/>').css('color', 'red').text('*'))
@@ -72,6 +86,11 @@ define([
                             .append($('<textarea id="commit-message" rows="3" cols="50">'))
                         );
 
+                    // Changes are loaded when expanded. They are of the last save, the notebook is saved on commit
+                    modal_body.append(
+                        gitUtils.createDiffViewer(env.notebook.base_url, env.notebook.notebook_path, 'Show changes since the last commit (as last saved)')
+                    );
+
                     function on_open(){
                         // Disable automatic close of modal on submit so we can form validate
                         $('button:contains("Commit")').removeAttr("data-dismiss");
@@ -84,6 +103,7 @@ define([
 
                         // Read data from modal form
                         let push_changes = $('#push-changes').is(':checked');
+                        let strip_outputs = $('#strip-outputs').is(':checked');
                         let message = $('#commit-message').val().trim();
                         
                         // Do some form validation
@@ -98,6 +118,10 @@ define([
                             files: [filepath],
                             message: message
                         }
+                        // Leave it to the server's default unless asked
+                        if (strip_outputs) {
+                            payload.stripOutputs = 'strip';
+                        }
 
                         var settings = Object.assign({
                             url : env.notebook.base_url + 'git/commit',
@@ -115,8 +139,8 @@ define([
 
                         // Trigger notebook save and make commit-push request once saved
                         $.when(env.notebook.save_notebook()).then(function(data) {
-                            // Send request to API
-                            $.ajax(settings);
+                            // Queue the commit and wait for it to finish
+                            gitUtils.submitJob(env.notebook.base_url, settings);
                         }, function(error) {
                             gitUtils.createNotification("Failed to save notebook. Save required to commit notebook", true);
                         });
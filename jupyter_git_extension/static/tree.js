@@ -107,21 +107,124 @@ define([
                 .append(' / ')
                 .append($('<span id="git-repo-link"/>'))
                 .append(' ')
-                .append($('<span id="git-branch-dropdown" class="btn btn-xs btn-default"/>').css({'cursor': 'not-allowed', 'pointer-events': 'none'})
+                .append($('<span id="git-branch-dropdown" class="btn btn-xs btn-default"/>').attr('title', 'Switch branch').click(function() {branches()})
                     .append($('<span class="text-muted"/>').text('Branch: '))
                     .append($('<span id="git-branch"/>'))
                 )
+                .append(' ')
+                .append($('<span id="git-untracked-truncated" class="label label-muted"/>')
+                    .text('Untracked files truncated')
+                    .attr('title', 'The repo has more untracked files than the server is configured to list. Some untracked labels are missing.')
+                    .hide()
+                )
             );
             $('#header-container').find('span.flex-spacer').after(git_links);
             $('#git-links').after($('<span class="flex-spacer"/>'));
 
             $('#git-global-commit').prepend(' ').prepend($('<span id="git-last-commit"/>')).prepend('Last commit ');
 
-            // Initial AJAX settings will tell back end to compare local git against origin to determine commits behind
-            let settings = Object.assign({
-                url : Jupyter.session_list.base_url + 'git/info',
-                type : 'put'
-            }, polling_settings_template);
+            let settings = Object.assign({}, polling_settings_template);
+
+            // Last state received per URL, rendered again when the server answers 304 Not Modified
+            let states = new Map();
+
+            // Ask for the repo, the status of the directory currently being listed, and origin in one request
+            let requestInfo = function() {
+                let url = Jupyter.session_list.base_url + 'git/state?path=' + encodeURIComponent(Jupyter.notebook_list.notebook_path);
+                $.ajax(Object.assign({}, settings, {
+                    url: url,
+                    type: 'get',
+                    // Sends the ETag of the last response so unchanged state comes back empty
+                    ifModified: true,
+                    success: function(data, text_status) {
+                        if (text_status == 'notmodified') {
+                            data = states.get(url);
+                        } else {
+                            states.set(url, data);
+                        }
+                        settings.success(data);
+                        renderOriginInfo(data);
+                    }
+                }));
+            }
+
+            // Labels for each status. Directories show one per change type in their contents
+            const directory_labels = [
+                ['deletedContents', 'Deleted Contents', 'label-muted'],
+                ['modifiedContents', 'Modified Contents', 'label-warning'],
+                ['untrackedContents', 'Untracked Contents', 'label-danger']
+            ];
+            // Files show the first matching label
+            const file_labels = [
+                ['modified', 'Modified', 'label-warning'],
+                ['untracked', 'Untracked', 'label-danger']
+            ];
+
+            function createLabel(label_text, label_class) {
+                return $('<span/>').addClass('label git-file-status').css('margin-left', '.5em')
+                    .addClass(label_class).text(label_text);
+            }
+
+            function createLabels(type, statuses) {
+                let labels = [];
+                if (type == 'directory') {
+                    directory_labels.forEach(function(label) {
+                        if (statuses.has(label[0])) {
+                            labels.push(createLabel(label[1], label[2]));
+                        }
+                    });
+                } else {
+                    let label = file_labels.find(function(label) {
+                        return statuses.has(label[0]);
+                    });
+                    if (label) {
+                        labels.push(createLabel(label[1], label[2]));
+                    }
+                }
+                return labels;
+            }
+
+            // Maps the name of each listed entry to the link its labels go after, in one pass over the list
+            function mapLinksByName() {
+                let links = new Map();
+                $(Jupyter.notebook_list.element).children('.list_item').not('.git-deleted-files').each(function() {
+                    let row = $(this);
+                    let name = row.data('name');
+                    if (name !== undefined && !links.has(name)) {
+                        links.set(name, row.find('span.item_name').first().parent());
+                    }
+                });
+                return links;
+            }
+
+            function createDeletedFileRow(filepath, selected_names) {
+                let filename = gitUtils.basename(filepath);
+                let checkbox = $('<input type="checkbox" title="Click here to select"/>');
+                checkbox.prop('checked', selected_names.has(filename));
+
+                let row = $('<div class="list_item row git-deleted-files"/>').append(
+                    $('<div class="col-md-12"/>')
+                        .append(checkbox)
+                        .append($('<i class="item_icon file_icon icon-fixed-width"/>'))
+                        .append($('<span/>').append($('<span class="item_name"/>').text(filename)))
+                        .append(createLabel('Deleted', 'label-muted'))
+                );
+
+                row.data('name', filename);
+                row.data('path', filepath);
+                row.data('modified', '');
+                row.data('type', 'file');
+
+                row.click(function(e) {
+                    // toggle checkbox only if the click doesn't come from the checkbox
+                    if (!$(e.target).is('input[type=checkbox]')) {
+                        checkbox.prop('checked', !checkbox.prop('checked'));
+                    }
+                    Jupyter.notebook_list._selection_changed();
+                });
+
+                return row;
+            }
 
             // Inject data from AJAX call into the DOM
             let renderInfo = function (data) {
@@ -129,181 +232,307 @@ define([
                 $('#git-org-link').html($('<a/>').css('font-weight', 'normal').attr({'href': data.repoInfo.orgUrl, 'target': '_'}).text(data.repoInfo.orgName));
                 $('#git-repo-link').html($('<a/>').attr({'href': data.repoInfo.repoUrl, 'target': '_'}).text(data.repoInfo.repoName));
                 $('#git-branch').text(data.repoInfo.branchName);
+                $('#git-untracked-truncated').toggle(data.repoInfo.untrackedTruncated === true);
 
                 // Render commit timestamp
                 $('#git-last-commit').text(utils.format_datetime(data.repoInfo.lastCommitTimestamp));
                 $('#git-last-commit').attr("title", moment(data.repoInfo.lastCommitTimestamp).local().format("YYYY-MM-DD HH:mm"));
 
-                // Clear any existing file labels so we don't double up if something strange happens
-                $('.git-file-status').remove()
+                let list = $(Jupyter.notebook_list.element);
 
-                let file_list = Jupyter.notebook_list.model_list.content;
+                // Clear existing file labels and deleted files so we don't double up
+                list.find('.git-file-status, .git-deleted-files').remove();
 
-                // Helper to easily add label to file
-                function addLabelToFile(file_name, label_text, label_class) {
-                    // Starting at root notebook_list element find the span with the file name as text
-                    // Add the label after the span's parent link tag
-                    $(Jupyter.notebook_list.element).find('span.item_name:contains("' + file_name + '")').parent().after(
-                        $('<span/>').addClass('label git-file-status').css('margin-left', '.5em')
-                            .addClass(label_class).text(label_text)
-                    );
-                }
+                // Status of each changed entry in the current directory, keyed by name
+                let entries = data.repoInfo.entries;
+                let links = mapLinksByName();
 
-                // Helper to check if any string in list starts with given string
-                function arrayStartsWith(strings, string) {
-                    for (let i = 0; i < strings.length; i++) {
-                        if (strings[i].startsWith(string)) {
-                            return true;
-                        }
-                    }
-                    return false;
-                }
-
-                function createDeletedFileHeaderIfNotExists() {
-                    if ($('#git-deleted-files-header').length) {
+                // Add labels depending on status of file
+                Jupyter.notebook_list.model_list.content.forEach(function(file) {
+                    let link = links.get(file.name);
+                    if (!link || !entries[file.name]) {
                         return;
                     }
+                    let labels = createLabels(file.type, new Set(entries[file.name]));
+                    if (labels.length) {
+                        link.after(labels);
+                    }
+                });
 
-                    $('#notebook_list').append(
-                        $('<div id="git-deleted-files-header" class="row list_header git-deleted-files"/>').append(
+                // Deleted files aren't listed by Jupyter, add rows for them after the listing
+                let current_path = Jupyter.notebook_list.notebook_path;
+                // Oneliner to append / to non-empty path for comparison later
+                current_path = current_path == '' ? current_path : current_path + '/';
+                let selected_names = new Set((Jupyter.notebook_list._previously_selected || []).map(function(item) {
+                    return item.name;
+                }));
+                let deleted_rows = Object.keys(entries).sort().filter(function(name) {
+                    return entries[name].includes('deleted');
+                }).map(function(name) {
+                    return createDeletedFileRow(current_path + name, selected_names);
+                });
+                if (deleted_rows.length) {
+                    list.append(
+                        [$('<div id="git-deleted-files-header" class="row list_header git-deleted-files"/>').append(
                             $('<div/>').append($('<span class="text-muted"/>').text('Deleted Files'))
-                        )
-                    )
+                        )].concat(deleted_rows)
+                    );
                 }
 
-                function createDeletedFileRow(filepath) {
-                    let filename = gitUtils.basename(filepath);
-                    let checkbox = $('<input type="checkbox" title="Click here to select"/>');
-
-                    if (Jupyter.notebook_list._previously_selected) {
-                        for (let i = 0; i< Jupyter.notebook_list._previously_selected.length; i++) {
-                            if (Jupyter.notebook_list._previously_selected[i].name == filename) {
-                                checkbox.prop('checked', true);
-                                break;
-                            }
-                        }
-                    }
+                Jupyter.notebook_list._selection_changed();
+            }
 
-                    let row = $('<div class="list_item row git-deleted-files"/>').append(
-                        $('<div class="col-md-12"/>')
-                            .append(checkbox)
-                            .append($('<i class="item_icon file_icon icon-fixed-width"/>'))
-                            .append($('<span/>').append($('<span class="item_name"/>').text(filename)))
-                    );
+            // Add render function as callback
+            settings.success = renderInfo;
 
-                    row.data('name', filename);
-                    row.data('path', filepath);
-                    row.data('modified', '');
-                    row.data('type', 'file');
+            // Directories outside of any repo have no git info, clear anything left from the last repo
+            settings.error = function(data, status, error) {
+                if (data.status == 404) {
+                    $('.git-file-status').remove();
+                    $('.git-deleted-files').remove();
+                    $('#git-links').hide();
+                    return;
+                }
+                polling_settings_template.error(data, status, error);
+            }
+            let _success = settings.success;
+            settings.success = function(data) {
+                $('#git-links').show();
+                _success(data);
+            }
 
-                    row.click(function(e) {
-                        // toggle checkbox only if the click doesn't come from the checkbox
-                        if (!$(e.target).is('input[type=checkbox]')) {
-                            checkbox.prop('checked', !checkbox.prop('checked'));
-                        }
-                        Jupyter.notebook_list._selection_changed();
-                    });
+            /*
+            Once the status stream is open the server pushes status changes of the directory
+            being listed, so redraws are rendered from the last pushed status instead of asking
+            the server again. AJAX requests are used until then, or if it can't be opened.
+            */
+            let stream = {
+                socket: null,
+                open: false,
+                path: null,
+                epoch: null,
+                version: null,
+                repoInfo: null
+            };
+
+            let subscribe = function() {
+                let path = Jupyter.notebook_list.notebook_path;
+                // Versions describe the entries of one directory, only reuse them for that directory
+                let current = path == stream.path && stream.repoInfo !== null;
+                if (path != stream.path) {
+                    // Don't render the previous directory's status on the new listing
+                    stream.repoInfo = null;
+                }
+                stream.path = path;
+                stream.socket.send(JSON.stringify({
+                    action: 'subscribe',
+                    path: path,
+                    epoch: current ? stream.epoch : null,
+                    version: current ? stream.version : null
+                }));
+            }
 
-                    $('#notebook_list').append(row);
+            let onStatusMessage = function(event) {
+                let data = JSON.parse(event.data);
+                if (data.type == 'error') {
+                    stream.repoInfo = null;
+                    if (data.status == 404) {
+                        settings.error({status: data.status}, 'error', data.statusText);
+                    } else {
+                        gitUtils.createNotification(data.statusText, true, '#tab_content');
+                    }
+                    return;
                 }
 
-                // Add labels depending on status of file
-                file_list.forEach(function(file) {
-                    // Directories can have multiple labels if their contents have multiple change types
-                    if (file.type == 'directory') {
-                        if (arrayStartsWith(data.repoInfo.deletedFiles, file.path + '/')) {
-                            addLabelToFile(file.name, 'Deleted Contents', 'label-muted');
-                        }
-                        if (arrayStartsWith(data.repoInfo.modifiedFiles, file.path + '/')) {
-                            addLabelToFile(file.name, 'Modified Contents', 'label-warning');
-                        }
-                        if (arrayStartsWith(data.repoInfo.untrackedFiles, file.path + '/')) {
-                            addLabelToFile(file.name, 'Untracked Contents', 'label-danger');
-                        }
+                if (stream.repoInfo === null && !data.full) {
+                    // Changes or versions left from another directory until the full status arrives
+                    return;
+                }
+                stream.epoch = data.epoch;
+                stream.version = data.version;
+                if (data.type == 'status') {
+                    if (data.full) {
+                        stream.repoInfo = data.repoInfo;
                     } else {
-                        if (data.repoInfo.modifiedFiles.includes(file.path)) {
-                            addLabelToFile(file.name, 'Modified', 'label-warning');
-                        } else if (data.repoInfo.untrackedFiles.includes(file.path)) {
-                            addLabelToFile(file.name, 'Untracked', 'label-danger');
+                        let entries = stream.repoInfo.entries;
+                        if (data.repoInfo) {
+                            stream.repoInfo = Object.assign({}, data.repoInfo, {entries: entries});
                         }
+                        Object.keys(data.changes).forEach(function(name) {
+                            if (data.changes[name].length) {
+                                entries[name] = data.changes[name];
+                            } else {
+                                delete entries[name];
+                            }
+                        });
                     }
-                });
-
-                // Clear deleted file elements before redraw
-                $('.git-deleted-files').remove()
+                }
+                if (stream.repoInfo !== null) {
+                    settings.success({repoInfo: stream.repoInfo});
+                }
+            }
 
-                let current_path = Jupyter.notebook_list.notebook_path;
-                // Oneliner to append / to non-empty path for comparison later
-                current_path = current_path == '' ? current_path : current_path + '/';
-                data.repoInfo.deletedFiles.forEach(function(filepath) {
-                    // If the current path + basename matches the filepath it means the file is from our current directory
-                    if (current_path + gitUtils.basename(filepath) == filepath) {
-                        // Create deleted files header for first deleted file found
-                        createDeletedFileHeaderIfNotExists();
-                        createDeletedFileRow(filepath);
-                        addLabelToFile(gitUtils.basename(filepath), 'Deleted', 'label-muted');
+            let openStream = function() {
+                let protocol = window.location.protocol == 'https:' ? 'wss://' : 'ws://';
+                try {
+                    stream.socket = new WebSocket(protocol + window.location.host + Jupyter.session_list.base_url + 'git/status-stream');
+                } catch(error) {
+                    return;
+                }
+                stream.socket.onopen = function() {
+                    stream.open = true;
+                    subscribe();
+                }
+                stream.socket.onmessage = onStatusMessage;
+                stream.socket.onclose = function() {
+                    let reconnect = stream.open;
+                    stream.open = false;
+                    // Reconnect after a server restart, stay on AJAX if WebSockets aren't available
+                    if (reconnect) {
+                        setTimeout(openStream, 5000);
                     }
-                });
-
-                Jupyter.notebook_list._selection_changed();
+                }
             }
 
-            // Add render function as callback
-            settings.success = renderInfo;
+            // Re-grab info when the notebook list changes
+            let refreshInfo = function() {
+                if (!stream.open) {
+                    requestInfo();
+                } else if (stream.path == Jupyter.notebook_list.notebook_path && stream.repoInfo !== null) {
+                    // The list was redrawn, the pushed status is still current
+                    settings.success({repoInfo: stream.repoInfo});
+                } else {
+                    // Browsing into a different repo changes what origin is
+                    subscribe();
+                    originInfo();
+                }
+            }
 
             // Send request to API
-            $.ajax(settings);
+            requestInfo();
+            openStream();
 
-            // Re-grab info when the notebook list changes
-            events.on('draw_notebook_list.NotebookList', function() {$.ajax(settings)});
-            events.on('notebook_deleted.NotebookList', function() {$.ajax(settings)});
+            events.on('draw_notebook_list.NotebookList', refreshInfo);
+            events.on('notebook_deleted.NotebookList', refreshInfo);
         }
         info();
 
 
         /*
         Get info comparing local repo to origin
+        The back end answers from its last fetch of origin. Pass force to fetch before answering.
         */
-        var originInfo = function() {
-            if (!$('#git-commits-behind-ahead').length) {
-                $('#git-global-pull-push').prepend(' ').prepend($('<span id="git-commits-behind-ahead"/>'));
+        $('#git-global-pull-push').prepend(' ').prepend(
+            $('<span id="git-commits-behind-ahead"/>').css('cursor', 'pointer').click(function() {originInfo(true)})
+        );
+
+        // Inject data from AJAX call into the DOM
+        var renderOriginInfo = function (data) {
+            // Repos without an upstream have nothing to show
+            if (data.repoInfo.commitsBehind === null || data.repoInfo.commitsBehind === undefined) {
+                $('#git-commits-behind-ahead').text('');
+                return;
+            }
+            $('#git-commits-behind-ahead').text(
+                data.repoInfo.commitsBehind + ' Commits behind, ' + data.repoInfo.commitsAhead + ' Commits ahead'
+            );
+
+            let fetched = data.repoInfo.fetchedAt ? 'Fetched from origin ' + moment(data.repoInfo.fetchedAt).fromNow() : 'Not fetched from origin yet';
+            $('#git-commits-behind-ahead').attr('title', fetched + '. Click to fetch now.');
+
+            // A background fetch was started, check back once it has had time to finish
+            if (data.repoInfo.fetchInProgress) {
+                setTimeout(originInfo, 5000);
             }
+        }
 
-            // Initial AJAX settings will tell back end to compare local git against origin to determine commits behind
+        var originInfo = function(force) {
             let settings = Object.assign({
                 url : Jupyter.session_list.base_url + 'git/origin-info',
                 type : 'put',
+                data: JSON.stringify({path: Jupyter.notebook_list.notebook_path, force: force === true}),
                 success : function(){},
                 error : function(){}
             }, polling_settings_template);
 
-            // Inject data from AJAX call into the DOM
-            let renderInfo = function (data) {
-                // Render commits behind if it is in the response. Otherwise don't overwrite the element=
-                $('#git-commits-behind-ahead').text(
-                    data.repoInfo.commitsBehind + ' Commits behind, ' + data.repoInfo.commitsAhead + ' Commits ahead'
-                );
-            }
-
             // Add render function as callback
-            settings.success = renderInfo;
+            settings.success = renderOriginInfo;
+
+            // Repos without an upstream or outside of any repo have nothing to show
+            settings.error = function() {
+                $('#git-commits-behind-ahead').text('');
+            }
 
             // Send request to API
             $.ajax(settings);
         }
-        originInfo();
 
 
         /********************
         Buttons and functions
         ********************/
+        /*
+        List branches and check out the one picked
+        */
+        var branches = function() {
+            let checkout = function(branch, remote) {
+                let settings = Object.assign({
+                    url : Jupyter.session_list.base_url + 'git/branches',
+                    type : 'PUT',
+                    data: JSON.stringify({path: Jupyter.notebook_list.notebook_path, branch: branch, remote: remote})
+                }, settings_template);
+
+                // Queue the checkout behind any commit, pull, or push and wait for it to finish
+                gitUtils.submitJob(Jupyter.session_list.base_url, settings);
+                $('.modal').modal('hide');
+            }
+
+            let createList = function(title, items, current, remote) {
+                let list = $('<div class="list-group"/>');
+                items.forEach(function(item) {
+                    let row = $('<a href="#" class="list-group-item"/>')
+                        .append($('<span/>').text(item.name))
+                        .append($('<span class="text-muted pull-right"/>').text(item.timestamp ? moment(item.timestamp).fromNow() : ''));
+                    if (!remote && item.name == current) {
+                        row.addClass('active');
+                    }
+                    row.click(function(e) {
+                        e.preventDefault();
+                        if (remote || item.name != current) {
+                            checkout(item.name, remote);
+                        }
+                    });
+                    list.append(row);
+                });
+                return [$('<h4/>').text(title), list];
+            }
+
+            let settings = Object.assign({
+                url : Jupyter.session_list.base_url + 'git/branches?path=' + encodeURIComponent(Jupyter.notebook_list.notebook_path),
+                type : 'GET',
+                success: function(data) {
+                    let modal_body = $('<div/>').css({'max-height': '60vh', 'overflow-y': 'auto'})
+                        .append(createList('Local branches', data.local, data.current, false))
+                        .append(createList('Remote branches', data.remote, data.current, true));
+                    dialog.modal({
+                        body: modal_body,
+                        title: 'Switch Branch',
+                        buttons: {'Close': {}}
+                    });
+                }
+            }, polling_settings_template);
+
+            $.ajax(settings);
+        }
+
         /*
         Push repo
         */
         var push = function() {
             let settings = Object.assign({
                 url : Jupyter.session_list.base_url + 'git/push',
-                type : 'PUT'
+                type : 'PUT',
+                data: JSON.stringify({path: Jupyter.notebook_list.notebook_path})
             }, settings_template);
 
             let _success = settings.success;
@@ -318,8 +547,18 @@ define([
                 originInfo();
             }
 
-            // Send request to API
-            $.ajax(settings);
+            // Stream progress when possible, otherwise send a plain request to the API
+            gitUtils.runWithProgress(Jupyter.session_list.base_url, 'push', Jupyter.notebook_list.notebook_path, '#tab_content', {
+                success: settings.success,
+                error: function(message) {
+                    gitUtils.createNotification(message, true, '#tab_content');
+                    Jupyter.notebook_list.load_sessions();
+                    originInfo();
+                },
+                fallback: function() {
+                    gitUtils.submitJob(Jupyter.session_list.base_url, settings);
+                }
+            });
         }
 
 
@@ -347,6 +586,10 @@ define([
                     .append($('<input type="checkbox" name="push-changes" id="push-changes" checked/>'))
                     .append($('<label for="push-changes"/>').html('&nbsp;Push changes'))
                 )
+                .append($('<div/>')
+                    .append($('<input type="checkbox" name="strip-outputs" id="strip-outputs"/>'))
+                    .append($('<label for="strip-outputs"/>').html('&nbsp;Remove notebook outputs from the commit'))
+                )
                 .append($('<div/>')
                     .append($('<p/>').text('Commit Message:')
                         .append($('<span/>').css('color', 'red').text('*'))
@@ -354,6 +597,17 @@ define([
                     .append($('<textarea id="commit-message" rows="3" cols="50">'))
                 );
 
+            // Let the selected files' changes be reviewed, each diff is only loaded when expanded
+            if (!commit_all) {
+                let changes = $('<div/>').append($('<p/>').text('Changes:'));
+                Jupyter.notebook_list.selected.forEach(function(item) {
+                    if (item.type != 'directory') {
+                        changes.append(gitUtils.createDiffViewer(Jupyter.session_list.base_url, item.path, item.name));
+                    }
+                });
+                modal_body.append(changes);
+            }
+
             function on_open(){
                 // Disable automatic close of modal on submit so we can form validate
                 $('button:contains("Commit")').removeAttr("data-dismiss");
@@ -374,6 +628,7 @@ define([
 
                 // Read data from modal form
                 let push_changes = $('#push-changes').is(':checked');
+                let strip_outputs = $('#strip-outputs').is(':checked');
                 let message = $('#commit-message').val().trim();
                 
                 // Do some form validation
@@ -384,10 +639,16 @@ define([
                 }
 
                 // Construct data payload for API call
+                // The path tells the back end which repo is being committed to
                 let payload = {
+                    path: Jupyter.notebook_list.notebook_path,
                     files: files,
                     message: message
                 }
+                // Leave it to the server's default unless asked
+                if (strip_outputs) {
+                    payload.stripOutputs = 'strip';
+                }
 
                 let settings = Object.assign({
                     url : Jupyter.session_list.base_url + 'git/commit',
@@ -403,8 +664,8 @@ define([
                     }
                 }
 
-                // Send request to API
-                $.ajax(settings);
+                // Queue the commit and wait for it to finish
+                gitUtils.submitJob(Jupyter.session_list.base_url, settings);
 
                 // Dismiss modal manually
                 $('.modal').modal('hide');
@@ -454,7 +715,8 @@ define([
 
             let settings = Object.assign({
                 url : Jupyter.session_list.base_url + 'git/pull',
-                type : 'PUT'
+                type : 'PUT',
+                data: JSON.stringify({path: Jupyter.notebook_list.notebook_path})
             }, settings_template);
 
             let _success = settings.success;
@@ -463,8 +725,17 @@ define([
                 originInfo();
             }
 
-            // Send request to API
-            $.ajax(settings);
+            // Stream progress when possible, otherwise send a plain request to the API
+            gitUtils.runWithProgress(Jupyter.session_list.base_url, 'pull', Jupyter.notebook_list.notebook_path, '#tab_content', {
+                success: settings.success,
+                error: function(message) {
+                    gitUtils.createNotification(message, true, '#tab_content');
+                    Jupyter.notebook_list.load_sessions();
+                },
+                fallback: function() {
+                    gitUtils.submitJob(Jupyter.session_list.base_url, settings);
+                }
+            });
         }
         $('#git-global-pull-push').append(
             $('<button/>').addClass('btn btn-default btn-xs').text('Pull').click(pull).css({'width': '62px', 'text-align': 'center'})
@@ -95,6 +95,10 @@ define([
     */
     function parseRequestError(data, default_message) {
         let error_message = null;
+        if (data.job) {
+            // Failed jobs report their error as the job's status
+            return data.job.statusText;
+        }
         try {
             error_message = $(data.responseText).find('.traceback').text();
         } catch(error) {
@@ -105,6 +109,233 @@ define([
     }
 
 
+    /*
+    Sends a commit, pull, or push request as a queued job and polls the job until it finishes.
+    settings.success and settings.error are called once the job has finished, like they would
+    be for a request that waits on the job.
+
+    :param base_url: is the notebook server's base url
+    :param settings: is the AJAX settings for the request
+    */
+    function submitJob(base_url, settings) {
+        let payload = JSON.parse(settings.data || '{}');
+        payload.async = true;
+        $.ajax(Object.assign({}, settings, {
+            data: JSON.stringify(payload),
+            success: function(data) {
+                pollJob(base_url, data.job, settings, 250);
+            }
+        }));
+    }
+
+    /*
+    Checks a job's status until it finishes, backing off up to every 2 seconds
+    */
+    function pollJob(base_url, job, settings, delay) {
+        if (job.state == 'succeeded') {
+            settings.success({status: 200, statusText: job.statusText, job: job});
+            return;
+        }
+        if (job.state == 'failed') {
+            settings.error({status: 500, job: job});
+            return;
+        }
+        setTimeout(function() {
+            $.ajax(Object.assign({}, settings_template, {
+                url: base_url + 'git/jobs/' + job.id,
+                type: 'GET',
+                success: function(data) {
+                    pollJob(base_url, data.job, settings, Math.min(delay * 2, 2000));
+                },
+                error: settings.error
+            }));
+        }, delay);
+    }
+
+    /*
+    Runs a push, pull, or fetch over a WebSocket, showing its progress with a cancel button
+
+    :param base_url: is the notebook server's base url
+    :param action: is "push", "pull", or "fetch"
+    :param path: is the path in the file browser used to find the repo
+    :param element_selector: is where to show progress
+    :param callbacks: is an object with success(data), error(message), and fallback() functions.
+        fallback is called if the WebSocket can't be opened so the plain AJAX request can be used.
+    */
+    function runWithProgress(base_url, action, path, element_selector, callbacks) {
+        let protocol = window.location.protocol == 'https:' ? 'wss://' : 'ws://';
+        let socket = null;
+        try {
+            socket = new WebSocket(protocol + window.location.host + base_url + 'git/progress');
+        } catch(error) {
+            callbacks.fallback();
+            return;
+        }
+
+        let opened = false;
+        let finished = false;
+        let bar = $('<div class="progress-bar" role="progressbar"/>').css('width', '0%');
+        let label = $('<span/>').text('Starting ' + action + '...');
+        let cancel = $('<button/>').attr('type', 'button').addClass('btn btn-default btn-xs').text('Cancel').click(function() {
+            cancel.prop('disabled', true);
+            socket.send(JSON.stringify({action: 'cancel'}));
+        });
+        let panel = $('<div/>').attr('role', 'status').addClass('git-feedback alert alert-info')
+            .append($('<p/>').append(label).append(' ').append(cancel))
+            .append($('<div class="progress"/>').css('margin-bottom', '0').append(bar));
+
+        function finish() {
+            finished = true;
+            panel.remove();
+            socket.close();
+        }
+
+        socket.onopen = function() {
+            opened = true;
+            clearNotification();
+            $(element_selector).prepend(panel);
+            socket.send(JSON.stringify({action: action, path: path}));
+        };
+
+        socket.onmessage = function(event) {
+            let message = JSON.parse(event.data);
+            if (message.type == 'queued') {
+                label.text(message.job.statusText);
+            } else if (message.type == 'progress') {
+                let text = message.operation;
+                if (message.total) {
+                    text += ': ' + message.current + '/' + message.total;
+                }
+                if (message.transferred) {
+                    text += ', ' + message.transferred;
+                }
+                if (message.rate) {
+                    text += ' | ' + message.rate;
+                }
+                label.text(text);
+                if (message.percent !== null) {
+                    bar.css('width', message.percent + '%');
+                }
+            } else if (message.type == 'done') {
+                finish();
+                callbacks.success(message);
+            } else {
+                finish();
+                callbacks.error(message.statusText);
+            }
+        };
+
+        socket.onclose = function() {
+            if (!opened) {
+                // WebSockets aren't available, ex. blocked by a proxy
+                callbacks.fallback();
+            } else if (!finished) {
+                panel.remove();
+                callbacks.error('Lost connection to the server during ' + action);
+            }
+        };
+    }
+
+
+    /*
+    Renders unified diff lines, coloring added and removed lines
+    */
+    function renderDiffLines(lines) {
+        let pre = $('<pre/>').css({'font-size': '11px', 'max-height': '20em', 'overflow': 'auto', 'margin': '0.25em 0'});
+        lines.forEach(function(line) {
+            let row = $('<div/>').text(line);
+            if (line.startsWith('+')) {
+                row.css('background-color', '#e6ffed');
+            } else if (line.startsWith('-')) {
+                row.css('background-color', '#ffeef0');
+            } else if (line.startsWith('@@')) {
+                row.addClass('text-muted');
+            }
+            pre.append(row);
+        });
+        return pre;
+    }
+
+    /*
+    Renders a diff from the /git/diff endpoint
+    */
+    function renderDiff(data) {
+        let body = $('<div/>');
+        if (data.kind == 'binary') {
+            return body.append($('<p class="text-muted"/>').text('Binary file ' + data.change));
+        }
+        if (data.kind == 'tooLarge') {
+            return body.append($('<p class="text-muted"/>').text('File is too large to diff'));
+        }
+        if (data.change == 'unchanged') {
+            return body.append($('<p class="text-muted"/>').text('No changes'));
+        }
+        if (data.kind == 'text') {
+            return body.append(renderDiffLines(data.lines));
+        }
+
+        data.cells.forEach(function(cell) {
+            let index = cell.newIndex !== null ? cell.newIndex : cell.oldIndex;
+            body.append($('<div/>').append($('<strong/>').text('Cell ' + (index + 1) + ' (' + cell.cellType + ') ' + cell.change)));
+            body.append(renderDiffLines(cell.diff));
+        });
+        let notes = [data.unchangedCells + ' unchanged cells'];
+        if (data.metadataChanged) {
+            notes.push('notebook metadata changed');
+        }
+        if (!data.cells.length) {
+            notes.unshift('No changes to cell sources');
+        }
+        return body.append($('<p class="text-muted"/>').text(notes.join(', ')));
+    }
+
+    /*
+    Creates a collapsed "Show changes" toggle for a file. The diff is only requested the first
+    time it is expanded, and again when notebook outputs are switched on or off.
+
+    :param base_url: is the notebook server's base url
+    :param path: is the path of the file relative to the notebook directory
+    :param label: is the text to show for the file
+    */
+    function createDiffViewer(base_url, path, label) {
+        let container = $('<div class="git-diff"/>').hide();
+        let outputs = $('<input type="checkbox"/>');
+        let content = $('<div/>');
+        let loaded = false;
+
+        function load() {
+            loaded = true;
+            content.empty().append($('<p class="text-muted"/>').text('Loading changes...'));
+            $.ajax(Object.assign({}, settings_template, {
+                url: base_url + 'git/diff?' + $.param({path: path, outputs: outputs.is(':checked') ? 1 : 0}),
+                type: 'GET',
+                success: function(data) {
+                    content.empty().append(renderDiff(data));
+                },
+                error: function(data, status, error) {
+                    loaded = false;
+                    let message = parseRequestError(data, error) || error || status;
+                    content.empty().append($('<p class="text-danger"/>').text('Failed to load changes: ' + message));
+                }
+            }));
+        }
+
+        outputs.change(load);
+        if (path.endsWith('.ipynb')) {
+            container.append($('<label/>').css('font-weight', 'normal').append(outputs).append('&nbsp;Include outputs'));
+        }
+        container.append(content);
+
+        let toggle = $('<a href="#"/>').text(label).click(function(e) {
+            e.preventDefault();
+            container.toggle();
+            if (container.is(':visible') && !loaded) {
+                load();
+            }
+        });
+        return $('<div/>').append(toggle).append(container);
+    }
+
 
     /********************
     Expose utilities
@@ -113,10 +344,13 @@ define([
         addMutedLabelStyle: addMutedLabelStyle,
         basename: basename,
         clearNotification: clearNotification,
+        createDiffViewer: createDiffViewer,
         createNotification: createNotification,
         getXSRFToken: getXSRFToken,
         parseRequestError: parseRequestError,
         repositoryIcon: repositoryIcon,
-        settings_template: settings_template
+        runWithProgress: runWithProgress,
+        settings_template: settings_template,
+        submitJob: submitJob
     };
 })
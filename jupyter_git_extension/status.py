@@ -0,0 +1,427 @@
+"""
+Cached repo status so unchanged repos don't rerun git on every tree redraw
+"""
+import functools
+import inspect
+import os
+import threading
+import time
+
+_status_cache = None
+_untracked_scanner = None
+
+# Label given to a directory for each status found somewhere beneath it
+STATUS_ROLLUPS = {
+    "modified": "modifiedContents",
+    "deleted": "deletedContents",
+    "untracked": "untrackedContents",
+}
+
+
+def find_git_dir(worktree):
+    """
+    Finds the git directory for a worktree without starting any git processes
+
+    :param worktree: is the path to the root of the working tree
+    :return: path to the git directory
+    """
+    dot_git = os.path.join(worktree, ".git")
+    if os.path.isfile(dot_git):
+        # Worktrees and submodules use a file pointing at the real git directory
+        with open(dot_git) as f:
+            content = f.read().strip()
+        if content.startswith("gitdir:"):
+            return os.path.normpath(
+                os.path.join(worktree, content[len("gitdir:") :].strip())
+            )
+    return dot_git
+
+
+def find_common_dir(git_dir):
+    """
+    Finds the directory holding refs, objects, and config shared by all worktrees
+
+    :param git_dir: is the path to a git directory
+    :return: path to the common git directory, git_dir itself outside of worktrees
+    """
+    commondir_file = os.path.join(git_dir, "commondir")
+    if os.path.isfile(commondir_file):
+        with open(commondir_file) as f:
+            return os.path.normpath(os.path.join(git_dir, f.read().strip()))
+    return git_dir
+
+
+def _stat_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def repo_fingerprint(git_dir):
+    """
+    Stats the files in a git directory that repo status depends on. The index
+    changes on stage/commit/checkout, HEAD and the branch ref on commit/switch,
+    and config when the remote is changed.
+
+    :param git_dir: is the path to the git directory
+    :return: tuple that changes whenever any of those files change
+    """
+    common_dir = find_common_dir(git_dir)
+    paths = [
+        os.path.join(git_dir, "index"),
+        os.path.join(git_dir, "HEAD"),
+        os.path.join(common_dir, "config"),
+        os.path.join(common_dir, "packed-refs"),
+    ]
+    try:
+        with open(os.path.join(git_dir, "HEAD")) as f:
+            head = f.read().strip()
+        if head.startswith("ref:"):
+            paths.append(os.path.join(common_dir, head[len("ref:") :].strip()))
+    except OSError:
+        pass
+
+    return tuple(_stat_signature(path) for path in paths)
+
+
+class StatusIndex:
+    """
+    File status grouped by directory so a single directory listing can be served
+    without looking at changes elsewhere in the repo. Directories get rollup
+    statuses for any changes in their contents.
+    """
+
+    def __init__(self, modified=(), deleted=(), untracked=()):
+        """
+        :param modified: is a list of repo relative paths of modified files
+        :param deleted: is a list of repo relative paths of deleted files
+        :param untracked: is a list of repo relative paths of untracked files
+        """
+        self._directories = {}
+        for status, paths in (
+            ("modified", modified),
+            ("deleted", deleted),
+            ("untracked", untracked),
+        ):
+            for path in paths:
+                self.add(path, status)
+
+    def add(self, path, status):
+        """
+        Adds a file's status to its directory and rolls it up to every parent
+
+        :param path: is the repo relative path of the file, or of a directory ending in /
+        :param status: is "modified", "deleted" or "untracked"
+        :return: None
+        """
+        parts = path.strip("/").split("/")
+        rollup = STATUS_ROLLUPS[status]
+        # Directories listed as a single entry (ex. "outputs/") get the rollup status
+        is_directory = path.endswith("/")
+        for depth, name in enumerate(parts):
+            entries = self._directories.setdefault("/".join(parts[:depth]), {})
+            if depth == len(parts) - 1 and not is_directory:
+                entries.setdefault(name, set()).add(status)
+            else:
+                entries.setdefault(name, set()).add(rollup)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, StatusIndex) and self._directories == other._directories
+        )
+
+    def listing(self, directory):
+        """
+        :param directory: is the repo relative path of the directory, "" for the root
+        :return: Dict of entry name -> sorted list of statuses for changed entries
+        """
+        entries = self._directories.get(directory.strip("/"), {})
+        return {name: sorted(statuses) for name, statuses in entries.items()}
+
+
+class UntrackedScanner:
+    """
+    Lists untracked files with a bounded cost. Directories holding only untracked
+    files can be listed as one entry, configured directories are never walked, and
+    the scan can stop after a number of entries.
+    """
+
+    def __init__(self, mode="all", max_entries=0, skip_dirs=()):
+        """
+        :param mode: is "all" to list every file or "normal" to list untracked
+            directories as a single entry ending in /
+        :param max_entries: is the number of entries after which to stop. 0 for no limit
+        :param skip_dirs: is a list of gitignore style patterns to leave out
+        """
+        self.mode = mode
+        self.max_entries = max_entries
+        self.skip_dirs = list(skip_dirs)
+
+    def scan(self, repo):
+        """
+        :param repo: is the git.Repo to scan
+        :return: tuple of the list of untracked paths and whether the scan stopped early
+        """
+        return self.scan_git(repo.git)
+
+    def scan_git(self, git_cmd, paths=()):
+        """
+        :param git_cmd: is the git.Git command wrapper of the working tree to scan
+        :param paths: is an optional list of worktree relative paths to limit the scan to
+        :return: tuple of the list of untracked paths and whether the scan stopped early
+        """
+        args = ["--others", "--exclude-standard", "-z"]
+        if self.mode == "normal":
+            args.append("--directory")
+        args.extend(f"--exclude={pattern}" for pattern in self.skip_dirs)
+        kwargs = {}
+        if paths:
+            # Paths come straight from the filesystem so don't treat them as globs
+            args.extend(["--", *paths])
+            kwargs["env"] = {"GIT_LITERAL_PATHSPECS": "1"}
+        # ls-files doesn't refresh the index like status does, so it won't change
+        # the repo fingerprint the status cache is keyed on
+        handle = git_cmd.ls_files(*args, as_process=True, **kwargs)
+        process = handle.proc
+
+        paths = []
+        buffer = b""
+        truncated = False
+        while True:
+            chunk = process.stdout.read1(65536)
+            if not chunk:
+                break
+            entries = (buffer + chunk).split(b"\0")
+            buffer = entries.pop()
+            paths.extend(entry.decode("utf-8", "surrogateescape") for entry in entries)
+            if self.max_entries and len(paths) > self.max_entries:
+                truncated = True
+                process.kill()
+                break
+
+        if truncated:
+            process.stdout.close()
+            process.wait()
+            return paths[: self.max_entries], True
+
+        handle.wait()
+        if buffer:
+            paths.append(buffer.decode("utf-8", "surrogateescape"))
+        return paths, False
+
+
+class StatusCache:
+    """
+    Repo status keyed by the real path of the working tree, so paths through
+    symlinks invalidate the same entries. Entries are reused until the repo's
+    fingerprint changes, they are invalidated by a write, or they reach max_age.
+    """
+
+    def __init__(self, max_age=60.0):
+        """
+        :param max_age: is the number of seconds an entry can be reused, catching
+            edits made outside of jupyter (ex. from a terminal). 0 disables expiry.
+        """
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """
+        Registers a callback run after every invalidation. It may be called from any
+        thread.
+
+        :param listener: is called with the invalidated path, or None for everything
+        :return: None
+        """
+        self._listeners.append(listener)
+
+    def fingerprint(self, path):
+        """
+        Takes a fingerprint of a repo. Take it before computing status so changes
+        made during the computation aren't hidden by the stored entry.
+
+        :param path: is the path to the working tree
+        :return: opaque fingerprint to pass to get() and put()
+        """
+        path = os.path.realpath(path)
+        with self._lock:
+            generation = self._generation
+        return (generation, repo_fingerprint(find_git_dir(path)))
+
+    def get(self, path, fingerprint):
+        """
+        :param path: is the path to the working tree
+        :param fingerprint: is the result of fingerprint()
+        :return: the cached status or None on a miss
+        """
+        path = os.path.realpath(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                stored_fingerprint, stored_at, value = entry
+                expired = self.max_age and time.monotonic() - stored_at > self.max_age
+                if stored_fingerprint[1] == fingerprint[1] and not expired:
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, path, fingerprint, value):
+        """
+        Stores a status. It is dropped if an invalidation happened since the
+        fingerprint was taken since the value may already be stale.
+
+        :param path: is the path to the working tree
+        :param fingerprint: is the result of fingerprint() taken before computing value
+        :param value: is the status to cache
+        :return: None
+        """
+        path = os.path.realpath(path)
+        with self._lock:
+            if fingerprint[0] != self._generation:
+                return
+            self._entries[path] = (fingerprint, time.monotonic(), value)
+
+    def invalidate(self, path=None):
+        """
+        Drops cached status for every repo containing path
+
+        :param path: is a changed file/directory or repo. Drops everything if None
+        :return: None
+        """
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if path is None:
+                self._entries.clear()
+            else:
+                path = os.path.realpath(path)
+                for root in list(self._entries):
+                    if path == root or path.startswith(root + os.sep):
+                        del self._entries[root]
+        for listener in self._listeners:
+            listener(path)
+
+    def clear(self):
+        """
+        Drops all entries and resets counters
+        """
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.hits = self.misses = self.invalidations = 0
+
+    def stats(self):
+        """
+        :return: Dict with cache size and hit/miss counters
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+def get_status_cache():
+    """
+    Returns the process wide status cache
+    """
+    global _status_cache
+    if _status_cache is None:
+        _status_cache = StatusCache()
+    return _status_cache
+
+
+def configure_status_cache(config):
+    """
+    Replaces the process wide status cache with one built from the extension config
+
+    :param config: is a GitExtensionConfig
+    :return: the new StatusCache
+    """
+    global _status_cache
+    _status_cache = StatusCache(max_age=config.status_cache_max_age)
+    return _status_cache
+
+
+def get_untracked_scanner():
+    """
+    Returns the process wide untracked file scanner
+    """
+    global _untracked_scanner
+    if _untracked_scanner is None:
+        _untracked_scanner = UntrackedScanner()
+    return _untracked_scanner
+
+
+def configure_untracked_scanner(config):
+    """
+    Replaces the process wide untracked file scanner with one built from the extension config
+
+    :param config: is a GitExtensionConfig
+    :return: the new UntrackedScanner
+    """
+    global _untracked_scanner
+    _untracked_scanner = UntrackedScanner(
+        mode=config.untracked_files,
+        max_entries=config.untracked_max_entries,
+        skip_dirs=config.untracked_skip_dirs,
+    )
+    return _untracked_scanner
+
+
+def watch_contents_manager(contents_manager):
+    """
+    Wraps the write methods of a contents manager so saves, deletes, and renames
+    made through jupyter invalidate the cached status of the affected repo
+
+    :param contents_manager: is the notebook server's contents manager
+    :return: None
+    """
+    root_dir = getattr(contents_manager, "root_dir", None)
+    if root_dir is not None:
+        # Repos are found, and their status cached, under the real notebook directory
+        root_dir = os.path.realpath(root_dir)
+
+    def invalidate(*paths):
+        cache = get_status_cache()
+        if root_dir is None:
+            cache.invalidate()
+            return
+        for path in paths:
+            cache.invalidate(os.path.join(root_dir, path.strip("/")))
+
+    def wrap(method, path_count):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            result = method(*args, **kwargs)
+            paths = [arg for arg in args[:path_count] if isinstance(arg, str)]
+            if not inspect.isawaitable(result):
+                invalidate(*paths)
+                return result
+
+            async def await_then_invalidate():
+                value = await result
+                invalidate(*paths)
+                return value
+
+            return await_then_invalidate()
+
+        return wrapper
+
+    # (model, path), (path), (old_path, new_path). Only string arguments are paths
+    contents_manager.save = wrap(contents_manager.save, 2)
+    contents_manager.delete_file = wrap(contents_manager.delete_file, 1)
+    contents_manager.rename_file = wrap(contents_manager.rename_file, 2)
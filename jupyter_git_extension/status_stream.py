@@ -0,0 +1,306 @@
+"""
+Pushes repo status to open tree views so they don't poll /git/info on every redraw
+"""
+import asyncio
+import os
+import uuid
+
+_status_broadcaster = None
+
+# Keys of the repo info holding repo wide file lists, replaced by per directory entries
+FILE_LIST_KEYS = ("modifiedFiles", "deletedFiles", "untrackedFiles")
+
+
+class StatusSubscriber:
+    """
+    A client following the status of one directory
+    """
+
+    def __init__(self, send):
+        """
+        :param send: is called with each message dict for the client
+        """
+        self.send = send
+        self.repo = None
+        self.directory = None
+        # What the client was last sent, None until it has a full listing
+        self.entries = None
+        self.repo_info = None
+        self.error = None
+
+
+class _RepoState:
+    """
+    Status and subscribers of a single repo
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.status = None
+        self.subscribers = set()
+        self.refreshing = None
+        self.pending = False
+        self.poller = None
+        self.debounce = None
+
+
+class StatusBroadcaster:
+    """
+    Computes each repo's status once for every client following it and sends each
+    client only the entries of its directory that changed. Status is recomputed when
+    the status cache is invalidated (saves, commits, watched filesystem events) and
+    checked every interval, which is answered from the status cache unless the repo
+    changed.
+
+    Every change to a repo's status bumps its version. Clients pass back the epoch and
+    version they have when resubscribing to the same directory, ex. after a
+    reconnect, and aren't sent anything when they are already current.
+    """
+
+    def __init__(self, load_status, interval=10.0, debounce=0.25, log=None):
+        """
+        :param load_status: is a coroutine function taking a repo path and returning
+            its (repo info, StatusIndex)
+        :param interval: is the number of seconds between checks of followed repos
+        :param debounce: is the number of seconds to wait after an invalidation so a
+            burst of changes causes a single recompute
+        :param log: is an optional logger for failed recomputes
+        """
+        self.load_status = load_status
+        self.interval = interval
+        self.debounce = debounce
+        self.log = log
+        # Versions restart with the server, the epoch tells clients their version is from an older one
+        self.epoch = uuid.uuid4().hex
+        self.computations = 0
+        self._repos = {}
+        self._loop = None
+
+    async def subscribe(self, subscriber, repo, directory, epoch=None, version=None):
+        """
+        Starts sending a client the status of a directory, replacing what it followed before
+
+        :param subscriber: is the StatusSubscriber
+        :param repo: is the absolute path of the repo
+        :param directory: is the repo relative directory, "" for the root
+        :param epoch: is the epoch the client's status is from, if it has one
+        :param version: is the version the client's status is at, if it has one
+        :return: None
+        """
+        self._loop = asyncio.get_running_loop()
+        if subscriber.repo != repo:
+            self.unsubscribe(subscriber)
+        state = self._repos.setdefault(repo, _RepoState())
+        state.subscribers.add(subscriber)
+        subscriber.repo = repo
+        subscriber.directory = directory
+        subscriber.entries = None
+        subscriber.repo_info = None
+        subscriber.error = None
+        if state.poller is None:
+            state.poller = asyncio.ensure_future(self._poll(repo, state))
+
+        if state.status is None:
+            await self.refresh(repo)
+        elif epoch == self.epoch and version == state.version:
+            # The client is current, remember what it has so later updates are diffs
+            repo_info, status_index = state.status
+            subscriber.entries = status_index.listing(directory)
+            subscriber.repo_info = self._repo_info(repo_info)
+            subscriber.send(
+                {"type": "unchanged", "epoch": self.epoch, "version": state.version}
+            )
+        else:
+            self._send_update(state, subscriber)
+
+    def unsubscribe(self, subscriber):
+        """
+        Stops sending a client updates
+
+        :param subscriber: is the StatusSubscriber
+        :return: None
+        """
+        repo = subscriber.repo
+        state = self._repos.get(repo)
+        if state is None:
+            return
+        state.subscribers.discard(subscriber)
+        subscriber.repo = None
+        if not state.subscribers:
+            if state.poller is not None:
+                state.poller.cancel()
+            if state.debounce is not None:
+                state.debounce.cancel()
+            del self._repos[repo]
+
+    def notify(self, path=None):
+        """
+        Schedules a recompute of the repos containing path. Safe to call from any thread.
+
+        :param path: is a changed path, None for every repo
+        :return: None
+        """
+        if self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._schedule, path)
+        except RuntimeError:
+            # The event loop was closed
+            pass
+
+    def _schedule(self, path):
+        for repo, state in self._repos.items():
+            if path is not None and not (
+                path == repo
+                or path.startswith(repo + os.sep)
+                or repo.startswith(path + os.sep)
+            ):
+                continue
+            if state.debounce is None:
+                state.debounce = self._loop.call_later(
+                    self.debounce, self._debounced_refresh, repo
+                )
+
+    def _debounced_refresh(self, repo):
+        state = self._repos.get(repo)
+        if state is not None:
+            state.debounce = None
+            asyncio.ensure_future(self.refresh(repo))
+
+    async def _poll(self, repo, state):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.refresh(repo)
+
+    async def refresh(self, repo):
+        """
+        Recomputes a repo's status and sends changes to its subscribers. Refreshes
+        requested while one runs are folded into a single follow up refresh.
+
+        :param repo: is the absolute path of the repo
+        :return: None
+        """
+        state = self._repos.get(repo)
+        if state is None:
+            return
+        if state.refreshing is not None:
+            state.pending = True
+        else:
+            state.refreshing = asyncio.ensure_future(self._refresh(repo, state))
+        await asyncio.shield(state.refreshing)
+
+    async def _refresh(self, repo, state):
+        try:
+            while True:
+                state.pending = False
+                try:
+                    status = await self.load_status(repo)
+                except Exception as e:
+                    if self.log:
+                        self.log.warning(f"Status update failed for {repo}: {e}")
+                    self._publish_error(state, e)
+                else:
+                    self._publish(state, status)
+                if not state.pending:
+                    break
+        finally:
+            state.refreshing = None
+
+    def _publish(self, state, status):
+        self.computations += 1
+        changed = state.status is None or (
+            status is not state.status and status != state.status
+        )
+        if changed:
+            state.version += 1
+            state.status = status
+        for subscriber in list(state.subscribers):
+            self._send_update(state, subscriber)
+
+    def _publish_error(self, state, error):
+        state.status = None
+        message = getattr(error, "log_message", None) or str(error)
+        status_code = getattr(error, "status_code", 500)
+        for subscriber in list(state.subscribers):
+            # Periodic checks of a broken repo only tell each client once
+            if subscriber.error == message:
+                continue
+            subscriber.entries = None
+            subscriber.repo_info = None
+            subscriber.error = message
+            subscriber.send(
+                {"type": "error", "status": status_code, "statusText": message}
+            )
+
+    @staticmethod
+    def _repo_info(repo_info):
+        return {
+            key: value for key, value in repo_info.items() if key not in FILE_LIST_KEYS
+        }
+
+    def _send_update(self, state, subscriber):
+        repo_info, status_index = state.status
+        repo_info = self._repo_info(repo_info)
+        entries = status_index.listing(subscriber.directory)
+        message = {"type": "status", "epoch": self.epoch, "version": state.version}
+
+        if subscriber.entries is None:
+            message["full"] = True
+            message["repoInfo"] = dict(repo_info, entries=entries)
+        else:
+            changes = {
+                name: entries.get(name, [])
+                for name in set(entries) | set(subscriber.entries)
+                if entries.get(name) != subscriber.entries.get(name)
+            }
+            if not changes and repo_info == subscriber.repo_info:
+                return
+            message["full"] = False
+            message["changes"] = changes
+            if repo_info != subscriber.repo_info:
+                message["repoInfo"] = repo_info
+
+        subscriber.entries = entries
+        subscriber.repo_info = repo_info
+        subscriber.error = None
+        subscriber.send(message)
+
+    def stats(self):
+        """
+        :return: Dict with followed repos, subscribers, and status computations
+        """
+        return {
+            "repos": len(self._repos),
+            "subscribers": sum(len(s.subscribers) for s in self._repos.values()),
+            "computations": self.computations,
+        }
+
+
+def get_status_broadcaster():
+    """
+    Returns the process wide status broadcaster
+    """
+    global _status_broadcaster
+    if _status_broadcaster is None:
+        # Imported here since the handlers use the broadcaster
+        from .handlers import load_repo_status
+
+        _status_broadcaster = StatusBroadcaster(load_repo_status)
+    return _status_broadcaster
+
+
+def configure_status_broadcaster(config, load_status, log=None):
+    """
+    Replaces the process wide status broadcaster with one built from the extension config
+
+    :param config: is a GitExtensionConfig
+    :param load_status: is a coroutine function taking a repo path and returning
+        its (repo info, StatusIndex)
+    :param log: is an optional logger for failed recomputes
+    :return: the new StatusBroadcaster
+    """
+    global _status_broadcaster
+    _status_broadcaster = StatusBroadcaster(
+        load_status, interval=config.status_push_interval, log=log
+    )
+    return _status_broadcaster
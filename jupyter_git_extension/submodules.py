@@ -0,0 +1,183 @@
+"""
+Status of submodules collected in parallel so one slow submodule can't hold up the rest
+"""
+import os
+import posixpath
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import git
+
+from .repo_pool import get_repo_pool
+
+_submodule_scanner = None
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def list_submodules(worktree):
+    """
+    Lists checked out submodules, and the submodules nested in them, from .gitmodules.
+    Submodules that were never initialized have no files to report.
+
+    :param worktree: is the path to the root of the working tree
+    :return: list of worktree relative paths of submodules, parents before children
+    """
+    submodules = []
+    parents = [""]
+    while parents:
+        parent = parents.pop(0)
+        root = os.path.join(worktree, parent)
+        if not os.path.isfile(os.path.join(root, ".gitmodules")):
+            continue
+        try:
+            output = git.Git(root).config(
+                "--file", ".gitmodules", "--get-regexp", r"^submodule\..*\.path$"
+            )
+        except git.exc.GitCommandError:
+            # No submodule has a path
+            continue
+        for line in output.splitlines():
+            _, _, path = line.partition(" ")
+            path = posixpath.join(parent, path.strip("/"))
+            if os.path.exists(os.path.join(worktree, path, ".git")):
+                submodules.append(path)
+                parents.append(path)
+    return submodules
+
+
+def get_submodule_pool(max_workers):
+    """
+    Returns the process wide pool submodule status runs in. Every status computation
+    shares it, so at most max_workers submodule git processes run at once however
+    many repos are being checked.
+
+    :param max_workers: is the number of submodules checked at once
+    :return: ThreadPoolExecutor
+    """
+    with _pools_lock:
+        pool = _pools.get(max_workers)
+        if pool is None:
+            pool = _pools[max_workers] = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="submodule-status"
+            )
+        return pool
+
+
+class SubmoduleScanner:
+    """
+    Collects file status of every submodule in the shared submodule pool and merges
+    it into the superproject's paths. Each submodule gets timeout seconds to start
+    and timeout seconds to run; those that don't make it are reported as timed out
+    and left out instead of delaying the response. Git processes already running
+    can't be interrupted and finish in the background, holding their worker.
+    """
+
+    def __init__(self, enabled=True, timeout=5.0, max_workers=4):
+        """
+        :param enabled: is whether to collect submodule status at all
+        :param timeout: is the number of seconds each submodule can take. 0 for no limit
+        :param max_workers: is the number of submodules checked at once
+        """
+        self.enabled = enabled
+        self.timeout = timeout
+        self.max_workers = max_workers
+
+    def scan(self, worktree, status):
+        """
+        :param worktree: is the path to the root of the superproject's working tree
+        :param status: is called with the git.Repo of a submodule and returns a tuple
+            of lists of its modified, deleted, and untracked paths, and whether the
+            untracked listing stopped early
+        :return: tuple of lists of modified, deleted, and untracked paths relative to
+            worktree, whether any untracked listing stopped early, and a Dict of
+            submodule path -> "ok", "timedOut" or "failed"
+        """
+        modified, deleted, untracked = [], [], []
+        truncated = False
+        states = {}
+        submodules = list_submodules(worktree) if self.enabled else []
+        if not submodules:
+            return modified, deleted, untracked, truncated, states
+
+        started = {}
+
+        def run(path):
+            started[path] = time.monotonic()
+            with get_repo_pool().lease(os.path.join(worktree, path)) as repo:
+                return status(repo)
+
+        pool = get_submodule_pool(self.max_workers)
+        submitted = time.monotonic()
+        futures = {pool.submit(run, path): path for path in submodules}
+        pending = set(futures)
+        while pending:
+            now = time.monotonic()
+            deadlines = []
+            for future in list(pending):
+                if not self.timeout or future.done():
+                    continue
+                path = futures[future]
+                # Submodules queued behind other work time out like running ones
+                deadline = started.get(path, submitted) + self.timeout
+                if deadline <= now:
+                    future.cancel()
+                    pending.discard(future)
+                    states[path] = "timedOut"
+                else:
+                    deadlines.append(deadline)
+            if not pending:
+                break
+
+            done, pending = wait(
+                pending,
+                timeout=min(deadlines) - now if deadlines else None,
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                path = futures[future]
+                try:
+                    (
+                        sub_modified,
+                        sub_deleted,
+                        sub_untracked,
+                        sub_truncated,
+                    ) = future.result()
+                except Exception:
+                    # Only this submodule is left out, ex. a broken checkout
+                    states[path] = "failed"
+                    continue
+                states[path] = "ok"
+                modified.extend(f"{path}/{file}" for file in sub_modified)
+                deleted.extend(f"{path}/{file}" for file in sub_deleted)
+                untracked.extend(f"{path}/{file}" for file in sub_untracked)
+                truncated = truncated or sub_truncated
+
+        return modified, deleted, untracked, truncated, states
+
+
+def get_submodule_scanner():
+    """
+    Returns the process wide submodule scanner
+    """
+    global _submodule_scanner
+    if _submodule_scanner is None:
+        _submodule_scanner = SubmoduleScanner()
+    return _submodule_scanner
+
+
+def configure_submodule_scanner(config):
+    """
+    Replaces the process wide submodule scanner with one built from the extension config
+
+    :param config: is a GitExtensionConfig
+    :return: the new SubmoduleScanner
+    """
+    global _submodule_scanner
+    _submodule_scanner = SubmoduleScanner(
+        enabled=config.submodule_status,
+        timeout=config.submodule_status_timeout,
+        max_workers=config.executor_max_workers,
+    )
+    return _submodule_scanner
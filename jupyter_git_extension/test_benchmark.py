@@ -0,0 +1,66 @@
+"""
+Tester for the handler benchmark harness
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from . import benchmark
+from . import discovery
+
+
+class Tests(unittest.TestCase):
+    """
+    Basic test class
+    """
+
+    def tearDown(self):
+        # The benchmark points repo discovery at its temporary workspace
+        discovery.configure_repo_resolver(".")
+
+    def test_0001_percentile(self):
+        """
+        Test interpolated percentiles
+        """
+        values = [4, 1, 3, 2, 5]
+        self.assertEqual(3, benchmark.percentile(values, 0.5))
+        self.assertAlmostEqual(4.8, benchmark.percentile(values, 0.95))
+        self.assertEqual(7, benchmark.percentile([7], 0.95))
+
+    def test_0002_run(self):
+        """
+        Test a small end to end run writes a report for every handler
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "report.json")
+            benchmark.main(
+                [
+                    "--files=20",
+                    "--untracked=5",
+                    "--depth=2",
+                    "--commits=5",
+                    "--iterations=2",
+                    f"--output={output}",
+                ]
+            )
+            with open(output) as f:
+                report = json.load(f)
+
+        for handler in (
+            "InfoHandler",
+            "OriginInfoHandler",
+            "CommitHandler",
+            "PushHandler",
+            "PullHandler",
+        ):
+            self.assertTrue(
+                any(name.startswith(handler) for name in report["results"]), handler
+            )
+        for result in report["results"].values():
+            self.assertEqual(2, result["iterations"])
+            self.assertLessEqual(result["p50"], result["p95"])
+        self.assertGreater(report["peakRssBytes"]["server"], 0)
+        self.assertFalse(report["startup"]["gitImportedAtStartup"])
+        self.assertEqual(2, report["startup"]["import"]["iterations"])
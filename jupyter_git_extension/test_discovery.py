@@ -0,0 +1,125 @@
+"""
+Tester for resolving repos from file browser paths
+"""
+
+import os
+import tempfile
+import unittest
+
+import git
+import mock
+
+from . import discovery
+from .conftest import init_repo
+
+
+class Tests(unittest.TestCase):
+    """
+    Basic test class
+    """
+
+    def setUp(self):
+        """
+        Create a notebook directory holding two repos, a linked worktree,
+        and a plain directory
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self.tmp_dir.name)
+        for name in ("one", "two"):
+            repo = init_repo(os.path.join(self.root, name))
+            repo.git.commit("--allow-empty", "-m", "initial")
+            repo.close()
+        os.makedirs(os.path.join(self.root, "one", "nested", "dir"))
+        os.makedirs(os.path.join(self.root, "plain"))
+        git.Git(os.path.join(self.root, "one")).worktree(
+            "add", os.path.join(self.root, "one", "linked")
+        )
+
+        self.resolver = discovery.RepoResolver(self.root)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_0001_resolve(self):
+        """
+        Test resolving files and directories to their nearest enclosing repo
+        """
+        one = os.path.join(self.root, "one")
+        self.assertEqual((one, ""), self.resolver.resolve("one"))
+        self.assertEqual((one, "nested/dir"), self.resolver.resolve("/one/nested/dir/"))
+        self.assertEqual(
+            (one, "nested/dir/new.ipynb"),
+            self.resolver.resolve("one/nested/dir/new.ipynb"),
+        )
+        self.assertEqual(
+            (os.path.join(self.root, "two"), "a.txt"),
+            self.resolver.resolve("two/a.txt"),
+        )
+        self.assertEqual(
+            (os.path.join(one, "linked"), ""), self.resolver.resolve("one/linked")
+        )
+
+    def test_0002_not_a_repo(self):
+        """
+        Test paths outside of any repo or outside of the notebook directory
+        """
+        with self.assertRaises(git.exc.InvalidGitRepositoryError):
+            self.resolver.resolve("plain")
+
+        with self.assertRaises(ValueError):
+            self.resolver.resolve("../elsewhere")
+
+    def test_0003_cached_lookups(self):
+        """
+        Test that searches stop at repo roots seen before
+        """
+        self.resolver.resolve("one/nested/dir")
+
+        with mock.patch.object(
+            discovery.os.path, "exists", wraps=os.path.exists
+        ) as exists:
+            self.resolver.resolve("one/nested")
+            self.resolver.resolve("one/nested/dir/file.txt")
+
+        # Directories below the root, and the check that the cached repo still exists
+        checked = [call.args[0] for call in exists.call_args_list]
+        self.assertEqual(
+            [
+                os.path.join(self.root, "one", "nested", ".git"),
+                os.path.join(self.root, "one", ".git"),
+                os.path.join(self.root, "one", "nested", "dir", ".git"),
+                os.path.join(self.root, "one", "nested", ".git"),
+                os.path.join(self.root, "one", ".git"),
+            ],
+            checked,
+        )
+
+    def test_0004_removed_repo(self):
+        """
+        Test that a removed repo is noticed and the search repeated
+        """
+        self.resolver.resolve("two")
+        git_dir = os.path.join(self.root, "two", ".git")
+        os.rename(git_dir, git_dir + "-moved")
+
+        with self.assertRaises(git.exc.InvalidGitRepositoryError):
+            self.resolver.resolve("two")
+
+    def test_0005_repo_created_after_lookup(self):
+        """
+        Test repos created in directories looked up before are found
+        """
+        with self.assertRaises(git.exc.InvalidGitRepositoryError):
+            self.resolver.resolve("plain")
+        git.Repo.init(os.path.join(self.root, "plain")).close()
+        self.assertEqual(
+            (os.path.join(self.root, "plain"), ""), self.resolver.resolve("plain")
+        )
+
+        # A repo nested in a directory already resolved to the outer repo
+        self.resolver.resolve("one/nested/dir")
+        git.Repo.init(os.path.join(self.root, "one", "nested")).close()
+        self.assertEqual(
+            (os.path.join(self.root, "one", "nested"), "dir"),
+            self.resolver.resolve("one/nested/dir"),
+        )
@@ -0,0 +1,89 @@
+"""
+Tester for the git worker pool
+"""
+
+import asyncio
+import os
+import threading
+import unittest
+
+from . import executor
+from .metrics import SUBPROCESSES, get_metrics
+
+
+def count_subprocess(command):
+    """
+    Records a git process in the metrics of the process it runs in
+    """
+    get_metrics().increment(SUBPROCESSES, command=command)
+    if command == "fail":
+        raise ValueError(command)
+    return os.getpid()
+
+
+class Tests(unittest.TestCase):
+    """
+    Basic test class
+    """
+
+    def setUp(self):
+        self.executor = executor.GitExecutor(max_workers=2, max_queue_depth=1)
+
+    def tearDown(self):
+        self.executor.shutdown(wait=True)
+
+    def test_0001_submit(self):
+        """
+        Test that submitted work runs off the calling thread and returns its result
+        """
+
+        async def run():
+            return await self.executor.submit(".", threading.get_ident)
+
+        self.assertNotEqual(threading.get_ident(), asyncio.run(run()))
+        self.assertEqual(0, self.executor.stats()["inFlight"])
+
+    def test_0002_queue_depth(self):
+        """
+        Test that a repo over its queue depth is rejected while other repos still run
+        """
+        release = threading.Event()
+
+        async def run():
+            blocked = self.executor.submit("repo-a", release.wait)
+
+            with self.assertRaises(executor.ExecutorSaturatedError):
+                self.executor.submit("repo-a", release.wait)
+
+            stats = self.executor.stats()
+            self.assertEqual(1, stats["inFlight"])
+            self.assertEqual(1, stats["rejected"])
+            self.assertEqual(0.5, stats["saturation"])
+            self.assertEqual({os.path.abspath("repo-a"): 1}, stats["repos"])
+
+            other = await self.executor.submit("repo-b", lambda: "done")
+            release.set()
+            await blocked
+            return other
+
+        self.assertEqual("done", asyncio.run(run()))
+        self.assertEqual({}, self.executor.stats()["repos"])
+
+    def test_0003_process_metrics(self):
+        """
+        Test metrics recorded in worker processes reach this process's registry
+        """
+        pool = executor.GitExecutor(kind="process", max_workers=1)
+        self.addCleanup(pool.shutdown, wait=True)
+        get_metrics().clear()
+
+        async def run():
+            pid = await pool.submit(".", count_subprocess, "status")
+            with self.assertRaises(ValueError):
+                await pool.submit(".", count_subprocess, "fail")
+            return pid
+
+        self.assertNotEqual(os.getpid(), asyncio.run(run()))
+        rendered = get_metrics().render().splitlines()
+        self.assertIn(f'{SUBPROCESSES}{{command="status"}} 1', rendered)
+        self.assertIn(f'{SUBPROCESSES}{{command="fail"}} 1', rendered)
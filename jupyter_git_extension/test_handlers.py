@@ -2,18 +2,25 @@
 Tester for notebook git api handlers
 """
 
+import asyncio
 import functools
+import json
 import unittest
 import mock
 import os
 import re
+import tempfile
+import threading
 
 import git
 from notebook.base.handlers import IPythonHandler
-from tornado import web
+from tornado import httputil, web
 
+from . import discovery
 from . import handlers
 from . import version
+from .remote import FetchStrategy
+from .conftest import clone_repo, init_repo, write_file
 
 
 def mock_handler(base_class):
@@ -51,32 +58,29 @@ class Tests(unittest.TestCase):
         pass
 
     def setUp(self):
-        pass
+        handlers.get_status_cache().clear()
+        handlers.get_fetch_scheduler().clear()
+        handlers.get_ahead_behind_counter().clear()
+        handlers.get_job_queue().clear()
 
     def tearDown(self):
         pass
 
-    class MockRepo:
-        """
-        Class used to "mock" the git.Repo and set object level vars
-        """
-
-        def __init__(self, path, *args, **kwargs):
-            self.working_tree_dir = os.path.abspath(path)
-
-    @mock.patch("git.Repo", new=MockRepo)
-    def test_0001_get_repo(self):
+    def test_0001_open_repo(self):
         """
-        Test getting a git repo with and without a path
+        Test leasing a git repo from the pool by path
         """
+        with tempfile.TemporaryDirectory() as path:
+            path = os.path.realpath(path)
+            git.Repo.init(path).close()
 
-        absolute_path = os.path.abspath(".")
-        repo = handlers.get_repo()
-
-        self.assertEqual(absolute_path, repo.working_tree_dir)
+            with handlers.open_repo(path) as repo:
+                self.assertEqual(path, repo.working_tree_dir)
 
-        repo = handlers.get_repo(absolute_path)
-        self.assertEqual(absolute_path, repo.working_tree_dir)
+            # Released repos are reused by the next lease
+            with handlers.open_repo(path) as reused:
+                self.assertIs(repo, reused)
+            handlers.get_repo_pool().clear()
 
     def test_0002_get_browser_repo_url_from_git_url(self):
         """
@@ -136,10 +140,10 @@ class Tests(unittest.TestCase):
 
     @mock.patch(f"{__name__}.handlers.BaseHandler.get_json_body")
     @mock.patch(f"{__name__}.handlers.BaseHandler.write_response")
-    @mock.patch(f"{__name__}.handlers.get_repo")
+    @mock.patch(f"{__name__}.handlers.open_repo")
     def test_0007_commithandler_put(
         self,
-        mock_get_repo: mock.MagicMock,
+        mock_open_repo: mock.MagicMock,
         mock_write_response: mock.MagicMock,
         mock_get_json_body: mock.MagicMock,
     ):
@@ -148,11 +152,21 @@ class Tests(unittest.TestCase):
         the correct git commands to add, commit, push, and sends
         a response
         """
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        expected_files = ["a.txt", ".mything.sh"]
+        for file in expected_files:
+            write_file(tmp_dir.name, file, "content\n")
+
         mock_repo = mock.Mock()
+        mock_repo.working_tree_dir = tmp_dir.name
+        pathspecs = []
+        mock_repo.git.add.side_effect = lambda *args, istream, **kwargs: (
+            pathspecs.append(istream.read())
+        )
 
-        mock_get_repo.return_value = mock_repo
+        mock_open_repo.return_value.__enter__.return_value = mock_repo
 
-        expected_files = ["a.txt", ".mything.sh"]
         expected_message = "I am doing a commit"
         mock_get_json_body.return_value = {
             "files": expected_files,
@@ -161,44 +175,65 @@ class Tests(unittest.TestCase):
 
         # Test successful commit
         handler = mock_handler(handlers.CommitHandler)
-        handler.put()
+        asyncio.run(handler.put())
 
-        mock_repo.git.add.assert_called_with(expected_files)
+        mock_repo.git.add.assert_called_once_with(
+            "--all",
+            "--pathspec-from-file=-",
+            "--pathspec-file-nul",
+            istream=mock.ANY,
+            env={"GIT_LITERAL_PATHSPECS": "1"},
+        )
+        self.assertEqual([b"a.txt\0.mything.sh"], pathspecs)
+        mock_repo.git.rm.assert_not_called()
 
-        mock_repo.index.commit.assert_called_with(expected_message)
+        mock_repo.git.commit.assert_called_with("--quiet", "-m", expected_message)
 
         self.assertTrue(mock_write_response.call_count > 0)
 
+    @mock.patch(f"{__name__}.handlers.BaseHandler.get_json_body")
     @mock.patch(f"{__name__}.handlers.BaseHandler.write_response")
-    @mock.patch(f"{__name__}.handlers.get_repo")
+    @mock.patch(f"{__name__}.handlers.open_repo")
     def test_0008_pullhandler_put(
-        self, mock_get_repo: mock.MagicMock, mock_write_response: mock.MagicMock
+        self,
+        mock_open_repo: mock.MagicMock,
+        mock_write_response: mock.MagicMock,
+        mock_get_json_body: mock.MagicMock,
     ):
         """
         Test the PullHandler. We check to ensure a pull() has been run
         and that a response was sent
         """
+        mock_get_json_body.return_value = None
         mock_repo = mock.Mock()
+        mock_repo.git.pull.return_value = (0, "", "")
 
-        mock_get_repo.return_value = mock_repo
+        mock_open_repo.return_value.__enter__.return_value = mock_repo
 
         handler = mock_handler(handlers.PullHandler)
 
-        handler.put()
+        asyncio.run(handler.put())
 
         self.assertTrue(mock_repo.git.pull.call_count > 0)
 
         self.assertTrue(mock_write_response.call_count > 0)
 
+    @mock.patch(f"{__name__}.handlers.BaseHandler.get_json_body")
     @mock.patch(f"{__name__}.handlers.BaseHandler.write_response")
-    @mock.patch(f"{__name__}.handlers.get_repo")
+    @mock.patch(f"{__name__}.handlers.open_repo")
+    @mock.patch(f"{__name__}.handlers.get_untracked_scanner")
     def test_0009_infohandler_put(
-        self, mock_get_repo: mock.MagicMock, mock_write_response: mock.MagicMock
+        self,
+        mock_get_untracked_scanner: mock.MagicMock,
+        mock_open_repo: mock.MagicMock,
+        mock_write_response: mock.MagicMock,
+        mock_get_json_body: mock.MagicMock,
     ):
         """
         Test the InfoHandler. We create a lot of mock data to ensure it's
         all returned in the correct format in the written response.
         """
+        mock_get_json_body.return_value = None
         mock_repo = mock.Mock()
 
         mock_modified_file = mock.Mock()
@@ -213,71 +248,136 @@ class Tests(unittest.TestCase):
 
         mock_repo.index.diff.return_value = diff_file_list
         mock_repo.head.commit.committed_date = 0
+        mock_repo.head.commit.hexsha = "0" * 40
         mock_repo.remotes.origin.url = "https://git.example.com/org/repo.git"
         mock_repo.active_branch.name = "master"
-        mock_repo.untracked_files = ["untracked.txt"]
+        # Without a .gitmodules there are no submodules to check
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        mock_repo.working_tree_dir = tmp_dir.name
+        mock_scan = mock_get_untracked_scanner.return_value.scan
+        mock_scan.return_value = (["untracked.txt"], False)
 
-        mock_get_repo.return_value = mock_repo
+        mock_open_repo.return_value.__enter__.return_value = mock_repo
 
         expected_dict = {
             "deletedFiles": ["deleted.txt"],
             "modifiedFiles": ["modified.txt"],
             "untrackedFiles": ["untracked.txt"],
+            "untrackedTruncated": False,
+            "submodules": {},
             "lastCommitTimestamp": "1970-01-01T00:00:00.000000Z",
             "repoUrl": "https://git.example.com/org/repo",
             "repoName": "repo",
             "orgUrl": "https://git.example.com/org",
             "orgName": "org",
             "branchName": "master",
+            "headCommit": "0" * 40,
         }
 
         handler = mock_handler(handlers.InfoHandler)
 
-        handler.put()
+        asyncio.run(handler.put())
 
         _, called_kwargs = mock_write_response.call_args
         constructed_dict = called_kwargs["repoInfo"]
 
         self.assertDictEqual(expected_dict, constructed_dict)
 
+        # A second call with an unchanged repo is answered from the cache
+        asyncio.run(handler.put())
+        self.assertEqual(1, mock_open_repo.call_count)
+
+        _, called_kwargs = mock_write_response.call_args
+        self.assertDictEqual(expected_dict, called_kwargs["repoInfo"])
+
+        # Scoping to a directory replaces the repo wide lists with that directory's entries
+        mock_scan.return_value = (
+            ["dir/untracked.txt", "dir/sub/untracked.txt", "dir/outputs/"],
+            True,
+        )
+        handlers.get_status_cache().clear()
+        mock_get_json_body.return_value = {"notebook_path": "dir"}
+        asyncio.run(handler.put())
+
+        _, called_kwargs = mock_write_response.call_args
+        constructed_dict = called_kwargs["repoInfo"]
+        self.assertNotIn("untrackedFiles", constructed_dict)
+        self.assertTrue(constructed_dict["untrackedTruncated"])
+        self.assertDictEqual(
+            {
+                "untracked.txt": ["untracked"],
+                "sub": ["untrackedContents"],
+                "outputs": ["untrackedContents"],
+            },
+            constructed_dict["entries"],
+        )
+
+    @mock.patch(f"{__name__}.handlers.BaseHandler.get_json_body")
     @mock.patch(f"{__name__}.handlers.BaseHandler.write_response")
-    @mock.patch(f"{__name__}.handlers.get_repo")
+    @mock.patch(f"{__name__}.handlers.open_repo")
     def test_0010_origininfohandler_put(
-        self, mock_get_repo: mock.MagicMock, mock_write_response: mock.MagicMock
+        self,
+        mock_open_repo: mock.MagicMock,
+        mock_write_response: mock.MagicMock,
+        mock_get_json_body: mock.MagicMock,
     ):
         """
-        Test the OriginInfoHandler. We mock the iter_commits call to simulate
+        Test the OriginInfoHandler. We mock the rev-list call to simulate
         commits ahead/behind the origin.
         """
+        # Force a fetch so it runs before the handler answers
+        mock_get_json_body.return_value = {"force": True}
         mock_repo = mock.Mock()
 
-        # simulate two commits on the first call and zero on the second call
-        mock_repo.iter_commits.side_effect = [[0, 0], []]
+        # simulate zero commits ahead and two commits behind
+        mock_repo.git.rev_parse.return_value = "aaaa\nbbbb"
+        mock_repo.git.rev_list.return_value = "0\t2"
+        mock_repo.git.fetch.return_value = (0, "", "")
         mock_repo.active_branch.name = "master"
 
-        mock_get_repo.return_value = mock_repo
+        mock_open_repo.return_value.__enter__.return_value = mock_repo
 
-        expected_dict = {"commitsBehind": 2, "commitsAhead": 0}
+        expected_dict = {
+            "commitsBehind": 2,
+            "commitsAhead": 0,
+            "fetchInProgress": False,
+            "fetchError": None,
+        }
 
         handler = mock_handler(handlers.OriginInfoHandler)
 
-        handler.put()
+        asyncio.run(handler.put())
+
+        mock_repo.git.fetch.assert_called_once_with(
+            "--progress", "origin", with_extended_output=True
+        )
 
         _, called_kwargs = mock_write_response.call_args
         constructed_dict = called_kwargs["repoInfo"]
 
+        self.assertIsNotNone(constructed_dict.pop("fetchedAt"))
+        self.assertEqual("full", constructed_dict.pop("lastFetch")["strategy"])
         self.assertDictEqual(expected_dict, constructed_dict)
+        mock_repo.git.rev_list.assert_called_with(
+            "--left-right", "--count", "aaaa...bbbb"
+        )
 
+    @mock.patch(f"{__name__}.handlers.BaseHandler.get_json_body")
     @mock.patch(f"{__name__}.handlers.BaseHandler.write_response")
-    @mock.patch(f"{__name__}.handlers.get_repo")
+    @mock.patch(f"{__name__}.handlers.open_repo")
     def test_0011_pushhandler_put(
-        self, mock_get_repo: mock.MagicMock, mock_write_response: mock.MagicMock
+        self,
+        mock_open_repo: mock.MagicMock,
+        mock_write_response: mock.MagicMock,
+        mock_get_json_body: mock.MagicMock,
     ):
         """
         Test push handler flow to ensure at a minimum it runs
         the correct git commands to push and then sends
         a response
         """
+        mock_get_json_body.return_value = None
         mock_repo = mock.Mock()
 
         mock_push_output = mock.Mock()
@@ -287,11 +387,11 @@ class Tests(unittest.TestCase):
 
         mock_repo.remotes.origin.push.return_value = [mock_push_output]
 
-        mock_get_repo.return_value = mock_repo
+        mock_open_repo.return_value.__enter__.return_value = mock_repo
 
         # Test successful push
         handler = mock_handler(handlers.PushHandler)
-        handler.put()
+        asyncio.run(handler.put())
 
         self.assertTrue(mock_repo.remotes.origin.push.call_count > 0)
 
@@ -300,14 +400,14 @@ class Tests(unittest.TestCase):
         # Test that we error successfully if the push had an error
         mock_push_output.flags = 1
         try:
-            handler.put()
+            asyncio.run(handler.put())
             self.assertTrue(False)
         except web.HTTPError as e:
             self.assertTrue(True)
 
         mock_push_output.flags = 2
         try:
-            handler.put()
+            asyncio.run(handler.put())
             self.assertTrue(False)
         except web.HTTPError as e:
             self.assertTrue(True)
@@ -319,3 +419,584 @@ class Tests(unittest.TestCase):
         match = re.fullmatch(r"\d\.\d\.\d", version.__version__)
 
         self.assertTrue(match)
+
+    @mock.patch(f"{__name__}.handlers.BaseHandler.get_json_body")
+    @mock.patch(f"{__name__}.handlers.BaseHandler.write_response")
+    @mock.patch(f"{__name__}.handlers.open_repo")
+    @mock.patch(f"{__name__}.handlers.get_repo_resolver")
+    def test_0014_commithandler_nested_repo(
+        self,
+        mock_get_repo_resolver: mock.MagicMock,
+        mock_open_repo: mock.MagicMock,
+        mock_write_response: mock.MagicMock,
+        mock_get_json_body: mock.MagicMock,
+    ):
+        """
+        Test that files are committed to the repo enclosing them, relative to its root
+        """
+        with tempfile.TemporaryDirectory() as root:
+            root = os.path.realpath(root)
+            for name in ("one", "two"):
+                git.Repo.init(os.path.join(root, name)).close()
+            mock_get_repo_resolver.return_value = discovery.RepoResolver(root)
+            mock_repo = mock.Mock()
+            mock_repo.working_tree_dir = os.path.join(root, "one")
+            mock_open_repo.return_value.__enter__.return_value = mock_repo
+            pathspecs = []
+            mock_repo.git.rm.side_effect = lambda *args, istream, env: pathspecs.append(
+                istream.read()
+            )
+
+            mock_get_json_body.return_value = {
+                "files": ["one/a.txt", "one/dir/b.txt"],
+                "message": "Nested",
+            }
+            handler = mock_handler(handlers.CommitHandler)
+            asyncio.run(handler.put())
+
+            mock_open_repo.assert_called_with(os.path.join(root, "one"))
+            self.assertEqual([b"a.txt\0dir/b.txt"], pathspecs)
+
+            mock_get_json_body.return_value = {
+                "files": ["one/a.txt", "two/b.txt"],
+                "message": "Two repos",
+            }
+            with self.assertRaises(web.HTTPError) as context:
+                asyncio.run(handler.put())
+            self.assertEqual(400, context.exception.status_code)
+
+    @mock.patch(
+        f"{__name__}.handlers.BaseHandler.current_user",
+        new_callable=mock.PropertyMock,
+        return_value="user",
+    )
+    @mock.patch(f"{__name__}.handlers.BaseHandler.set_status")
+    @mock.patch(f"{__name__}.handlers.BaseHandler.get_json_body")
+    @mock.patch(f"{__name__}.handlers.BaseHandler.write_response")
+    @mock.patch(f"{__name__}.handlers.open_repo")
+    def test_0015_async_job(
+        self,
+        mock_open_repo: mock.MagicMock,
+        mock_write_response: mock.MagicMock,
+        mock_get_json_body: mock.MagicMock,
+        mock_set_status: mock.MagicMock,
+        mock_current_user: mock.PropertyMock,
+    ):
+        """
+        Test an async pull returns the queued job and its status can be fetched
+        """
+        mock_repo = mock.Mock()
+        mock_repo.git.pull.return_value = (0, "", "")
+        mock_open_repo.return_value.__enter__.return_value = mock_repo
+        mock_get_json_body.return_value = {"async": True}
+
+        async def run():
+            await mock_handler(handlers.PullHandler).put()
+            job = mock_write_response.call_args[1]["job"]
+            self.assertEqual("queued", job["state"])
+            await handlers.get_job_queue().get(job["id"]).wait()
+
+            await mock_handler(handlers.JobHandler).get(job["id"])
+
+        asyncio.run(run())
+
+        mock_set_status.assert_called_with(202)
+        self.assertTrue(mock_repo.git.pull.call_count > 0)
+        self.assertEqual("succeeded", mock_write_response.call_args[1]["job"]["state"])
+
+        with self.assertRaises(web.HTTPError) as context:
+            asyncio.run(mock_handler(handlers.JobHandler).get("missing"))
+        self.assertEqual(404, context.exception.status_code)
+
+    def test_0016_commit_files_bulk(self):
+        """
+        Test staging many files in chunks along with deletions and literal paths
+        """
+        with tempfile.TemporaryDirectory() as root:
+            repo = init_repo(root)
+            for name in ("removed.txt", "kept.txt"):
+                write_file(root, name, name)
+            repo.git.add("--all")
+            repo.git.commit("-m", "initial")
+
+            os.remove(os.path.join(root, "removed.txt"))
+            os.makedirs(os.path.join(root, "dir"))
+            files = ["removed.txt", "[literal].txt"]
+            for i in range(25):
+                files.append(f"dir/file{i}.txt")
+            for name in files[1:]:
+                write_file(root, name, name)
+            write_file(root, "untouched.txt", "not selected")
+
+            with mock.patch(f"{__name__}.handlers.STAGE_CHUNK_SIZE", 10), mock.patch(
+                f"{__name__}.handlers.open_repo"
+            ) as mock_open_repo:
+                mock_open_repo.return_value.__enter__.return_value = repo
+                result = handlers.commit_files(files, "Bulk", path=root)
+
+            self.assertEqual(
+                {"stage", "stripOutputs", "commit", "total"}, set(result["timings"])
+            )
+            self.assertIsNone(result["outputStripping"])
+            committed = repo.git.show("--name-status", "--format=", "HEAD").splitlines()
+            self.assertIn("D\tremoved.txt", committed)
+            self.assertIn("A\t[literal].txt", committed)
+            self.assertIn("A\tdir/file24.txt", committed)
+            self.assertEqual(27, len(committed))
+            self.assertEqual(["untouched.txt"], repo.untracked_files)
+            repo.close()
+
+    @mock.patch(f"{__name__}.handlers.BaseHandler.get_json_body")
+    @mock.patch(f"{__name__}.handlers.BaseHandler.write_response")
+    @mock.patch(f"{__name__}.handlers.get_repo_status")
+    def test_0017_infohandler_coalesced(
+        self,
+        mock_get_repo_status: mock.MagicMock,
+        mock_write_response: mock.MagicMock,
+        mock_get_json_body: mock.MagicMock,
+    ):
+        """
+        Test concurrent identical status requests share one git computation
+        """
+        mock_get_json_body.return_value = {"notebook_path": ""}
+        mock_get_repo_status.return_value = (
+            {"branchName": "master"},
+            handlers.StatusIndex(modified=["a.txt"]),
+        )
+
+        async def run():
+            await asyncio.gather(
+                *(mock_handler(handlers.InfoHandler).put() for _ in range(5))
+            )
+
+        asyncio.run(run())
+
+        self.assertEqual(1, mock_get_repo_status.call_count)
+        self.assertEqual(5, mock_write_response.call_count)
+        for _, called_kwargs in mock_write_response.call_args_list:
+            self.assertEqual(
+                {"a.txt": ["modified"]}, called_kwargs["repoInfo"]["entries"]
+            )
+
+    @mock.patch(
+        f"{__name__}.handlers.BaseHandler.current_user",
+        new_callable=mock.PropertyMock,
+        return_value="user",
+    )
+    @mock.patch(f"{__name__}.handlers.BaseHandler.get_query_argument")
+    @mock.patch(f"{__name__}.handlers.BaseHandler.set_header")
+    @mock.patch(f"{__name__}.handlers.BaseHandler.flush")
+    @mock.patch(f"{__name__}.handlers.BaseHandler.write")
+    @mock.patch(f"{__name__}.handlers.get_repo_resolver")
+    def test_0018_diffhandler_get(
+        self,
+        mock_get_repo_resolver: mock.MagicMock,
+        mock_write: mock.MagicMock,
+        mock_flush: mock.MagicMock,
+        mock_set_header: mock.MagicMock,
+        mock_get_query_argument: mock.MagicMock,
+        mock_current_user: mock.MagicMock,
+    ):
+        """
+        Test a notebook is diffed cell by cell, streamed, and cached until it changes
+        """
+        handlers.get_diff_cache().clear()
+        with tempfile.TemporaryDirectory() as root:
+            root = os.path.realpath(root)
+            repo = init_repo(root)
+            mock_get_repo_resolver.return_value = discovery.RepoResolver(root)
+            nb_path = os.path.join(root, "analysis.ipynb")
+
+            def write_notebook(*sources):
+                cells = [
+                    {"cell_type": "code", "source": source, "outputs": []}
+                    for source in sources
+                ]
+                with open(nb_path, "w") as f:
+                    json.dump({"cells": cells, "metadata": {}}, f)
+
+            write_notebook("import os", "x = 1")
+            repo.git.add("analysis.ipynb")
+            repo.git.commit("-m", "initial")
+            write_notebook("import os", "x = 2")
+            repo.close()
+
+            mock_get_query_argument.side_effect = lambda name, default=None: {
+                "path": "analysis.ipynb"
+            }.get(name, default)
+            mock_flush.side_effect = mock.AsyncMock()
+            handler = mock_handler(handlers.DiffHandler)
+
+            with mock.patch(f"{__name__}.handlers.STREAM_CHUNK_SIZE", 1):
+                asyncio.run(handler.get())
+            response = json.loads("".join(c.args[0] for c in mock_write.call_args_list))
+            self.assertEqual("notebook", response["kind"])
+            self.assertEqual("modified", response["change"])
+            self.assertEqual(1, response["unchangedCells"])
+            self.assertEqual(
+                ["@@ -1 +1 @@", "-x = 1", "+x = 2"], response["cells"][0]["diff"]
+            )
+            self.assertEqual(1, mock_flush.call_count)
+
+            asyncio.run(handler.get())
+            self.assertEqual(1, handlers.get_diff_cache().stats()["hits"])
+
+            # Saving the notebook again makes a new diff
+            write_notebook("import os", "x = 3")
+            os.utime(nb_path, ns=(0, 0))
+            mock_write.reset_mock()
+            asyncio.run(handler.get())
+            response = json.loads("".join(c.args[0] for c in mock_write.call_args_list))
+            self.assertIn("+x = 3", response["cells"][0]["diff"])
+
+    @mock.patch(
+        f"{__name__}.handlers.BaseHandler.current_user",
+        new_callable=mock.PropertyMock,
+        return_value="user",
+    )
+    @mock.patch(f"{__name__}.handlers.BaseHandler.get_query_argument")
+    @mock.patch(f"{__name__}.handlers.BaseHandler.set_header")
+    @mock.patch(f"{__name__}.handlers.BaseHandler.flush")
+    @mock.patch(f"{__name__}.handlers.BaseHandler.write")
+    @mock.patch(f"{__name__}.handlers.get_repo_resolver")
+    def test_0019_loghandler_get(
+        self,
+        mock_get_repo_resolver: mock.MagicMock,
+        mock_write: mock.MagicMock,
+        mock_flush: mock.MagicMock,
+        mock_set_header: mock.MagicMock,
+        mock_get_query_argument: mock.MagicMock,
+        mock_current_user: mock.MagicMock,
+    ):
+        """
+        Test history is paged with cursors that stay on the tip they started from
+        """
+        handlers.get_log_cache().clear()
+        with tempfile.TemporaryDirectory() as root:
+            root = os.path.realpath(root)
+            repo = init_repo(root)
+            for i in range(5):
+                repo.git.commit("--allow-empty", "-m", f"Commit {i}")
+            mock_get_repo_resolver.return_value = discovery.RepoResolver(root)
+            handler = mock_handler(handlers.LogHandler)
+
+            def get(**arguments):
+                mock_get_query_argument.side_effect = (
+                    lambda name, default=None: arguments.get(name, default)
+                )
+                mock_write.reset_mock()
+                asyncio.run(handler.get())
+                return json.loads("".join(c.args[0] for c in mock_write.call_args_list))
+
+            first = get(limit="2")
+            self.assertEqual(
+                ["Commit 4", "Commit 3"], [c["summary"] for c in first["commits"]]
+            )
+
+            # New commits don't shift pages already being read
+            repo.git.commit("--allow-empty", "-m", "Commit 5")
+            second = get(limit="2", cursor=first["nextCursor"])
+            self.assertEqual(
+                ["Commit 2", "Commit 1"], [c["summary"] for c in second["commits"]]
+            )
+            last = get(limit="2", cursor=second["nextCursor"])
+            self.assertEqual(["Commit 0"], [c["summary"] for c in last["commits"]])
+            self.assertIsNone(last["nextCursor"])
+
+            get(limit="2", cursor=first["nextCursor"])
+            self.assertEqual(1, handlers.get_log_cache().stats()["hits"])
+
+            with self.assertRaises(web.HTTPError) as context:
+                get(cursor="HEAD~1")
+            self.assertEqual(400, context.exception.status_code)
+            repo.close()
+
+    @mock.patch(
+        f"{__name__}.handlers.BaseHandler.current_user",
+        new_callable=mock.PropertyMock,
+        return_value="user",
+    )
+    @mock.patch(f"{__name__}.handlers.BaseHandler.get_query_argument")
+    @mock.patch(f"{__name__}.handlers.BaseHandler.write")
+    @mock.patch(f"{__name__}.handlers.get_fetch_scheduler")
+    @mock.patch(f"{__name__}.handlers.get_repo_resolver")
+    def test_0020_statehandler_get(
+        self,
+        mock_get_repo_resolver: mock.MagicMock,
+        mock_get_fetch_scheduler: mock.MagicMock,
+        mock_write: mock.MagicMock,
+        mock_get_query_argument: mock.MagicMock,
+        mock_current_user: mock.MagicMock,
+    ):
+        """
+        Test status and origin come back together and unchanged state is a 304
+        """
+        mock_get_fetch_scheduler.return_value.refresh = mock.AsyncMock()
+        mock_get_fetch_scheduler.return_value.state.return_value = {
+            "fetchedAt": None,
+            "fetchInProgress": False,
+            "fetchError": None,
+        }
+        with tempfile.TemporaryDirectory() as root:
+            root = os.path.realpath(root)
+            origin = git.Repo.init(os.path.join(root, "origin.git"), bare=True)
+            repo = clone_repo(origin.git_dir, os.path.join(root, "repo"))
+            repo.git.commit("--allow-empty", "-m", "Initial commit")
+            repo.git.push("-u", "origin", repo.active_branch.name)
+            repo.git.commit("--allow-empty", "-m", "Local commit")
+            write_file(repo.working_tree_dir, "new.txt", "new")
+
+            mock_get_repo_resolver.return_value = discovery.RepoResolver(root)
+            mock_get_query_argument.side_effect = lambda name, default=None: (
+                "repo" if name == "path" else default
+            )
+            handler = mock_handler(handlers.StateHandler)
+
+            def get(etag=None):
+                handler.request = mock.Mock(
+                    headers={"If-None-Match": etag} if etag else {}
+                )
+                handler._headers = httputil.HTTPHeaders()
+                handler._status_code = 200
+                mock_write.reset_mock()
+                asyncio.run(handler.get())
+                return handler.get_status(), handler._headers["Etag"]
+
+            status, etag = get()
+            self.assertEqual(200, status)
+            repo_info = json.loads(mock_write.call_args.args[0])["repoInfo"]
+            self.assertEqual(repo.head.commit.hexsha, repo_info["headCommit"])
+            self.assertEqual({"new.txt": ["untracked"]}, repo_info["entries"])
+            self.assertEqual(1, repo_info["commitsAhead"])
+            self.assertEqual(0, repo_info["commitsBehind"])
+
+            self.assertEqual((304, etag), get(etag))
+            mock_write.assert_not_called()
+
+            # A branch without an upstream still gets its status
+            repo.git.checkout("-b", "topic")
+            status, new_etag = get(etag)
+            self.assertEqual(200, status)
+            self.assertNotEqual(etag, new_etag)
+            repo_info = json.loads(mock_write.call_args.args[0])["repoInfo"]
+            self.assertEqual("topic", repo_info["branchName"])
+            self.assertIsNone(repo_info["commitsAhead"])
+            repo.close()
+            origin.close()
+
+    @mock.patch(
+        f"{__name__}.handlers.BaseHandler.current_user",
+        new_callable=mock.PropertyMock,
+        return_value="user",
+    )
+    @mock.patch(f"{__name__}.handlers.BaseHandler.get_query_argument")
+    @mock.patch(f"{__name__}.handlers.BaseHandler.get_json_body")
+    @mock.patch(f"{__name__}.handlers.BaseHandler.write_response")
+    @mock.patch(f"{__name__}.handlers.BaseHandler.write_cacheable_response")
+    @mock.patch(f"{__name__}.handlers.get_repo_resolver")
+    def test_0021_brancheshandler(
+        self,
+        mock_get_repo_resolver: mock.MagicMock,
+        mock_write_cacheable_response: mock.MagicMock,
+        mock_write_response: mock.MagicMock,
+        mock_get_json_body: mock.MagicMock,
+        mock_get_query_argument: mock.MagicMock,
+        mock_current_user: mock.MagicMock,
+    ):
+        """
+        Test branches are listed and local and remote branches can be checked out
+        """
+        with tempfile.TemporaryDirectory() as root:
+            root = os.path.realpath(root)
+            origin = git.Repo.init(os.path.join(root, "origin.git"), bare=True)
+            repo = clone_repo(origin.git_dir, os.path.join(root, "repo"))
+            repo.git.commit("--allow-empty", "-m", "Initial commit")
+            main = repo.active_branch.name
+            repo.git.push("origin", f"{main}:{main}", f"{main}:feature")
+            repo.git.fetch()
+
+            mock_get_repo_resolver.return_value = discovery.RepoResolver(root)
+            mock_get_query_argument.side_effect = lambda name, default=None: (
+                "repo" if name == "path" else default
+            )
+
+            handler = mock_handler(handlers.BranchesHandler)
+            asyncio.run(handler.get())
+            _, branches = mock_write_cacheable_response.call_args
+            self.assertEqual(main, branches["current"])
+            self.assertEqual([main], [b["name"] for b in branches["local"]])
+            self.assertEqual(
+                sorted([f"origin/{main}", "origin/feature"]),
+                [b["name"] for b in branches["remote"]],
+            )
+
+            mock_get_json_body.return_value = {
+                "path": "repo",
+                "branch": "origin/feature",
+                "remote": True,
+            }
+            asyncio.run(handler.put())
+            self.assertEqual("feature", repo.active_branch.name)
+            self.assertEqual(
+                "origin/feature", repo.active_branch.tracking_branch().name
+            )
+
+            mock_get_json_body.return_value = {"path": "repo", "branch": main}
+            asyncio.run(handler.put())
+            self.assertEqual(main, repo.active_branch.name)
+
+            for request, status in (
+                ({"branch": "missing"}, 404),
+                ({"branch": "origin/feature", "remote": True}, 409),
+            ):
+                mock_get_json_body.return_value = dict(request, path="repo")
+                with self.assertRaises(web.HTTPError) as context:
+                    asyncio.run(handler.put())
+                self.assertEqual(status, context.exception.status_code)
+            repo.close()
+            origin.close()
+
+    def test_0022_submodule_status(self):
+        """
+        Test files changed in submodules are listed under the submodule's directory
+        """
+        with tempfile.TemporaryDirectory() as root:
+            root = os.path.realpath(root)
+            lib = init_repo(os.path.join(root, "lib"))
+            origin = git.Repo.init(os.path.join(root, "origin.git"), bare=True)
+            repo = clone_repo(origin.git_dir, os.path.join(root, "repo"))
+            for r in (lib, repo):
+                r.git.commit("--allow-empty", "-m", "Initial commit")
+            write_file(lib.working_tree_dir, "lib.py", "")
+            lib.git.add("lib.py")
+            lib.git.commit("-m", "Add lib.py")
+            repo.git.execute(
+                ["git", "-c", "protocol.file.allow=always"]
+                + ["submodule", "add", lib.git_dir, "lib"]
+            )
+            repo.git.commit("-m", "Add lib")
+
+            write_file(repo.working_tree_dir, "lib/lib.py", "changed\n")
+            write_file(repo.working_tree_dir, "lib/new.py", "")
+
+            repo_info, status_index = handlers.get_repo_status(repo.working_tree_dir)
+            self.assertEqual({"lib": "ok"}, repo_info["submodules"])
+            self.assertIn("lib/lib.py", repo_info["modifiedFiles"])
+            self.assertEqual(["lib/new.py"], repo_info["untrackedFiles"])
+            self.assertIn("modifiedContents", status_index.listing("")["lib"])
+            self.assertEqual(
+                {"lib.py": ["modified"], "new.py": ["untracked"]},
+                status_index.listing("lib"),
+            )
+            for r in (lib, repo, origin):
+                r.close()
+
+    @mock.patch(f"{__name__}.handlers.BaseHandler.get_json_body")
+    @mock.patch(f"{__name__}.handlers.get_executor")
+    def test_0023_run_git_saturated(
+        self, mock_get_executor: mock.MagicMock, mock_get_json_body: mock.MagicMock
+    ):
+        """
+        Test that a full per-repo queue is reported as a 503 instead of blocking
+        """
+        mock_get_json_body.return_value = None
+        mock_get_executor.return_value.submit.side_effect = (
+            handlers.ExecutorSaturatedError("busy")
+        )
+
+        handler = mock_handler(handlers.InfoHandler)
+        with self.assertRaises(web.HTTPError) as context:
+            asyncio.run(handler.put())
+
+        self.assertEqual(503, context.exception.status_code)
+
+    def test_0024_run_remote_operation_fetch(self):
+        """
+        Test fetches with progress run through the fetch strategy and report transfers
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            root = os.path.realpath(tmp_dir)
+            origin = git.Repo.init(os.path.join(root, "origin.git"), bare=True)
+            repo = clone_repo(origin.git_dir, os.path.join(root, "repo"))
+            # Keep received packs whole so git always reports their size
+            repo.git.config("fetch.unpackLimit", "1")
+            write_file(repo.working_tree_dir, "file.txt", "content\n")
+            repo.git.add("file.txt")
+            repo.git.commit("-m", "Add file.txt")
+            repo.git.push("-u", "origin", repo.active_branch.name)
+
+            upstream = clone_repo(origin.git_dir, os.path.join(root, "upstream"))
+            write_file(upstream.working_tree_dir, "data.txt", os.urandom(4096).hex())
+            upstream.git.add("data.txt")
+            upstream.git.commit("-m", "Add data.txt")
+            upstream.git.push("origin", "HEAD")
+
+            updates = []
+            result = handlers.run_remote_operation(
+                "fetch",
+                updates.append,
+                threading.Event(),
+                path=repo.working_tree_dir,
+                strategy=FetchStrategy("narrow"),
+            )
+            self.assertEqual("narrow", result["strategy"])
+            self.assertIn("--no-tags", result["arguments"])
+            self.assertGreater(result["bytesReceived"], 0)
+            self.assertTrue(updates)
+            self.assertEqual(
+                upstream.head.commit.hexsha,
+                repo.commit(f"origin/{repo.active_branch.name}").hexsha,
+            )
+            for r in (upstream, repo, origin):
+                r.close()
+
+    @mock.patch(f"{__name__}.handlers.BaseHandler.get_json_body")
+    @mock.patch(f"{__name__}.handlers.BaseHandler.write_response")
+    @mock.patch(f"{__name__}.handlers.open_repo")
+    def test_0025_commithandler_put_deleted(
+        self,
+        mock_open_repo: mock.MagicMock,
+        mock_write_response: mock.MagicMock,
+        mock_get_json_body: mock.MagicMock,
+    ):
+        """
+        Test files missing from the worktree are committed as deletions
+        """
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        write_file(tmp_dir.name, "a.txt", "content\n")
+
+        mock_repo = mock.Mock()
+        mock_repo.working_tree_dir = tmp_dir.name
+        pathspecs = {}
+        for command in ("add", "rm"):
+            getattr(mock_repo.git, command).side_effect = functools.partial(
+                lambda command, *args, istream, **kwargs: pathspecs.setdefault(
+                    command, istream.read()
+                ),
+                command,
+            )
+
+        mock_open_repo.return_value.__enter__.return_value = mock_repo
+
+        mock_get_json_body.return_value = {
+            "files": ["a.txt", "deleted.txt", "gone/dir"],
+            "message": "Delete files",
+        }
+
+        handler = mock_handler(handlers.CommitHandler)
+        asyncio.run(handler.put())
+
+        mock_repo.git.rm.assert_called_once_with(
+            "--cached",
+            "-r",
+            "--quiet",
+            "--ignore-unmatch",
+            "--pathspec-from-file=-",
+            "--pathspec-file-nul",
+            istream=mock.ANY,
+            env={"GIT_LITERAL_PATHSPECS": "1"},
+        )
+        self.assertEqual({"add": b"a.txt", "rm": b"deleted.txt\0gone/dir"}, pathspecs)
+        mock_repo.git.commit.assert_called_with("--quiet", "-m", "Delete files")
+        self.assertTrue(mock_write_response.call_count > 0)
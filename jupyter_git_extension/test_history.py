@@ -0,0 +1,65 @@
+"""
+Tester for paged commit history
+"""
+
+from . import history
+from .conftest import RepoTestCase
+
+
+class Tests(RepoTestCase):
+    """
+    Basic test class
+    """
+
+    def setUp(self):
+        """
+        Create a repo with a few commits, one renaming a notebook
+        """
+        super().setUp()
+        for i in range(5):
+            self.commit("notes.txt", f"{i}", f"Notes {i}")
+        self.commit("old.ipynb", "{}", "Add notebook")
+        self.repo.git.mv("old.ipynb", "new.ipynb")
+        self.repo.git.commit("-m", "Rename notebook")
+        self.tip = self.repo.head.commit.hexsha
+
+    def commit(self, name, contents, message):
+        self.write_file(name, contents)
+        self.repo.git.add(name)
+        self.repo.git.commit("-m", message)
+
+    def test_0001_read_log(self):
+        """
+        Test pages are read from an offset with one extra commit to detect more pages
+        """
+        commits = history.read_log(self.repo, self.tip, 0, 3)
+        self.assertEqual(
+            ["Rename notebook", "Add notebook", "Notes 4", "Notes 3"],
+            [commit["summary"] for commit in commits],
+        )
+        self.assertEqual(self.tip, commits[0]["sha"])
+        self.assertEqual([commits[1]["sha"]], commits[0]["parents"])
+        self.assertEqual("Tester", commits[0]["authorName"])
+        self.assertTrue(commits[0]["timestamp"].endswith("Z"))
+
+        commits = history.read_log(self.repo, self.tip, 5, 3)
+        self.assertEqual(["Notes 1", "Notes 0"], [c["summary"] for c in commits])
+
+    def test_0002_path_filter(self):
+        """
+        Test history of a single file, followed across renames
+        """
+        commits = history.read_log(self.repo, self.tip, 0, 10, "new.ipynb", follow=True)
+        self.assertEqual(
+            ["Rename notebook", "Add notebook"], [c["summary"] for c in commits]
+        )
+
+    def test_0003_cursor(self):
+        """
+        Test cursors round trip and invalid ones are rejected
+        """
+        cursor = history.encode_cursor(self.tip, 50)
+        self.assertEqual((self.tip, 50), history.decode_cursor(cursor))
+        for cursor in ("", "HEAD:0", f"{self.tip}:-1", f"{self.tip}"):
+            with self.assertRaises(ValueError):
+                history.decode_cursor(cursor)
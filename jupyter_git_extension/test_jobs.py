@@ -0,0 +1,107 @@
+"""
+Tester for the commit/pull/push job queue
+"""
+
+import asyncio
+import unittest
+
+import git
+
+from . import jobs
+
+
+class Tests(unittest.TestCase):
+    """
+    Basic test class
+    """
+
+    def setUp(self):
+        self.queue = jobs.JobQueue(max_history=2)
+        self.events = []
+
+    def operation(self, name, delay=0.01, error=None):
+        async def run():
+            self.events.append(f"start {name}")
+            await asyncio.sleep(delay)
+            self.events.append(f"end {name}")
+            if error is not None:
+                raise error
+            return f"{name} done", {"name": name}
+
+        return run
+
+    def test_0001_serialize_per_repo(self):
+        """
+        Test jobs for the same repo run one at a time in submission order
+        """
+
+        async def run():
+            first = self.queue.submit("/repo", "commit", self.operation("a"))
+            second = self.queue.submit("/repo", "push", self.operation("b"))
+            self.assertEqual(jobs.QUEUED, second.state)
+            await asyncio.gather(first.wait(), second.wait())
+            return first, second
+
+        first, second = asyncio.run(run())
+
+        self.assertEqual(["start a", "end a", "start b", "end b"], self.events)
+        self.assertEqual(jobs.SUCCEEDED, second.state)
+        self.assertEqual("b done", second.to_dict()["statusText"])
+        self.assertEqual({"name": "b"}, second.to_dict()["result"])
+
+    def test_0002_parallel_across_repos(self):
+        """
+        Test jobs for different repos don't wait on each other
+        """
+
+        async def run():
+            first = self.queue.submit("/one", "commit", self.operation("a"))
+            second = self.queue.submit("/two", "commit", self.operation("b"))
+            await asyncio.gather(first.wait(), second.wait())
+
+        asyncio.run(run())
+
+        self.assertEqual(["start a", "start b"], sorted(self.events[:2]))
+
+    def test_0003_failure(self):
+        """
+        Test a failed job records its error and doesn't block the next job
+        """
+
+        async def run():
+            failed = self.queue.submit(
+                "/repo",
+                "pull",
+                self.operation("a", error=git.exc.GitCommandError("pull", 1)),
+            )
+            after = self.queue.submit("/repo", "push", self.operation("b"))
+            with self.assertRaises(git.exc.GitCommandError):
+                await failed.wait()
+            await after.wait()
+            return failed, after
+
+        failed, after = asyncio.run(run())
+
+        self.assertEqual(jobs.FAILED, failed.state)
+        self.assertTrue(failed.status_text.startswith("Git error:"))
+        self.assertEqual(jobs.SUCCEEDED, after.state)
+
+    def test_0004_bounded_history(self):
+        """
+        Test only the most recent finished jobs are kept
+        """
+
+        async def run():
+            submitted = [
+                self.queue.submit("/repo", "commit", self.operation(str(i), delay=0))
+                for i in range(4)
+            ]
+            for job in submitted:
+                await job.wait()
+            return submitted
+
+        submitted = asyncio.run(run())
+
+        self.assertIsNone(self.queue.get(submitted[0].id))
+        self.assertIsNone(self.queue.get(submitted[1].id))
+        self.assertIs(submitted[3], self.queue.get(submitted[3].id))
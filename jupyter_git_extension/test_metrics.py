@@ -0,0 +1,105 @@
+"""
+Tester for Prometheus style metrics
+"""
+
+import os
+import tempfile
+import unittest
+
+from . import metrics
+
+
+class Tests(unittest.TestCase):
+    """
+    Basic test class
+    """
+
+    def setUp(self):
+        self.registry = metrics.MetricsRegistry(buckets=(0.1, 1.0))
+
+    def test_0001_histogram(self):
+        """
+        Test observed values land in cumulative buckets with a sum and count
+        """
+        for value in (0.05, 0.5, 5.0):
+            self.registry.observe(
+                metrics.REQUEST_DURATION, value, handler="InfoHandler", method="PUT"
+            )
+
+        rendered = self.registry.render()
+
+        self.assertIn(f"# TYPE {metrics.REQUEST_DURATION} histogram", rendered)
+        labels = 'handler="InfoHandler",method="PUT"'
+        for line in (
+            f'{metrics.REQUEST_DURATION}_bucket{{{labels},le="0.1"}} 1',
+            f'{metrics.REQUEST_DURATION}_bucket{{{labels},le="1.0"}} 2',
+            f'{metrics.REQUEST_DURATION}_bucket{{{labels},le="+Inf"}} 3',
+            f"{metrics.REQUEST_DURATION}_sum{{{labels}}} 5.55",
+            f"{metrics.REQUEST_DURATION}_count{{{labels}}} 3",
+        ):
+            self.assertIn(line, rendered.splitlines())
+
+    def test_0002_counters_and_samples(self):
+        """
+        Test counters and render time samples are rendered with escaped labels
+        """
+        self.registry.increment(metrics.SUBPROCESSES, command="status")
+        self.registry.increment(metrics.SUBPROCESSES, command="status")
+
+        rendered = self.registry.render(
+            [("jupyter_git_entries", "gauge", "Entries", {"path": 'a"b'}, 4)]
+        ).splitlines()
+
+        self.assertIn(f'{metrics.SUBPROCESSES}{{command="status"}} 2', rendered)
+        self.assertIn("# TYPE jupyter_git_entries gauge", rendered)
+        self.assertIn('jupyter_git_entries{path="a\\"b"} 4', rendered)
+
+    def test_0003_git_subcommand(self):
+        """
+        Test finding the subcommand past git's own options
+        """
+        self.assertEqual("status", metrics.git_subcommand(["git", "status", "-z"]))
+        self.assertEqual(
+            "cat-file",
+            metrics.git_subcommand(["git", "-c", "a=b", "--no-pager", "cat-file"]),
+        )
+        self.assertEqual("version", metrics.git_subcommand("git version"))
+
+    def test_0004_instrumented_repo(self):
+        """
+        Test git processes started through an instrumented repo are counted
+        """
+        metrics.get_metrics().clear()
+        with tempfile.TemporaryDirectory() as root:
+            repo = metrics.InstrumentedRepo.init(os.path.join(root, "repo"))
+            repo = metrics.InstrumentedRepo(repo.working_tree_dir)
+            repo.git.status()
+            repo.close()
+
+        self.assertIn(
+            f'{metrics.SUBPROCESSES}{{command="status"}} 1',
+            metrics.get_metrics().render().splitlines(),
+        )
+
+    def test_0005_merge(self):
+        """
+        Test values recorded in another registry are added to this one
+        """
+        other = metrics.MetricsRegistry(buckets=(0.1, 1.0))
+        for registry in (self.registry, other):
+            registry.observe(metrics.OPERATION_DURATION, 0.02, operation="diff")
+            registry.increment(metrics.SUBPROCESSES, command="status")
+        other.increment(metrics.SUBPROCESSES, command="diff")
+
+        self.registry.merge(other.snapshot())
+        rendered = self.registry.render().splitlines()
+
+        self.assertIn(
+            f'{metrics.OPERATION_DURATION}_bucket{{operation="diff",le="0.1"}} 2',
+            rendered,
+        )
+        self.assertIn(
+            f'{metrics.OPERATION_DURATION}_count{{operation="diff"}} 2', rendered
+        )
+        self.assertIn(f'{metrics.SUBPROCESSES}{{command="status"}} 2', rendered)
+        self.assertIn(f'{metrics.SUBPROCESSES}{{command="diff"}} 1', rendered)
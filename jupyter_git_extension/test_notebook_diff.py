@@ -0,0 +1,107 @@
+"""
+Tester for notebook aware diffs
+"""
+
+import json
+import unittest
+
+from . import notebook_diff
+
+
+def notebook(*cells, metadata=None):
+    return {
+        "cells": [
+            {
+                "cell_type": cell_type,
+                "source": source,
+                "outputs": [{"output_type": "stream", "text": [output]}]
+                if output
+                else [],
+            }
+            for cell_type, source, output in cells
+        ],
+        "metadata": metadata or {},
+    }
+
+
+class Tests(unittest.TestCase):
+    """
+    Basic test class
+    """
+
+    def test_0001_diff_cells(self):
+        """
+        Test cells are matched so edits, additions, and deletions are reported per cell
+        """
+        old = notebook(
+            ("markdown", "# Title", None),
+            ("code", "x = 1\nprint(x)", "1"),
+            ("code", "del x", None),
+        )
+        new = notebook(
+            ("markdown", "# Title", None),
+            ("code", "x = 2\nprint(x)", "2"),
+            ("code", "y = 3", None),
+            ("code", "del x", None),
+        )
+
+        diff = notebook_diff.diff_notebooks(old, new)
+
+        self.assertEqual(2, diff["unchangedCells"])
+        self.assertFalse(diff["metadataChanged"])
+        modified, added = diff["cells"]
+        self.assertEqual(
+            ("modified", 1, 1),
+            tuple(modified[k] for k in ("change", "oldIndex", "newIndex")),
+        )
+        self.assertEqual(
+            ["@@ -1,2 +1,2 @@", "-x = 1", "+x = 2", " print(x)"], modified["diff"]
+        )
+        self.assertEqual(
+            ("added", None, 2),
+            tuple(added[k] for k in ("change", "oldIndex", "newIndex")),
+        )
+
+    def test_0002_outputs(self):
+        """
+        Test outputs are ignored unless asked for
+        """
+        old = notebook(("code", "print(1)", "1"))
+        new = notebook(("code", "print(1)", "one"))
+
+        self.assertEqual([], notebook_diff.diff_notebooks(old, new)["cells"])
+        (cell,) = notebook_diff.diff_notebooks(old, new, outputs=True)["cells"]
+        self.assertIn("-1", cell["diff"])
+        self.assertIn("+one", cell["diff"])
+
+    def test_0003_diff_contents(self):
+        """
+        Test notebooks, invalid notebooks, text, and binary files
+        """
+        old = json.dumps(notebook(("code", "a", None))).encode()
+        self.assertEqual(
+            "notebook",
+            notebook_diff.diff_contents(old, None, notebook=True)["kind"],
+        )
+        self.assertEqual(
+            "deleted",
+            notebook_diff.diff_contents(old, None, notebook=True)["cells"][0]["change"],
+        )
+        self.assertEqual(
+            {"kind": "text", "lines": ["@@ -1 +1 @@", "-<<<<<<<", "+{"]},
+            notebook_diff.diff_contents(b"<<<<<<<\n", b"{\n", notebook=True),
+        )
+        self.assertEqual(
+            {"kind": "binary"}, notebook_diff.diff_contents(b"\0\1", b"\0\2")
+        )
+
+    def test_0004_cache(self):
+        """
+        Test the least recently used diffs are dropped
+        """
+        cache = notebook_diff.DiffCache(max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.put(key, {"kind": key})
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual({"kind": "c"}, cache.get("c"))
+        self.assertEqual({"entries": 2, "hits": 1, "misses": 1}, cache.stats())
@@ -0,0 +1,118 @@
+"""
+Tester for stripping notebook outputs from commits
+"""
+
+import json
+import os
+import threading
+
+import git
+import mock
+
+from . import outputs
+from .conftest import RepoTestCase
+
+
+def make_notebook(output_text):
+    return {
+        "cells": [
+            {"cell_type": "markdown", "metadata": {}, "source": ["# Title"]},
+            {
+                "cell_type": "code",
+                "execution_count": 3,
+                "metadata": {},
+                "outputs": [
+                    {"output_type": "stream", "name": "stdout", "text": ["small\n"]},
+                    {
+                        "output_type": "execute_result",
+                        "execution_count": 3,
+                        "data": {"text/plain": [output_text]},
+                        "metadata": {},
+                    },
+                ],
+                "source": ["print('small')\n", "value"],
+            },
+        ],
+        "metadata": {},
+        "nbformat": 4,
+        "nbformat_minor": 4,
+    }
+
+
+class Tests(RepoTestCase):
+    """
+    Basic test class
+    """
+
+    def write_notebook(self, name, notebook):
+        with open(os.path.join(self.path, name), "w") as f:
+            json.dump(notebook, f, indent=1)
+
+    def committed_notebook(self, name):
+        return json.loads(self.repo.git.show(f"HEAD:{name}"))
+
+    def test_0001_strip_notebook(self):
+        """
+        Test strip removes every output and cap only large ones
+        """
+        stripped = outputs.strip_notebook(make_notebook("x" * 100), "strip")
+        self.assertEqual([], stripped["cells"][1]["outputs"])
+        self.assertIsNone(stripped["cells"][1]["execution_count"])
+
+        capped = outputs.strip_notebook(
+            make_notebook("x" * 100), "cap", max_output_size=100
+        )
+        small, large = capped["cells"][1]["outputs"]
+        self.assertEqual(["small\n"], small["text"])
+        self.assertRegex(large["text"][0], r"^\[\d+ byte output removed on commit\]")
+
+    def test_0002_strip_staged(self):
+        """
+        Test staged notebooks are committed without outputs while the worktree keeps them
+        """
+        self.write_notebook("one.ipynb", make_notebook("x" * 10000))
+        self.write_notebook("two.ipynb", make_notebook("y"))
+        self.write_file("other.txt", "text")
+        self.write_notebook("broken.ipynb", {})
+        with open(os.path.join(self.path, "broken.ipynb"), "a") as f:
+            f.write("<<<<<<<")
+        self.repo.git.add("--all")
+
+        calls = []
+        execute = git.Git.execute
+
+        def record_thread(git_cmd, *args, **kwargs):
+            calls.append((git_cmd, threading.current_thread()))
+            return execute(git_cmd, *args, **kwargs)
+
+        with mock.patch.object(
+            git.Git, "execute", autospec=True, side_effect=record_thread
+        ):
+            summary = outputs.OutputStripper("strip", max_workers=2).strip_staged(
+                self.repo
+            )
+        # Workers run git through their own wrappers, never the shared repo's
+        for git_cmd, thread in calls:
+            if git_cmd is self.repo.git:
+                self.assertIs(threading.current_thread(), thread)
+            else:
+                self.assertIsNot(threading.current_thread(), thread)
+        self.assertTrue(any(git_cmd is not self.repo.git for git_cmd, _ in calls))
+        self.repo.git.commit("-m", "stripped")
+
+        self.assertEqual(3, summary["notebooks"])
+        self.assertEqual(2, summary["stripped"])
+        self.assertGreater(summary["bytesSaved"], 10000)
+        self.assertEqual(
+            summary["bytesBefore"] - summary["bytesAfter"], summary["bytesSaved"]
+        )
+        for name in ("one.ipynb", "two.ipynb"):
+            self.assertEqual([], self.committed_notebook(name)["cells"][1]["outputs"])
+        with open(os.path.join(self.path, "one.ipynb")) as f:
+            self.assertEqual(2, len(json.load(f)["cells"][1]["outputs"]))
+
+        # Staging the notebooks again with only outputs changed leaves nothing to commit
+        self.repo.git.add("--all")
+        summary = outputs.OutputStripper("strip").strip_staged(self.repo)
+        self.assertEqual(2, summary["stripped"])
+        self.assertEqual("", self.repo.git.diff("--cached", "--name-only"))
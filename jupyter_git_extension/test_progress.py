@@ -0,0 +1,159 @@
+"""
+Tester for streaming progress of remote git commands
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+import git
+import mock
+
+from . import progress
+from .conftest import init_repo, write_file
+
+
+class StreamingProgressTests(unittest.TestCase):
+    """
+    Tests parsing of git progress lines
+    """
+
+    def setUp(self):
+        self.updates = []
+        self.progress = progress.StreamingProgress(self.updates.append)
+        self.handle_line = self.progress.new_message_handler()
+
+    def test_0001_parse(self):
+        """
+        Test a progress line becomes an update with counts and transfer rate
+        """
+        self.handle_line("Writing objects:  50% (5/10), 1.20 MiB | 2.00 MiB/s")
+
+        self.assertEqual(
+            [
+                {
+                    "operation": "Writing objects",
+                    "stage": "begin",
+                    "current": 5.0,
+                    "total": 10.0,
+                    "percent": 50,
+                    "transferred": "1.20 MiB",
+                    "rate": "2.00 MiB/s",
+                }
+            ],
+            self.updates,
+        )
+
+    def test_0002_throttle(self):
+        """
+        Test running updates are throttled while the first and last always report
+        """
+        self.handle_line("Counting objects:  10% (1/10)")
+        for i in range(2, 10):
+            self.handle_line(f"Counting objects:  {i * 10}% ({i}/10)")
+        self.handle_line("Counting objects: 100% (10/10), done.")
+
+        stages = [update["stage"] for update in self.updates]
+        self.assertEqual("begin", stages[0])
+        self.assertEqual("end", stages[-1])
+        self.assertLess(len(self.updates), 10)
+
+
+class RunWithProgressTests(unittest.TestCase):
+    """
+    Tests running remote commands against a local bare origin
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.origin_path = os.path.join(self.tmp_dir.name, "origin.git")
+        git.Repo.init(self.origin_path, bare=True).close()
+        self.repo = init_repo(os.path.join(self.tmp_dir.name, "clone"))
+        self.repo.create_remote("origin", self.origin_path)
+        for i in range(20):
+            write_file(self.repo.working_dir, f"file{i}.txt", f"contents {i}\n" * 100)
+        self.repo.git.add("-A")
+        self.repo.git.commit("-m", "initial")
+        self.repo.git.branch("-M", "master")
+        self.updates = []
+
+    def tearDown(self):
+        self.repo.close()
+        self.tmp_dir.cleanup()
+
+    def test_0001_push(self):
+        """
+        Test pushing reports progress and updates origin
+        """
+        progress.run_with_progress(
+            self.repo,
+            ("push", "--progress", "origin", "master"),
+            progress.StreamingProgress(self.updates.append, min_interval=0),
+            threading.Event(),
+        )
+
+        origin = git.Repo(self.origin_path)
+        self.assertEqual(self.repo.head.commit.hexsha, origin.commit("master").hexsha)
+        origin.close()
+        self.assertIn(
+            "Writing objects", [update["operation"] for update in self.updates]
+        )
+
+    def test_0002_failure(self):
+        """
+        Test a failing command raises with git's error output
+        """
+        self.repo.git.remote(
+            "set-url", "origin", os.path.join(self.tmp_dir.name, "missing")
+        )
+
+        with self.assertRaises(git.exc.GitCommandError) as context:
+            progress.run_with_progress(
+                self.repo,
+                ("push", "--progress", "origin", "master"),
+                progress.StreamingProgress(self.updates.append),
+                threading.Event(),
+            )
+        self.assertIn("missing", context.exception.stderr)
+
+    def test_0003_cancel(self):
+        """
+        Test setting the cancel event terminates a running command
+        """
+        process = subprocess.Popen(
+            [sys.executable, "-c", "import time; time.sleep(30)"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        repo = mock.Mock()
+        repo.git.push.return_value.proc = process
+        cancel = threading.Event()
+        threading.Timer(0.2, cancel.set).start()
+
+        with self.assertRaises(progress.OperationCancelled):
+            progress.run_with_progress(
+                repo,
+                progress.REMOTE_OPERATIONS["push"],
+                progress.StreamingProgress(self.updates.append),
+                cancel,
+            )
+        self.assertIsNotNone(process.poll())
+        process.stdout.close()
+        process.stderr.close()
+
+    def test_0004_output(self):
+        """
+        Test every progress line is collected when asked for
+        """
+        output = []
+        progress.run_with_progress(
+            self.repo,
+            ("push", "--progress", "origin", "master"),
+            progress.StreamingProgress(self.updates.append),
+            threading.Event(),
+            output=output,
+        )
+        self.assertTrue(any(line.startswith("Writing objects") for line in output))
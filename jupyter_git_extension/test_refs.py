@@ -0,0 +1,87 @@
+"""
+Tester for branch listing from ref files
+"""
+
+import mock
+
+from . import refs
+from .conftest import RepoTestCase
+
+
+class Tests(RepoTestCase):
+    """
+    Basic test class
+    """
+
+    def setUp(self):
+        """
+        Create a repo with a packed branch, a loose branch, and a remote-tracking branch
+        """
+        super().setUp()
+        self.repo.git.commit("--allow-empty", "-m", "First")
+        self.first = self.repo.head.commit.hexsha
+        self.branch = self.repo.active_branch.name
+        self.repo.git.branch("packed")
+        self.repo.git.update_ref("refs/remotes/origin/feature/x", "HEAD")
+        self.repo.git.symbolic_ref(
+            "refs/remotes/origin/HEAD", "refs/remotes/origin/feature/x"
+        )
+        self.repo.git.pack_refs("--all")
+        self.repo.git.commit("--allow-empty", "-m", "Second")
+        self.second = self.repo.head.commit.hexsha
+
+    def test_0001_read_refs(self):
+        """
+        Test loose refs override packed ones and symbolic refs are skipped
+        """
+        self.assertEqual(
+            {
+                f"refs/heads/{self.branch}": self.second,
+                "refs/heads/packed": self.first,
+                "refs/remotes/origin/feature/x": self.first,
+            },
+            refs.read_refs(self.repo.git_dir),
+        )
+        self.assertEqual((self.branch, None), refs.read_head(self.repo.git_dir))
+
+    def test_0002_branches(self):
+        """
+        Test listings are cached until a branch changes and only new tips are looked up
+        """
+        cache = refs.RefCache()
+        listing = cache.branches(self.path)
+        self.assertEqual(self.branch, listing["current"])
+        self.assertEqual(self.second, listing["head"])
+        self.assertEqual(
+            [self.branch, "packed"], [branch["name"] for branch in listing["local"]]
+        )
+        self.assertEqual(
+            [{"name": "origin/feature/x", "sha": self.first}],
+            [
+                {"name": branch["name"], "sha": branch["sha"]}
+                for branch in listing["remote"]
+            ],
+        )
+        self.assertTrue(listing["local"][0]["timestamp"].endswith("Z"))
+
+        with mock.patch.object(
+            cache, "_read_commit_times", wraps=cache._read_commit_times
+        ) as read_commit_times:
+            self.assertEqual(listing, cache.branches(self.path))
+            read_commit_times.assert_not_called()
+            self.assertEqual({"repos": 1, "hits": 1, "misses": 1}, cache.stats())
+
+            # Checking out a branch changes HEAD but not the listing
+            self.repo.git.checkout("packed")
+            listing = cache.branches(self.path)
+            self.assertEqual(
+                ("packed", self.first), (listing["current"], listing["head"])
+            )
+            self.assertEqual(2, cache.stats()["hits"])
+
+            self.repo.git.commit("--allow-empty", "-m", "Third")
+            third = self.repo.head.commit.hexsha
+            listing = cache.branches(self.path)
+            self.assertEqual(third, listing["head"])
+            self.assertEqual(2, cache.stats()["misses"])
+        read_commit_times.assert_called_once()
@@ -0,0 +1,291 @@
+"""
+Tester for fetch scheduling
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import git
+import mock
+
+from . import remote
+from .conftest import clone_repo, init_repo
+
+
+class Tests(unittest.TestCase):
+    """
+    Basic test class
+    """
+
+    def setUp(self):
+        self.scheduler = remote.FetchScheduler(interval=60, jitter=0)
+        self.calls = []
+        self.release = threading.Event()
+
+    def fetch(self, path):
+        self.calls.append(path)
+        self.release.wait(5)
+
+    def failing_fetch(self, path):
+        raise RuntimeError("network down")
+
+    def test_0001_coalesce(self):
+        """
+        Test that concurrent forced refreshes share a single fetch
+        """
+
+        async def run():
+            waiters = [
+                asyncio.ensure_future(
+                    self.scheduler.refresh(".", self.fetch, force=True)
+                )
+                for _ in range(3)
+            ]
+            await asyncio.sleep(0.05)
+            self.assertTrue(self.scheduler.state(".")["fetchInProgress"])
+            self.release.set()
+            await asyncio.gather(*waiters)
+
+        asyncio.run(run())
+
+        self.assertEqual(1, len(self.calls))
+        state = self.scheduler.state(".")
+        self.assertFalse(state["fetchInProgress"])
+        self.assertIsNotNone(state["fetchedAt"])
+
+    def test_0002_interval(self):
+        """
+        Test that unforced refreshes run in the background at most once per interval
+        """
+        self.release.set()
+
+        async def run():
+            await self.scheduler.refresh(".", self.fetch)
+            # The first refresh doesn't wait for the fetch
+            self.assertIsNone(self.scheduler.state(".")["fetchedAt"])
+            while self.scheduler.state(".")["fetchInProgress"]:
+                await asyncio.sleep(0.01)
+
+            await self.scheduler.refresh(".", self.fetch)
+            self.assertFalse(self.scheduler.state(".")["fetchInProgress"])
+
+            await self.scheduler.refresh(".", self.fetch, force=True)
+
+        asyncio.run(run())
+
+        self.assertEqual(2, len(self.calls))
+
+    def test_0003_failure(self):
+        """
+        Test that fetch errors are reported to forced callers and kept in the state
+        """
+
+        async def run():
+            with self.assertRaises(RuntimeError):
+                await self.scheduler.refresh(".", self.failing_fetch, force=True)
+
+        asyncio.run(run())
+
+        state = self.scheduler.state(".")
+        self.assertEqual("network down", state["fetchError"])
+        self.assertIsNone(state["fetchedAt"])
+
+
+class AheadBehindTests(unittest.TestCase):
+    """
+    Tests counting commits against a local bare origin
+    """
+
+    def setUp(self):
+        """
+        Clone a bare origin, then put master 1 ahead/2 behind and feature 1 ahead
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        origin_path = os.path.join(self.tmp_dir.name, "origin.git")
+        seed = init_repo(os.path.join(self.tmp_dir.name, "seed"))
+        self.commit(seed, "initial")
+        git.Repo.init(origin_path, bare=True).close()
+        seed.git.push(origin_path, "HEAD:refs/heads/master")
+
+        self.repo = clone_repo(origin_path, os.path.join(self.tmp_dir.name, "clone"))
+        self.repo.git.checkout("-b", "feature", "--track", "origin/master")
+        self.commit(self.repo, "feature work")
+        self.repo.git.checkout("master")
+        self.repo.git.branch("no-upstream")
+
+        self.commit(seed, "upstream 1")
+        self.commit(seed, "upstream 2")
+        seed.git.push(origin_path, "HEAD:refs/heads/master")
+        seed.close()
+        self.repo.remotes.origin.fetch()
+        self.commit(self.repo, "local")
+
+        self.counter = remote.AheadBehindCounter()
+
+    def tearDown(self):
+        self.repo.close()
+        self.tmp_dir.cleanup()
+
+    def commit(self, repo, message):
+        repo.git.commit("--allow-empty", "-m", message)
+
+    def test_0001_count(self):
+        """
+        Test counting a single pair and reusing the memoized result
+        """
+        local_sha, upstream_sha = self.repo.git.rev_parse(
+            "master", "master@{u}"
+        ).split()
+
+        self.assertEqual((1, 2), self.counter.count(self.repo, local_sha, upstream_sha))
+
+        repo = mock.Mock()
+        self.assertEqual((1, 2), self.counter.count(repo, local_sha, upstream_sha))
+        self.assertEqual(0, repo.git.rev_list.call_count)
+
+    def test_0002_count_branches(self):
+        """
+        Test counting every local branch in a batch
+        """
+        expected = {
+            "master": {"upstream": "origin/master", "ahead": 1, "behind": 2},
+            "feature": {"upstream": "origin/master", "ahead": 1, "behind": 2},
+            "no-upstream": {"upstream": None, "ahead": None, "behind": None},
+        }
+        self.assertDictEqual(expected, self.counter.count_branches(self.repo))
+
+        # Second listing is answered from memoized counts without walking history
+        repo = mock.Mock()
+        repo.git = mock.Mock(wraps=self.repo.git)
+        self.assertDictEqual(expected, self.counter.count_branches(repo))
+        self.assertEqual(1, repo.git.for_each_ref.call_count)
+
+
+class FetchStrategyTests(unittest.TestCase):
+    """
+    Tests fetch strategies against a local bare origin with several branches and tags
+    """
+
+    def setUp(self):
+        """
+        Clone a bare origin with master, other branches, and a tag, then move them all
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.origin_path = os.path.join(self.tmp_dir.name, "origin.git")
+        self.seed = init_repo(os.path.join(self.tmp_dir.name, "seed"))
+        self.commit(self.seed, "initial")
+        git.Repo.init(self.origin_path, bare=True).close()
+        self.push("master", "other")
+
+        self.origin_url = "file://" + self.origin_path
+        self.repo = clone_repo(
+            self.origin_url, os.path.join(self.tmp_dir.name, "clone")
+        )
+        self.shallow = clone_repo(
+            self.origin_url, os.path.join(self.tmp_dir.name, "shallow"), depth=1
+        )
+        for repo in (self.repo, self.shallow):
+            # Keep received packs whole so git always reports their size
+            repo.git.config("fetch.unpackLimit", "1")
+            self.commit(repo, "local")
+
+        for i in range(3):
+            self.commit(self.seed, f"upstream {i}", size=10000)
+        self.seed.git.tag("v2")
+        self.push("master", "other", "tags")
+
+    def tearDown(self):
+        for repo in (self.seed, self.repo, self.shallow):
+            repo.close()
+        self.tmp_dir.cleanup()
+
+    def commit(self, repo, message, size=0):
+        with open(os.path.join(repo.working_tree_dir, "data.bin"), "wb") as f:
+            f.write(message.encode() + os.urandom(size))
+        repo.git.add("data.bin")
+        repo.git.commit("-m", message)
+
+    def push(self, *refs):
+        for ref in refs:
+            if ref == "tags":
+                self.seed.git.push(self.origin_path, "--tags")
+            else:
+                self.seed.git.push(self.origin_path, f"HEAD:refs/heads/{ref}")
+
+    def remote_refs(self, repo):
+        return {ref.path: ref.commit.hexsha for ref in repo.refs if ref.path != "HEAD"}
+
+    def test_0001_received_bytes(self):
+        """
+        Test object sizes are read from progress output
+        """
+        progress = (
+            "remote: Total 3 (delta 0)\n"
+            "Receiving objects:  50% (2/3)\r"
+            "Receiving objects: 100% (3/3), 1.50 KiB | 1.00 MiB/s, done.\n"
+        )
+        self.assertEqual(1536, remote.received_bytes(progress))
+        self.assertEqual(0, remote.received_bytes("Already up to date.\n"))
+
+    def test_0002_full(self):
+        """
+        Test full fetches update every branch and tag
+        """
+        result = remote.FetchStrategy().fetch(self.repo)
+        self.assertEqual(["fetch", "origin"], result["arguments"])
+        self.assertGreater(result["bytesReceived"], 0)
+        seed_head = self.seed.head.commit.hexsha
+        self.assertEqual(seed_head, self.repo.commit("origin/master").hexsha)
+        self.assertEqual(seed_head, self.repo.commit("origin/other").hexsha)
+        self.assertIn("v2", [tag.name for tag in self.repo.tags])
+
+    def test_0003_narrow(self):
+        """
+        Test narrow fetches only update the upstream of the checked out branch
+        """
+        other = self.repo.commit("origin/other").hexsha
+        result = remote.FetchStrategy("narrow").fetch(self.repo)
+        self.assertEqual(
+            [
+                "fetch",
+                "--no-tags",
+                "origin",
+                "+refs/heads/master:refs/remotes/origin/master",
+            ],
+            result["arguments"],
+        )
+        self.assertGreater(result["bytesReceived"], 0)
+        self.assertEqual(
+            self.seed.head.commit.hexsha, self.repo.commit("origin/master").hexsha
+        )
+        self.assertEqual(other, self.repo.commit("origin/other").hexsha)
+        self.assertNotIn("v2", [tag.name for tag in self.repo.tags])
+
+        # Without an upstream there is nothing narrower to fetch
+        self.repo.git.checkout("-b", "no-upstream")
+        self.assertEqual(
+            ("fetch", "origin"),
+            remote.FetchStrategy("narrow").arguments(self.repo, "fetch"),
+        )
+
+    def test_0004_narrow_shallow(self):
+        """
+        Test depth limited fetches of shallow clones deepen until ahead/behind can be counted
+        """
+        strategy = remote.FetchStrategy("narrow", depth=1)
+        # Complete clones are never made shallow
+        self.assertNotIn("--depth=1", strategy.arguments(self.repo, "fetch"))
+        self.assertIn("--depth=1", strategy.arguments(self.shallow, "fetch"))
+
+        strategy.fetch(self.shallow)
+        local_sha, upstream_sha = self.shallow.git.rev_parse(
+            "master", "master@{u}"
+        ).split()
+        self.assertEqual(
+            (1, 3),
+            remote.AheadBehindCounter().count(self.shallow, local_sha, upstream_sha),
+        )
@@ -0,0 +1,108 @@
+"""
+Tester for the open repo pool
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+
+from . import repo_pool
+from .conftest import init_repo
+
+
+class Tests(unittest.TestCase):
+    """
+    Basic test class
+    """
+
+    def setUp(self):
+        """
+        Create a couple of repos with a commit each so cat-file has objects to read
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.paths = []
+        for name in ("a", "b"):
+            path = os.path.join(self.tmp_dir.name, name)
+            repo = init_repo(path)
+            repo.git.commit("--allow-empty", "-m", "initial")
+            repo.close()
+            self.paths.append(path)
+
+        self.pool = repo_pool.RepoPool(max_repos=1)
+
+    def tearDown(self):
+        self.pool.clear()
+        self.tmp_dir.cleanup()
+
+    def test_0001_reuse(self):
+        """
+        Test that a released repo is handed out again for the same path
+        """
+        with self.pool.lease(self.paths[0]) as repo:
+            first = repo
+        with self.pool.lease(self.paths[0] + "/") as repo:
+            self.assertIs(first, repo)
+
+        stats = self.pool.stats()
+        self.assertEqual(1, stats["created"])
+        self.assertEqual(1, stats["reused"])
+        self.assertEqual(1, stats["openRepos"])
+        self.assertEqual(0, stats["leasedRepos"])
+
+    def test_0002_concurrent_leases(self):
+        """
+        Test that a repo is never leased to two users at once
+        """
+        with self.pool.lease(self.paths[0]) as outer:
+            with self.pool.lease(self.paths[0]) as inner:
+                self.assertIsNot(outer, inner)
+                self.assertEqual(2, self.pool.stats()["leasedRepos"])
+
+        # Both are over max_repos once released, so only one is kept
+        self.assertEqual(1, self.pool.stats()["openRepos"])
+        self.assertEqual(1, self.pool.stats()["evicted"])
+
+    def test_0003_evict_closes_helpers(self):
+        """
+        Test that evicting a repo stops its cat-file processes
+        """
+        with self.pool.lease(self.paths[0]) as repo:
+            first = repo
+            repo.head.commit.message
+        helper_processes = self.pool.stats()["helperProcesses"]
+        self.assertGreater(helper_processes, 0)
+        process = first.git.cat_file_header.proc
+
+        with self.pool.lease(self.paths[1]) as repo:
+            repo.head.commit.message
+
+        process.wait(timeout=5)
+        self.assertIsNotNone(process.returncode)
+        stats = self.pool.stats()
+        self.assertEqual(1, stats["openRepos"])
+        self.assertEqual(helper_processes, stats["helperProcesses"])
+
+    def test_0004_threads(self):
+        """
+        Test leasing from many threads at once
+        """
+        pool = repo_pool.RepoPool(max_repos=4)
+        errors = []
+
+        def work():
+            try:
+                for _ in range(10):
+                    with pool.lease(self.paths[0]) as repo:
+                        repo.head.commit.hexsha
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        pool.clear()
+
+        self.assertEqual([], errors)
@@ -0,0 +1,72 @@
+"""
+Tester for lazily loaded routes
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import unittest
+
+import mock
+from tornado import httputil, web
+
+from . import handlers
+from . import routes
+
+
+class Tests(unittest.TestCase):
+    """
+    Basic test class
+    """
+
+    def test_0001_import_skips_git(self):
+        """
+        Test importing the extension doesn't import the handlers or GitPython
+        """
+        modules = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, jupyter_git_extension; print(' '.join(sys.modules))",
+            ],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stdout=subprocess.PIPE,
+            check=True,
+            universal_newlines=True,
+        ).stdout.split()
+        self.assertIn("jupyter_git_extension", modules)
+        self.assertNotIn("git", modules)
+        self.assertNotIn("jupyter_git_extension.handlers", modules)
+
+    def test_0002_lazy_handler(self):
+        """
+        Test route stubs create the real handler and set up the handlers only once
+        """
+        setup = mock.Mock()
+        loader = routes.HandlerLoader(setup)
+        stub = loader.handler("ExecutorHandler")
+        self.assertTrue(issubclass(stub, web.RequestHandler))
+        self.assertFalse(loader.loaded)
+        setup.assert_not_called()
+
+        application = web.Application()
+        for _ in range(2):
+            request = httputil.HTTPServerRequest(uri="/git/executor")
+            request.connection = mock.Mock()
+            handler = stub(application, request)
+            self.assertIsInstance(handler, handlers.ExecutorHandler)
+            self.assertIs(request, handler.request)
+        setup.assert_called_once_with(handlers)
+        self.assertTrue(loader.loaded)
+
+    def test_0003_preload(self):
+        """
+        Test preloading sets up the handlers and then warms up
+        """
+        setup = mock.Mock()
+        warm_up = mock.AsyncMock()
+        loader = routes.HandlerLoader(setup)
+        asyncio.run(loader.preload(warm_up))
+        setup.assert_called_once_with(handlers)
+        warm_up.assert_awaited_once_with(handlers)
@@ -0,0 +1,110 @@
+"""
+Tester for coalescing identical git queries
+"""
+
+import asyncio
+import unittest
+
+from . import single_flight
+
+
+class Tests(unittest.TestCase):
+    """
+    Basic test class
+    """
+
+    def setUp(self):
+        self.group = single_flight.SingleFlight(max_waiters=3)
+        self.calls = []
+
+    async def compute(self, value):
+        self.calls.append(value)
+        await asyncio.sleep(0.01)
+        if isinstance(value, Exception):
+            raise value
+        return {"value": value}
+
+    def test_0001_coalesce(self):
+        """
+        Test concurrent callers with the same key share one computation
+        """
+
+        async def run():
+            return await asyncio.gather(
+                self.group.run(("/repo", "status"), self.compute, 1),
+                self.group.run(("/repo", "status"), self.compute, 2),
+                self.group.run(("/repo", "origin-info"), self.compute, 3),
+                self.group.run(("/other", "status"), self.compute, 4),
+            )
+
+        results = asyncio.run(run())
+
+        self.assertEqual([1, 3, 4], self.calls)
+        self.assertIs(results[0], results[1])
+        self.assertEqual({"value": 3}, results[2])
+        self.assertEqual(
+            {"started": 2, "coalesced": 1, "rejected": 0},
+            self.group.stats()["operations"]["status"],
+        )
+        self.assertEqual(0, self.group.stats()["inFlight"])
+
+        # Finished computations aren't reused
+        asyncio.run(self.group.run(("/repo", "status"), self.compute, 5))
+        self.assertEqual([1, 3, 4, 5], self.calls)
+
+    def test_0002_shared_error(self):
+        """
+        Test every waiting caller receives the error of the shared computation
+        """
+
+        async def run():
+            return await asyncio.gather(
+                *(
+                    self.group.run(("/repo", "status"), self.compute, ValueError("bad"))
+                    for _ in range(2)
+                ),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(run())
+
+        self.assertEqual(1, len(self.calls))
+        self.assertEqual(["bad", "bad"], [str(result) for result in results])
+
+    def test_0003_fan_in_limit(self):
+        """
+        Test callers past the fan-in limit are rejected
+        """
+
+        async def run():
+            return await asyncio.gather(
+                *(
+                    self.group.run(("/repo", "status"), self.compute, i)
+                    for i in range(4)
+                ),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(run())
+
+        self.assertEqual([{"value": 0}] * 3, results[:3])
+        self.assertIsInstance(results[3], single_flight.FanInExceededError)
+        self.assertEqual(1, self.group.stats()["operations"]["status"]["rejected"])
+
+    def test_0004_cancelled_caller(self):
+        """
+        Test a caller going away doesn't cancel the computation others wait on
+        """
+
+        async def run():
+            first = asyncio.ensure_future(
+                self.group.run(("/repo", "status"), self.compute, 1)
+            )
+            second = asyncio.ensure_future(
+                self.group.run(("/repo", "status"), self.compute, 2)
+            )
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        self.assertEqual({"value": 1}, asyncio.run(run()))
@@ -0,0 +1,214 @@
+"""
+Tester for the cached repo status
+"""
+
+import asyncio
+import os
+
+import mock
+
+from . import status
+from .conftest import RepoTestCase
+
+
+class Tests(RepoTestCase):
+    """
+    Basic test class
+    """
+
+    def setUp(self):
+        """
+        Create a repo with a single commit to take fingerprints of
+        """
+        super().setUp()
+        self.write_file("a.txt", "a")
+        self.repo.git.add("a.txt")
+        self.repo.git.commit("-m", "initial")
+
+        self.cache = status.StatusCache(max_age=0)
+
+    def test_0001_find_git_dir(self):
+        """
+        Test finding the git directory for normal repos and linked worktrees
+        """
+        self.assertEqual(
+            os.path.join(self.path, ".git"), status.find_git_dir(self.path)
+        )
+
+        worktree = os.path.join(self.path, "worktree")
+        self.repo.git.worktree("add", worktree)
+        self.assertEqual(
+            os.path.join(self.path, ".git", "worktrees", "worktree"),
+            status.find_git_dir(worktree),
+        )
+
+    def test_0002_fingerprint_changes(self):
+        """
+        Test that staging and committing change the fingerprint
+        """
+        git_dir = status.find_git_dir(self.path)
+        before = status.repo_fingerprint(git_dir)
+        self.assertEqual(before, status.repo_fingerprint(git_dir))
+
+        self.write_file("b.txt", "b")
+        self.repo.git.add("b.txt")
+        staged = status.repo_fingerprint(git_dir)
+        self.assertNotEqual(before, staged)
+
+        self.repo.git.commit("-m", "second")
+        self.assertNotEqual(staged, status.repo_fingerprint(git_dir))
+
+    def test_0003_hit_and_miss(self):
+        """
+        Test cache hits until the repo changes
+        """
+        fingerprint = self.cache.fingerprint(self.path)
+        self.assertIsNone(self.cache.get(self.path, fingerprint))
+        self.cache.put(self.path, fingerprint, {"value": 1})
+
+        fingerprint = self.cache.fingerprint(self.path)
+        self.assertEqual({"value": 1}, self.cache.get(self.path, fingerprint))
+
+        self.write_file("b.txt", "b")
+        self.repo.git.add("b.txt")
+        fingerprint = self.cache.fingerprint(self.path)
+        self.assertIsNone(self.cache.get(self.path, fingerprint))
+
+        stats = self.cache.stats()
+        self.assertEqual(1, stats["hits"])
+        self.assertEqual(2, stats["misses"])
+
+    def test_0004_invalidate(self):
+        """
+        Test invalidating by a path inside the repo and dropping stale puts
+        """
+        fingerprint = self.cache.fingerprint(self.path)
+        self.cache.put(self.path, fingerprint, {"value": 1})
+
+        self.cache.invalidate(self.path + "-other")
+        self.assertIsNotNone(self.cache.get(self.path, fingerprint))
+
+        self.cache.invalidate(os.path.join(self.path, "a.txt"))
+        self.assertIsNone(self.cache.get(self.path, fingerprint))
+
+        # A write that lands while status is computed makes the result stale
+        self.cache.put(self.path, fingerprint, {"value": 2})
+        self.assertIsNone(self.cache.get(self.path, self.cache.fingerprint(self.path)))
+
+        # Listeners hear about every invalidation
+        listener = mock.Mock()
+        self.cache.add_listener(listener)
+        self.cache.invalidate(os.path.join(self.path, "a.txt"))
+        self.cache.invalidate()
+        self.assertEqual(
+            [mock.call(os.path.join(self.path, "a.txt")), mock.call(None)],
+            listener.call_args_list,
+        )
+
+    def test_0005_watch_contents_manager(self):
+        """
+        Test that sync and async contents manager writes invalidate the cache
+        """
+        contents_manager = mock.Mock()
+        contents_manager.root_dir = self.path
+
+        async def rename_file(old_path, new_path):
+            return None
+
+        contents_manager.rename_file = rename_file
+
+        with mock.patch.object(status, "get_status_cache", return_value=self.cache):
+            status.watch_contents_manager(contents_manager)
+
+            fingerprint = self.cache.fingerprint(self.path)
+            self.cache.put(self.path, fingerprint, {"value": 1})
+            contents_manager.save({"type": "file"}, "a.txt")
+            self.assertIsNone(self.cache.get(self.path, fingerprint))
+
+            fingerprint = self.cache.fingerprint(self.path)
+            self.cache.put(self.path, fingerprint, {"value": 1})
+            asyncio.run(contents_manager.rename_file("a.txt", "c.txt"))
+            self.assertIsNone(self.cache.get(self.path, fingerprint))
+
+    def test_0006_status_index(self):
+        """
+        Test per directory listings and rollups for nested changes
+        """
+        index = status.StatusIndex(
+            modified=["a.txt", "dir/b.txt"],
+            deleted=["dir/sub/c.txt"],
+            untracked=["dir/d.txt", "new/e.txt"],
+        )
+
+        self.assertDictEqual(
+            {
+                "a.txt": ["modified"],
+                "dir": ["deletedContents", "modifiedContents", "untrackedContents"],
+                "new": ["untrackedContents"],
+            },
+            index.listing(""),
+        )
+        self.assertDictEqual(
+            {
+                "b.txt": ["modified"],
+                "d.txt": ["untracked"],
+                "sub": ["deletedContents"],
+            },
+            index.listing("dir/"),
+        )
+        self.assertDictEqual({"c.txt": ["deleted"]}, index.listing("dir/sub"))
+        self.assertDictEqual({}, index.listing("unchanged"))
+
+    def test_0007_untracked_scanner(self):
+        """
+        Test collapsing untracked directories, skipping directories, and truncation
+        """
+        for name in ("data/x.csv", "outputs/run/y.txt", "outputs/z.txt", "b.txt"):
+            os.makedirs(os.path.join(self.path, os.path.dirname(name)), exist_ok=True)
+            self.write_file(name, name)
+
+        def scan(**kwargs):
+            paths, truncated = status.UntrackedScanner(**kwargs).scan(self.repo)
+            return sorted(paths), truncated
+
+        self.assertEqual(
+            (["b.txt", "data/x.csv", "outputs/run/y.txt", "outputs/z.txt"], False),
+            scan(),
+        )
+        self.assertEqual((["b.txt", "data/", "outputs/"], False), scan(mode="normal"))
+        self.assertEqual(
+            (["b.txt", "outputs/"], False), scan(mode="normal", skip_dirs=["data/"])
+        )
+
+        paths, truncated = scan(max_entries=2)
+        self.assertEqual(2, len(paths))
+        self.assertTrue(truncated)
+
+        # Listing untracked files leaves the index, and so the fingerprint, alone
+        fingerprint = status.repo_fingerprint(status.find_git_dir(self.path))
+        scan()
+        self.assertEqual(
+            fingerprint, status.repo_fingerprint(status.find_git_dir(self.path))
+        )
+
+    def test_0008_watch_symlinked_root(self):
+        """
+        Test writes through a symlinked notebook directory invalidate the repo's status
+        """
+        link = os.path.join(self.path, "link")
+        os.symlink(self.path, link)
+        contents_manager = mock.Mock()
+        contents_manager.root_dir = link
+        listener = mock.Mock()
+        self.cache.add_listener(listener)
+
+        with mock.patch.object(status, "get_status_cache", return_value=self.cache):
+            status.watch_contents_manager(contents_manager)
+
+            fingerprint = self.cache.fingerprint(self.path)
+            self.cache.put(os.path.realpath(self.path), fingerprint, {"value": 1})
+            contents_manager.save({"type": "file"}, "a.txt")
+            self.assertIsNone(self.cache.get(self.path, fingerprint))
+            listener.assert_called_once_with(
+                os.path.join(os.path.realpath(self.path), "a.txt")
+            )
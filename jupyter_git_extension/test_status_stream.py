@@ -0,0 +1,144 @@
+"""
+Tester for pushing status changes to tree views
+"""
+
+import asyncio
+import unittest
+
+import mock
+
+from .status import StatusIndex
+from .status_stream import StatusBroadcaster, StatusSubscriber
+
+REPO = "/repo"
+
+
+def make_status(branch="master", modified=(), untracked=()):
+    repo_info = {
+        "branchName": branch,
+        "modifiedFiles": list(modified),
+        "deletedFiles": [],
+        "untrackedFiles": list(untracked),
+    }
+    return repo_info, StatusIndex(modified=modified, untracked=untracked)
+
+
+class Tests(unittest.TestCase):
+    """
+    Basic test class
+    """
+
+    def setUp(self):
+        self.status = make_status(modified=["a.txt", "src/b.py"])
+        self.load_status = mock.AsyncMock(side_effect=lambda repo: self.status)
+        self.broadcaster = StatusBroadcaster(
+            self.load_status, interval=60, debounce=0.01
+        )
+
+    def test_0001_full_then_changes(self):
+        """
+        Test subscribers get a full listing of their directory and then only changes
+        """
+        messages = []
+        subscriber = StatusSubscriber(messages.append)
+
+        async def run():
+            await self.broadcaster.subscribe(subscriber, REPO, "")
+            self.status = make_status(modified=["src/b.py"], untracked=["c.txt"])
+            await self.broadcaster.refresh(REPO)
+            self.status = make_status(
+                branch="dev", modified=["src/b.py"], untracked=["c.txt"]
+            )
+            await self.broadcaster.refresh(REPO)
+            self.broadcaster.unsubscribe(subscriber)
+
+        asyncio.run(run())
+
+        full, changes, branch = messages
+        self.assertTrue(full["full"])
+        self.assertEqual(
+            {"a.txt": ["modified"], "src": ["modifiedContents"]},
+            full["repoInfo"]["entries"],
+        )
+        self.assertNotIn("modifiedFiles", full["repoInfo"])
+
+        self.assertFalse(changes["full"])
+        self.assertEqual({"a.txt": [], "c.txt": ["untracked"]}, changes["changes"])
+        self.assertNotIn("repoInfo", changes)
+        self.assertEqual(full["version"] + 1, changes["version"])
+
+        self.assertEqual({}, branch["changes"])
+        self.assertEqual("dev", branch["repoInfo"]["branchName"])
+        self.assertEqual(
+            {"repos": 0, "subscribers": 0},
+            {
+                key: value
+                for key, value in self.broadcaster.stats().items()
+                if key != "computations"
+            },
+        )
+
+    def test_0002_version_only_changes_with_status(self):
+        """
+        Test unchanged status sends nothing and current clients skip the full listing
+        """
+        messages = []
+        subscriber = StatusSubscriber(messages.append)
+
+        async def run():
+            await self.broadcaster.subscribe(subscriber, REPO, "src")
+            # Recomputed but identical
+            self.status = make_status(modified=["a.txt", "src/b.py"])
+            await self.broadcaster.refresh(REPO)
+            version = messages[-1]["version"]
+            await self.broadcaster.subscribe(
+                subscriber, REPO, "src", epoch=self.broadcaster.epoch, version=version
+            )
+            await self.broadcaster.subscribe(
+                subscriber, REPO, "src", epoch="old", version=version
+            )
+            self.broadcaster.unsubscribe(subscriber)
+
+        asyncio.run(run())
+
+        self.assertEqual(
+            ["status", "unchanged", "status"], [m["type"] for m in messages]
+        )
+        self.assertEqual({"b.py": ["modified"]}, messages[-1]["repoInfo"]["entries"])
+        self.assertEqual(1, len({m["version"] for m in messages}))
+
+    def test_0003_notify(self):
+        """
+        Test invalidations of a repo are debounced into one recompute and errors are sent
+        """
+        messages = []
+        subscriber = StatusSubscriber(messages.append)
+
+        async def run():
+            await self.broadcaster.subscribe(subscriber, REPO, "")
+            self.status = make_status(untracked=["c.txt"])
+            for _ in range(5):
+                self.broadcaster.notify(REPO + "/c.txt")
+            self.broadcaster.notify("/elsewhere/c.txt")
+            await asyncio.sleep(0.1)
+
+            self.load_status.side_effect = RuntimeError("broken")
+            self.broadcaster.notify()
+            await asyncio.sleep(0.1)
+            self.broadcaster.notify()
+            await asyncio.sleep(0.1)
+            self.broadcaster.unsubscribe(subscriber)
+
+        asyncio.run(run())
+
+        self.assertEqual(4, self.load_status.await_count)
+        self.assertEqual(["status", "status", "error"], [m["type"] for m in messages])
+        self.assertEqual(
+            {"c.txt": ["untracked"]},
+            {
+                name: statuses
+                for name, statuses in messages[1]["changes"].items()
+                if statuses
+            },
+        )
+        self.assertEqual("broken", messages[-1]["statusText"])
@@ -0,0 +1,151 @@
+"""
+Tester for collecting status across submodules
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import git
+import mock
+
+from . import submodules
+from .conftest import init_repo, write_file
+
+
+def commit_file(repo, name, content="content\n"):
+    write_file(repo.working_tree_dir, name, content)
+    repo.git.add(name)
+    repo.git.commit("-m", f"Add {name}")
+
+
+def add_submodule(repo, url, path):
+    repo.git.execute(
+        ["git", "-c", "protocol.file.allow=always", "submodule", "add", url, path]
+    )
+    repo.git.commit("-m", f"Add {path}")
+
+
+class Tests(unittest.TestCase):
+    """
+    Basic test class
+    """
+
+    def setUp(self):
+        """
+        Create a superproject with submodules "lib" (holding "lib/nested") and "other"
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        root = os.path.realpath(self.tmp_dir.name)
+        sources = {}
+        for name in ("nested", "lib", "other"):
+            sources[name] = init_repo(os.path.join(root, "sources", name))
+            commit_file(sources[name], "file.txt")
+        add_submodule(sources["lib"], sources["nested"].git_dir, "nested")
+
+        self.path = os.path.join(root, "super")
+        self.repo = init_repo(self.path)
+        commit_file(self.repo, "file.txt")
+        add_submodule(self.repo, sources["lib"].git_dir, "lib")
+        add_submodule(self.repo, sources["other"].git_dir, "other")
+        self.repo.git.execute(
+            [
+                "git",
+                "-c",
+                "protocol.file.allow=always",
+                "submodule",
+                "update",
+                "--init",
+                "--recursive",
+            ]
+        )
+        for source in sources.values():
+            source.close()
+
+    def tearDown(self):
+        self.repo.close()
+        self.tmp_dir.cleanup()
+
+    def test_0001_list_submodules(self):
+        """
+        Test checked out submodules are listed with the ones nested in them
+        """
+        self.assertEqual(
+            ["lib", "other", "lib/nested"], submodules.list_submodules(self.path)
+        )
+
+        # Only checked out submodules have status
+        clone_path = os.path.join(self.tmp_dir.name, "clone")
+        git.Repo.clone_from(self.path, clone_path).close()
+        self.assertEqual([], submodules.list_submodules(clone_path))
+
+    def test_0002_scan(self):
+        """
+        Test changes in every submodule are merged under their paths
+        """
+        write_file(self.path, "lib/file.txt", "changed\n")
+        os.remove(os.path.join(self.path, "other", "file.txt"))
+        write_file(self.path, "lib/nested/new.txt", "new\n")
+
+        def status(repo):
+            diff = repo.index.diff(None)
+            return (
+                [item.a_path for item in diff if not item.deleted_file],
+                [item.a_path for item in diff if item.deleted_file],
+                repo.untracked_files,
+                False,
+            )
+
+        modified, deleted, untracked, truncated, states = submodules.SubmoduleScanner(
+            max_workers=2
+        ).scan(self.path, status)
+        self.assertEqual(["lib/file.txt"], modified)
+        self.assertEqual(["other/file.txt"], deleted)
+        self.assertEqual(["lib/nested/new.txt"], untracked)
+        self.assertFalse(truncated)
+        self.assertEqual({"lib": "ok", "other": "ok", "lib/nested": "ok"}, states)
+
+        # Every scan runs in the same bounded pool
+        pool = submodules.get_submodule_pool(2)
+        with mock.patch.object(pool, "submit", wraps=pool.submit) as submit:
+            submodules.SubmoduleScanner(max_workers=2).scan(self.path, status)
+        self.assertEqual(3, submit.call_count)
+
+        scanner = submodules.SubmoduleScanner(enabled=False)
+        self.assertEqual(([], [], [], False, {}), scanner.scan(self.path, status))
+
+    def test_0003_timeout(self):
+        """
+        Test a slow submodule is reported as timed out without delaying the others
+        """
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def status(repo):
+            name = os.path.basename(repo.working_tree_dir)
+            if name == "lib":
+                release.wait(10)
+            if name == "nested":
+                raise ValueError("Unexpected status output")
+            return [f"{name}.txt"], [], [], False
+
+        start = time.monotonic()
+        modified, _, _, _, states = submodules.SubmoduleScanner(
+            timeout=0.2, max_workers=3
+        ).scan(self.path, status)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(["other/other.txt"], modified)
+        self.assertEqual(
+            {"lib": "timedOut", "other": "ok", "lib/nested": "failed"}, states
+        )
+
+        # Submodules waiting for a worker held by a timed out one time out too
+        modified, _, _, _, states = submodules.SubmoduleScanner(
+            timeout=0.2, max_workers=1
+        ).scan(self.path, status)
+        self.assertEqual([], modified)
+        self.assertEqual(
+            {"lib": "timedOut", "other": "timedOut", "lib/nested": "timedOut"}, states
+        )
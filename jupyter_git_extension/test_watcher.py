@@ -0,0 +1,192 @@
+"""
+Tester for filesystem event driven repo status
+"""
+
+import os
+import time
+import unittest
+
+import mock
+
+from . import status, watcher
+from .conftest import RepoTestCase
+
+
+class Tests(RepoTestCase):
+    """
+    Basic test class
+    """
+
+    def setUp(self):
+        """
+        Create a repo with a couple of committed files
+        """
+        super().setUp()
+        os.mkdir(os.path.join(self.path, "dir"))
+        self.write_file("a.txt", "a")
+        self.write_file("dir/b.txt", "b")
+        self.repo.git.add(".")
+        self.repo.git.commit("-m", "initial")
+
+    def test_0001_parse_porcelain_v2(self):
+        """
+        Test parsing each porcelain v2 record type
+        """
+        output = "\0".join(
+            [
+                "1 .M N... 100644 100644 100644 abc abc modified file.txt",
+                "1 .D N... 100644 100644 000000 abc abc dir/deleted.txt",
+                "1 M. N... 100644 100644 100644 abc def staged.txt",
+                "2 R. N... 100644 100644 100644 abc abc R100 new.txt",
+                "old.txt",
+                "u UU N... 100644 100644 100644 100644 abc def ghi conflict.txt",
+                "? untracked dir/file.txt",
+                "",
+            ]
+        )
+
+        expected = {
+            "modified file.txt": "modified",
+            "dir/deleted.txt": "deleted",
+            "conflict.txt": "modified",
+            "untracked dir/file.txt": "untracked",
+        }
+        self.assertDictEqual(expected, watcher.parse_porcelain_v2(output))
+
+    def test_0002_incremental_refresh(self):
+        """
+        Test that only paths reported by events are rechecked after the first scan
+        """
+        model = watcher.RepoStatusModel(self.path, watching=True)
+        self.assertEqual(([], [], []), model.status())
+        self.assertEqual(1, model.full_scans)
+
+        self.write_file("a.txt", "changed")
+        self.write_file("dir/new.txt", "new")
+        os.remove(os.path.join(self.path, "dir", "b.txt"))
+        model.handle_fs_event(os.path.join(self.path, "a.txt"))
+        model.handle_fs_event(os.path.join(self.path, "dir"))
+
+        self.assertEqual((["a.txt"], ["dir/b.txt"], ["dir/new.txt"]), model.status())
+        self.assertEqual(1, model.full_scans)
+        self.assertEqual(1, model.partial_scans)
+
+        # Changes without an event aren't picked up until something forces a rescan
+        self.write_file("unseen.txt", "unseen")
+        self.assertEqual(["dir/new.txt"], model.status()[2])
+
+        model.handle_fs_event(os.path.join(self.path, ".git", "index"))
+        self.assertEqual(["dir/new.txt", "unseen.txt"], model.status()[2])
+        self.assertEqual(2, model.full_scans)
+
+    def test_0003_overflow(self):
+        """
+        Test that too many pending paths fall back to a full rescan
+        """
+        model = watcher.RepoStatusModel(self.path, max_pending=1, watching=True)
+        model.status()
+
+        self.write_file("c.txt", "c")
+        self.write_file("d.txt", "d")
+        model.handle_fs_event(os.path.join(self.path, "c.txt"))
+        model.handle_fs_event(os.path.join(self.path, "d.txt"))
+
+        self.assertEqual(["c.txt", "d.txt"], model.status()[2])
+        self.assertEqual(2, model.full_scans)
+        self.assertEqual(0, model.partial_scans)
+
+    @unittest.skipIf(watcher.Observer is None, "watchdog is not installed")
+    def test_0004_tracker_watches_repo(self):
+        """
+        Test that the tracker's watcher delivers events to the model
+        """
+        changed = []
+        tracker = watcher.StatusTracker(on_change=changed.append)
+        try:
+            model = tracker.model(self.path)
+            self.assertTrue(model.watching)
+            self.assertEqual([], model.status()[0])
+
+            self.write_file("a.txt", "changed")
+            deadline = time.monotonic() + 5
+            while not changed and time.monotonic() < deadline:
+                time.sleep(0.05)
+
+            self.assertIn(self.path, changed)
+            self.assertEqual(["a.txt"], model.status()[0])
+            self.assertEqual(1, model.full_scans)
+        finally:
+            tracker.stop()
+
+    def test_0005_untracked_scanner(self):
+        """
+        Test untracked files are listed with the scanner's mode, skips, and limit
+        """
+        scanner = status.UntrackedScanner(
+            mode="normal", max_entries=2, skip_dirs=["skipped/"]
+        )
+        model = watcher.RepoStatusModel(
+            self.path, watching=True, untracked_scanner=scanner
+        )
+        for name in ("new", "skipped"):
+            os.mkdir(os.path.join(self.path, name))
+            self.write_file(f"{name}/file.txt", name)
+        self.write_file("c.txt", "c")
+        self.assertEqual(([], [], ["c.txt", "new/"]), model.status())
+        self.assertFalse(model.untracked_truncated)
+
+        self.write_file("a.txt", "changed")
+        self.write_file("d.txt", "d")
+        model.handle_fs_event(os.path.join(self.path, "a.txt"))
+        model.handle_fs_event(os.path.join(self.path, "d.txt"))
+        modified, _, untracked = model.status()
+        self.assertEqual(["a.txt"], modified)
+        self.assertEqual(2, len(untracked))
+        self.assertTrue(model.untracked_truncated)
+        self.assertEqual(1, model.partial_scans)
+
+    def test_0006_untracked_partial_refresh(self):
+        """
+        Test partial refreshes only list untracked files under the dirty paths
+        """
+        scanner = status.UntrackedScanner(mode="normal")
+        model = watcher.RepoStatusModel(
+            self.path, watching=True, untracked_scanner=scanner
+        )
+        os.mkdir(os.path.join(self.path, "new"))
+        self.write_file("new/file.txt", "new")
+        self.write_file("c.txt", "c")
+        self.assertEqual(["c.txt", "new/"], model.status()[2])
+
+        with mock.patch.object(scanner, "scan_git", wraps=scanner.scan_git) as scan:
+            # A file added to an untracked directory stays covered by its entry
+            self.write_file("new/other.txt", "other")
+            self.write_file("dir/d.txt", "d")
+            os.remove(os.path.join(self.path, "c.txt"))
+            for name in ("new/other.txt", "dir/d.txt", "c.txt"):
+                model.handle_fs_event(os.path.join(self.path, name))
+            self.assertEqual(["dir/d.txt", "new/"], model.status()[2])
+            scan.assert_called_once_with(model._git, ["c.txt", "dir/d.txt", "new"])
+
+            # Removing an untracked directory's files rechecks the directory
+            for name in ("file.txt", "other.txt"):
+                os.remove(os.path.join(self.path, "new", name))
+                model.handle_fs_event(os.path.join(self.path, "new", name))
+            self.assertEqual(["dir/d.txt", "new/"], model.status()[2])
+            os.rmdir(os.path.join(self.path, "new"))
+            model.handle_fs_event(os.path.join(self.path, "new"))
+            self.assertEqual(["dir/d.txt"], model.status()[2])
+
+            # The limit applies to the merged listing
+            scanner.max_entries = 2
+            self.write_file("e.txt", "e")
+            self.write_file("f.txt", "f")
+            model.handle_fs_event(os.path.join(self.path, "e.txt"))
+            model.handle_fs_event(os.path.join(self.path, "f.txt"))
+            self.assertEqual(["dir/d.txt", "e.txt"], model.status()[2])
+            self.assertTrue(model.untracked_truncated)
+
+            # Only full rescans list the whole worktree
+            self.assertTrue(all(call.args[1] for call in scan.call_args_list))
+        self.assertEqual(1, model.full_scans)
+        self.assertEqual(4, model.partial_scans)
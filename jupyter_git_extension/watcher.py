@@ -0,0 +1,436 @@
+"""
+Incremental repo status driven by filesystem events. Only paths that changed since
+the last refresh are rechecked against the index instead of scanning the whole tree.
+"""
+import os
+import posixpath
+import threading
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+from .metrics import InstrumentedGit
+from .status import find_git_dir
+
+_status_tracker = None
+
+# Files in the git directory that change the status of arbitrary worktree paths
+GIT_DIR_TRIGGERS = ("index", "HEAD", "packed-refs", "refs")
+
+# Maximum pathspecs passed to a single git status call
+PATHSPEC_CHUNK_SIZE = 500
+
+
+def parse_porcelain_v2(output):
+    """
+    Parses `git status --porcelain=v2 -z` output into worktree status per path.
+    Only unstaged changes are reported to match `repo.index.diff(None)`.
+
+    :param output: is the NUL separated output of git status
+    :return: Dict of relative path -> "modified", "deleted" or "untracked"
+    """
+    statuses = {}
+    records = iter(output.split("\0"))
+    for record in records:
+        if not record:
+            continue
+        kind = record[0]
+        if kind == "?":
+            statuses[record[2:]] = "untracked"
+        elif kind in ("1", "2", "u"):
+            # Field counts before the path differ per record type
+            fields = {"1": 8, "2": 9, "u": 10}[kind]
+            parts = record.split(" ", fields)
+            worktree_status = parts[1][1]
+            if kind == "2":
+                # Renames are followed by a separate original path record
+                next(records, None)
+            if kind == "u":
+                statuses[parts[fields]] = "modified"
+            elif worktree_status == "D":
+                statuses[parts[fields]] = "deleted"
+            elif worktree_status != ".":
+                statuses[parts[fields]] = "modified"
+    return statuses
+
+
+def _parents(parts):
+    """
+    :param parts: is a path split into its components
+    :return: generator of the components of each parent directory of the path
+    """
+    for i in range(1, len(parts)):
+        yield parts[:i]
+
+
+class RepoStatusModel:
+    """
+    Long lived worktree status for a single repo. Filesystem events mark paths
+    dirty and refresh() only rechecks those paths. Changes to the index or refs,
+    too many pending paths, or a stopped watcher fall back to a full rescan.
+
+    With an UntrackedScanner, git status only checks tracked files and untracked
+    files are listed by the scanner, with its mode, skipped directories, and entry
+    limit. Full rescans list the whole worktree, partial refreshes only list the
+    dirty paths and merge them into the cached listing.
+    """
+
+    def __init__(
+        self,
+        root,
+        max_pending=1000,
+        watching=False,
+        on_change=None,
+        untracked_scanner=None,
+    ):
+        """
+        :param root: is the path to the root of the working tree
+        :param max_pending: is the number of dirty paths after which a full rescan
+            is cheaper than checking paths individually
+        :param watching: is whether filesystem events are being delivered. Without
+            them every refresh is a full rescan.
+        :param on_change: is an optional callback run after each filesystem event
+        :param untracked_scanner: is an optional UntrackedScanner listing untracked
+            files instead of git status
+        """
+        self.root = os.path.abspath(root)
+        self.git_dir = find_git_dir(self.root)
+        self.max_pending = max_pending
+        self.watching = watching
+        self.on_change = on_change
+        self.untracked_scanner = untracked_scanner
+        self.untracked_truncated = False
+        self.full_scans = 0
+        self.partial_scans = 0
+        self._git = InstrumentedGit(self.root)
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._statuses = {}
+        self._untracked = []
+        self._dirty = set()
+        self._needs_full_scan = True
+
+    def handle_fs_event(self, path):
+        """
+        Records that a path changed on disk
+
+        :param path: is the absolute path that changed
+        :return: None
+        """
+        path = os.path.abspath(path)
+        if path == self.git_dir or path.startswith(self.git_dir + os.sep):
+            relative = os.path.relpath(path, self.git_dir).split(os.sep)[0]
+            if relative in GIT_DIR_TRIGGERS:
+                self.mark_overflow()
+        elif path.startswith(self.root + os.sep):
+            relative = os.path.relpath(path, self.root)
+            if relative.split(os.sep)[0] == ".git":
+                return
+            with self._lock:
+                self._dirty.add(relative.replace(os.sep, "/"))
+                if len(self._dirty) > self.max_pending:
+                    self._needs_full_scan = True
+                    self._dirty.clear()
+        else:
+            return
+
+        if self.on_change is not None:
+            self.on_change(self.root)
+
+    def mark_overflow(self):
+        """
+        Forces the next refresh to rescan the whole working tree
+        """
+        with self._lock:
+            self._needs_full_scan = True
+            self._dirty.clear()
+
+    def _status(self, *paths):
+        # Paths come straight from the filesystem so don't treat them as globs.
+        # Optional locks are off so status doesn't rewrite the index, which would
+        # trigger another full rescan through the watcher.
+        output = self._git.status(
+            "--porcelain=v2",
+            "-z",
+            "--untracked-files=no"
+            if self.untracked_scanner
+            else "--untracked-files=all",
+            "--",
+            *paths,
+            env={"GIT_LITERAL_PATHSPECS": "1", "GIT_OPTIONAL_LOCKS": "0"},
+        )
+        return parse_porcelain_v2(output)
+
+    def refresh(self):
+        """
+        Brings the model up to date with the working tree
+
+        :return: None
+        """
+        with self._refresh_lock:
+            with self._lock:
+                full_scan = self._needs_full_scan or not self.watching
+                dirty = self._dirty
+                self._dirty = set()
+                self._needs_full_scan = False
+
+            if full_scan:
+                statuses = self._status()
+                with self._lock:
+                    self._statuses = statuses
+                self.full_scans += 1
+                self._scan_untracked()
+                return
+
+            if not dirty:
+                return
+
+            dirty = sorted(dirty)
+            updates = {}
+            for i in range(0, len(dirty), PATHSPEC_CHUNK_SIZE):
+                updates.update(self._status(*dirty[i : i + PATHSPEC_CHUNK_SIZE]))
+
+            exact = set(dirty)
+            prefixes = tuple(changed + "/" for changed in dirty)
+            with self._lock:
+                for path in list(self._statuses):
+                    if path in exact or path.startswith(prefixes):
+                        del self._statuses[path]
+                self._statuses.update(updates)
+            self.partial_scans += 1
+            self._scan_untracked(dirty)
+
+    def _scan_untracked(self, dirty=None):
+        """
+        Lists untracked files with the UntrackedScanner
+
+        :param dirty: is the sorted list of paths changed since the last refresh. None
+            to list the whole worktree
+        :return: None
+        """
+        scanner = self.untracked_scanner
+        if scanner is None:
+            return
+        if dirty is None or any(
+            posixpath.basename(path) == ".gitignore" for path in dirty
+        ):
+            # Changed ignore rules can change what is untracked anywhere below them
+            untracked, truncated = scanner.scan_git(self._git)
+            with self._lock:
+                self._untracked = untracked
+                self.untracked_truncated = truncated
+            return
+
+        with self._lock:
+            cached = list(self._untracked)
+            # Entries cut off by the limit are unknown until the next full rescan
+            truncated = self.untracked_truncated
+
+        # Untracked directories listed as one entry are rechecked whole when
+        # anything inside them changed, they may now be empty or tracked
+        dirty_prefixes = tuple(path + "/" for path in dirty)
+        paths = set(dirty)
+        for entry in cached:
+            if entry.endswith("/") and any(
+                path.startswith(entry) for path in dirty_prefixes
+            ):
+                paths.add(entry[:-1])
+        # Paths inside another one are covered by it, and would keep ls-files from
+        # listing their untracked directory as one entry
+        paths = sorted(
+            path
+            for path in paths
+            if not any("/".join(parts) in paths for parts in _parents(path.split("/")))
+        )
+
+        found = []
+        for i in range(0, len(paths), PATHSPEC_CHUNK_SIZE):
+            chunk, chunk_truncated = scanner.scan_git(
+                self._git, paths[i : i + PATHSPEC_CHUNK_SIZE]
+            )
+            found.extend(chunk)
+            truncated = truncated or chunk_truncated
+
+        exact = set(paths)
+        prefixes = tuple(path + "/" for path in paths)
+        merged = {
+            entry
+            for entry in cached
+            if entry.rstrip("/") not in exact and not entry.startswith(prefixes)
+        }
+        merged.update(found)
+        # Paths inside a directory listed as a single entry are covered by it
+        directories = {entry for entry in merged if entry.endswith("/")}
+        untracked = sorted(
+            entry
+            for entry in merged
+            if not any(
+                "/".join(parts) + "/" in directories
+                for parts in _parents(entry.rstrip("/").split("/"))
+            )
+        )
+        if scanner.max_entries and len(untracked) > scanner.max_entries:
+            untracked = untracked[: scanner.max_entries]
+            truncated = True
+        with self._lock:
+            self._untracked = untracked
+            self.untracked_truncated = truncated
+
+    def status(self):
+        """
+        Refreshes and returns the worktree status
+
+        :return: tuple of modified, deleted, and untracked path lists. With an
+            UntrackedScanner, untracked_truncated tells whether its listing stopped early
+        """
+        self.refresh()
+        with self._lock:
+            statuses = dict(self._statuses)
+            untracked = list(self._untracked)
+        modified = sorted(p for p, s in statuses.items() if s == "modified")
+        deleted = sorted(p for p, s in statuses.items() if s == "deleted")
+        if self.untracked_scanner is None:
+            untracked = sorted(p for p, s in statuses.items() if s == "untracked")
+        return modified, deleted, untracked
+
+
+class _ModelEventHandler(FileSystemEventHandler):
+    """
+    Forwards watchdog events to a RepoStatusModel
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def on_any_event(self, event):
+        if event.event_type in ("opened", "closed_no_write"):
+            return
+        # Directory mtimes change whenever an entry is added, the entry's own event covers it
+        if event.is_directory and event.event_type == "modified":
+            return
+        self.model.handle_fs_event(event.src_path)
+        dest_path = getattr(event, "dest_path", None)
+        if dest_path:
+            self.model.handle_fs_event(dest_path)
+
+
+class StatusTracker:
+    """
+    Keeps a watched RepoStatusModel for every repo status has been requested for
+    """
+
+    def __init__(
+        self, max_pending=1000, on_change=None, log=None, untracked_scanner=None
+    ):
+        """
+        :param max_pending: is passed to each RepoStatusModel
+        :param on_change: is called with the repo root whenever a watched file changes
+        :param log: is an optional logger to report watcher problems to
+        :param untracked_scanner: is passed to each RepoStatusModel
+        """
+        self.max_pending = max_pending
+        self.on_change = on_change
+        self.untracked_scanner = untracked_scanner
+        self.log = log
+        self._lock = threading.Lock()
+        self._models = {}
+        self._observers = {}
+
+    def model(self, root):
+        """
+        Returns the status model for a repo, starting a watcher for it on first use
+
+        :param root: is the path to the root of the working tree
+        :return: RepoStatusModel
+        """
+        root = os.path.abspath(root)
+        with self._lock:
+            model = self._models.get(root)
+            if model is None:
+                model = RepoStatusModel(
+                    root,
+                    max_pending=self.max_pending,
+                    on_change=self.on_change,
+                    untracked_scanner=self.untracked_scanner,
+                )
+                self._models[root] = model
+                self._start_watching(model)
+
+            observer = self._observers.get(root)
+            if model.watching and (observer is None or not observer.is_alive()):
+                # Events may have been missed while the watcher was down
+                model.watching = False
+                if self.log:
+                    self.log.warning(f"File watcher for {root} stopped, rescanning")
+            return model
+
+    def _start_watching(self, model):
+        if Observer is None:
+            if self.log:
+                self.log.warning(
+                    "watchdog is not installed, git status will rescan the whole repo"
+                )
+            return
+        try:
+            observer = Observer()
+            observer.daemon = True
+            observer.schedule(_ModelEventHandler(model), model.root, recursive=True)
+            if not model.git_dir.startswith(model.root + os.sep):
+                observer.schedule(
+                    _ModelEventHandler(model), model.git_dir, recursive=True
+                )
+            observer.start()
+        except Exception as e:
+            # Ex. inotify watch limits. Full rescans still give correct results
+            if self.log:
+                self.log.warning(f"Could not watch {model.root}: {e}")
+            return
+        self._observers[model.root] = observer
+        model.watching = True
+
+    def stop(self):
+        """
+        Stops all watchers
+        """
+        with self._lock:
+            for observer in self._observers.values():
+                observer.stop()
+            self._observers.clear()
+            self._models.clear()
+
+
+def get_status_tracker():
+    """
+    Returns the process wide status tracker, or None if status tracking isn't enabled
+    """
+    return _status_tracker
+
+
+def configure_status_tracker(config, on_change=None, log=None, untracked_scanner=None):
+    """
+    Sets up the process wide status tracker from the extension config
+
+    :param config: is a GitExtensionConfig
+    :param on_change: is called with the repo root whenever a watched file changes
+    :param log: is an optional logger to report watcher problems to
+    :param untracked_scanner: is the UntrackedScanner listing untracked files, so
+        its limits apply to watched repos too
+    :return: the StatusTracker or None if status_tracking is "scan"
+    """
+    global _status_tracker
+    if _status_tracker is not None:
+        _status_tracker.stop()
+        _status_tracker = None
+    if config.status_tracking == "watch":
+        _status_tracker = StatusTracker(
+            max_pending=config.status_watch_max_pending,
+            on_change=on_change,
+            log=log,
+            untracked_scanner=untracked_scanner,
+        )
+    return _status_tracker
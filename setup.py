@@ -9,10 +9,23 @@ except ImportError:
     use_setuptools()
     from setuptools import setup, find_packages, Command
 
+from setuptools.command.build_py import build_py
+
 exec(open("jupyter_git_extension/version.py").read())
 description = "Jupyter git extension"
 long_description = str(open("README.md", "rb").read())
 
+
+class BuildPy(build_py):
+    """
+    Leaves the shared test setup in conftest.py out of the installed package
+    """
+
+    def find_package_modules(self, package, package_dir):
+        modules = super().find_package_modules(package, package_dir)
+        return [module for module in modules if module[1] != "conftest"]
+
+
 setup(
     name="jupyter_git_extension",
     version=__version__,
@@ -22,6 +35,7 @@ setup(
     long_description=long_description,
     packages=find_packages(),
     install_requires=["psutil", "notebook", "gitpython", "tornado"],
+    extras_require={"watch": ["watchdog"]},
     package_data={"jupyter_git_extension": ["static/*"]},
     data_files=[
         (
@@ -35,5 +49,6 @@ setup(
             ],
         )
     ],
+    cmdclass={"build_py": BuildPy},
     zip_safe=False,
 )